@@ -0,0 +1,92 @@
+"""7/30/90-day trends over ten years of daily data per user, from the database and in memory.
+
+    python benchmarks/bench_analytics.py [users] [years]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from core.analytics import WINDOWS, compute_trends, load_trends
+from core.db import close_connections, deferred_search_index, get_connection, setup_database
+from core.targets import FIELDS, compute_targets
+
+def fill(conn, users, days, seed=1):
+    rng = random.Random(seed)
+    first = date(2015, 1, 1)
+    dates = [(first + timedelta(days=i)).isoformat() for i in range(days)]
+    with conn:
+        conn.execute("BEGIN")
+        conn.executemany("INSERT INTO users(name) VALUES(?)", [(f"user{u}",) for u in range(1, users + 1)])
+        with deferred_search_index(conn):
+            for u in range(1, users + 1):
+                conn.executemany(
+                    "INSERT INTO foods(user_id, log_date, name, calories) VALUES(?,?,?,?)",
+                    ((u, d, "meal", rng.uniform(400, 900)) for d in dates for _ in range(3) if rng.random() < 0.9),
+                )
+                conn.executemany(
+                    "INSERT INTO exercises(user_id, log_date, name, calories_burned) VALUES(?,?,?,?)",
+                    ((u, d, "walk", rng.uniform(100, 500)) for d in dates if rng.random() < 0.5),
+                )
+                conn.executemany(
+                    "INSERT INTO weights(user_id, log_date, weight_kg) VALUES(?,?,?)",
+                    ((u, d, 80 + rng.gauss(0, 0.5) - i * 0.001) for i, d in enumerate(dates) if rng.random() < 0.4),
+                )
+                history = []
+                for i in range(0, days, 365):
+                    weight = 80 - i * 0.001
+                    t = compute_targets("Male", weight, 180, 30 + i // 365, "Moderate", "Lose")
+                    history.append((u, dates[i], weight, *(t[f] for f in FIELDS)))
+                conn.executemany(
+                    f"INSERT INTO targets_history(user_id, effective_date, source, profile_version, weight_kg, "
+                    f"{', '.join(FIELDS)}) VALUES(?,?,'weight',1,?{',?' * len(FIELDS)})",
+                    history,
+                )
+    return dates[0], dates[-1]
+
+def timed(fn, repeat=10):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1e3, result
+
+def main(users, years):
+    days = years * 365
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        setup_database(path)
+        conn = get_connection(path)
+        t0 = time.perf_counter()
+        start, end = fill(conn, users, days)
+        print(f"{users} users x {days:,} days (filled in {time.perf_counter() - t0:.1f} s), windows {WINDOWS}")
+
+        per_user = []
+        for u in range(1, users + 1):
+            ms, trends = timed(lambda: load_trends(conn, u, start, end))
+            per_user.append(ms)
+        print(f"  load_trends, whole range      {np.median(per_user):8.2f} ms median per user ({len(trends):,} days)")
+
+        n = len(trends) + max(WINDOWS) - 1
+        rng = np.random.default_rng(1)
+        cols = dict(
+            food=rng.uniform(1500, 2800, n), burned=rng.uniform(0, 600, n), logged=rng.random(n) < 0.9,
+            target=np.full(n, 2000.0), weight=np.where(rng.random(n) < 0.4, rng.normal(80, 1, n), np.nan),
+        )
+        dates = np.arange(n).astype("datetime64[D]")
+        ms, _ = timed(lambda: compute_trends(dates, **cols, skip=max(WINDOWS) - 1))
+        print(f"  compute_trends, arrays only   {ms:8.2f} ms")
+        ms, _ = timed(lambda: load_trends(conn, 1, (date.fromisoformat(end) - timedelta(days=89)).isoformat(), end))
+        print(f"  load_trends, last 90 days     {ms:8.2f} ms")
+        close_connections()
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:]]
+    main(*(args + [20, 10][len(args):]))
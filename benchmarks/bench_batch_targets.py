@@ -0,0 +1,69 @@
+"""Scalar calc_bmr/calc_tdee/apply_goal loop versus batch_targets() over a population.
+
+    python benchmarks/bench_batch_targets.py [profiles]
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from core.helpers import (
+    ACTIVITY_LEVELS, GENDERS, GOALS, apply_goal, batch_targets, calc_bmi, calc_bmr, calc_tdee, encode,
+    macro_grams,
+)
+
+MACRO = {"protein": 30, "carb": 40, "fat": 30}
+
+def population(n, seed=1):
+    rng = np.random.default_rng(seed)
+    return {
+        "gender": rng.choice(GENDERS, n),
+        "weight_kg": np.round(rng.uniform(40, 150, n), 1),
+        "height_cm": np.round(rng.uniform(140, 210, n), 1),
+        "age_years": rng.integers(15, 90, n),
+        "activity": rng.choice(ACTIVITY_LEVELS, n),
+        "goal": rng.choice(GOALS, n),
+    }
+
+def scalar(cols):
+    rows = zip(
+        cols["gender"].tolist(), cols["weight_kg"].tolist(), cols["height_cm"].tolist(),
+        cols["age_years"].tolist(), cols["activity"].tolist(), cols["goal"].tolist(),
+    )
+    out = {k: [] for k in ("bmr", "tdee", "target", "bmi", "protein_g", "carb_g", "fat_g")}
+    for gender, w, h, age, activity, goal in rows:
+        bmr = calc_bmr(gender, w, h, age)
+        tdee = calc_tdee(bmr, activity)
+        target = apply_goal(tdee, goal)
+        p_g, c_g, f_g = macro_grams(target, MACRO)
+        for k, v in zip(out, (bmr, tdee, target, calc_bmi(w, h), p_g, c_g, f_g)):
+            out[k].append(v)
+    return out
+
+def timed(label, fn, *args):
+    t0 = time.perf_counter()
+    result = fn(*args)
+    print(f"  {label:<34} {time.perf_counter() - t0:8.3f} s")
+    return result
+
+def main(n):
+    cols = population(n)
+    print(f"{n:,} profiles")
+    expected = timed("scalar functions, per row", scalar, cols)
+    timed("batch_targets, label columns", lambda: batch_targets(**cols, macro=MACRO))
+    coded = dict(
+        cols,
+        gender=encode(cols["gender"], GENDERS),
+        activity=encode(cols["activity"], ACTIVITY_LEVELS),
+        goal=encode(cols["goal"], GOALS),
+    )
+    got = timed("batch_targets, code columns", lambda: batch_targets(**coded, macro=MACRO))
+    same = all(np.array_equal(got[k], np.array(v)) for k, v in expected.items())
+    print(f"  identical to scalar results: {same}")
+    return 0 if same else 1
+
+if __name__ == "__main__":
+    sys.exit(main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000))
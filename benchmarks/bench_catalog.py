@@ -0,0 +1,65 @@
+"""FoodIndex build time, memory and per-keystroke latency over a synthetic catalogue.
+
+    python benchmarks/bench_catalog.py [items]
+"""
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from core.catalog import CatalogItem, FoodIndex
+
+WORDS = (
+    "apple banana chicken breast rice white brown bread wholemeal oat milk yogurt greek cheese cheddar "
+    "egg boiled fried salmon tuna beef steak pork lentil dal curry potato sweet pasta tomato sauce "
+    "spinach broccoli carrot orange grape mango almond peanut butter honey coffee tea latte soup salad"
+).split()
+
+def catalogue(n, seed=1):
+    rng = random.Random(seed)
+    names = set()
+    while len(names) < n:
+        names.add(" ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 4))) + f" {rng.randint(1, 9999)}")
+    return [CatalogItem(i, name, rng.uniform(20, 900), uses=rng.randint(0, 50)) for i, name in enumerate(names, 1)]
+
+def keystrokes(word):
+    return [word[:i] for i in range(1, len(word) + 1)]
+
+def latency(label, fn, queries):
+    times = []
+    for q in queries:
+        t0 = time.perf_counter()
+        fn(q)
+        times.append(time.perf_counter() - t0)
+    times.sort()
+    p50, p99 = times[len(times) // 2], times[int(len(times) * 0.99)]
+    print(f"  {label:<26} p50 {p50 * 1e3:6.3f} ms   p99 {p99 * 1e3:6.3f} ms   max {times[-1] * 1e3:6.3f} ms")
+
+def main(n):
+    items = catalogue(n)
+    t0 = time.perf_counter()
+    index = FoodIndex(items)
+    build = time.perf_counter() - t0
+    # Measured on a second build: tracemalloc slows allocation down several times
+    tracemalloc.start()
+    second = FoodIndex(items)
+    mem = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del second
+    print(f"{n:,} items: built in {build:.2f} s, index {mem / 2**20:.0f} MiB")
+
+    typed = [q for w in ("chicken breast", "greek yogurt", "sweet potato", "zzz") for q in keystrokes(w)]
+    latency("search(), per keystroke", index.search, typed)
+    latency("prefix() only", index.prefix, typed)
+    latency("fuzzy(), typos", index.fuzzy, ["chiken", "yoghurt", "brocoli", "salman", "potatoe", "swet potato"] * 20)
+
+    t0 = time.perf_counter()
+    for i in range(1000):
+        index.logged(f"new food {i}", 100)
+    print(f"  logged() new name           {(time.perf_counter() - t0):.3f} ms/op")
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 500_000)
@@ -0,0 +1,60 @@
+"""Open-per-query db_connect() versus the long-lived get_connection().
+
+    python benchmarks/bench_connections.py [iterations]
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from core.db import close_connections, db_connect, get_connection, setup_database
+
+READ_SQL = "SELECT name, calories FROM foods WHERE user_id=? AND log_date=? ORDER BY id DESC"
+WRITE_SQL = "INSERT INTO foods(user_id, log_date, name, calories) VALUES(?,?,?,?)"
+
+def per_call_read(path, n):
+    for _ in range(n):
+        conn = db_connect(path)
+        conn.execute(READ_SQL, (1, "2024-01-01")).fetchall()
+        conn.close()
+
+def pooled_read(path, n):
+    for _ in range(n):
+        get_connection(path).execute(READ_SQL, (1, "2024-01-01")).fetchall()
+
+def per_call_write(path, n):
+    for i in range(n):
+        conn = db_connect(path)
+        conn.execute(WRITE_SQL, (1, "2024-01-01", "Apple", i))
+        conn.commit()
+        conn.close()
+
+def pooled_write(path, n):
+    for i in range(n):
+        conn = get_connection(path)
+        with conn:
+            conn.execute(WRITE_SQL, (1, "2024-01-01", "Apple", i))
+
+def timed(label, fn, path, n):
+    t0 = time.perf_counter()
+    fn(path, n)
+    us = (time.perf_counter() - t0) / n * 1e6
+    print(f"  {label:<28} {us:9.1f} µs/op")
+
+def main(n):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        setup_database(path)
+        with db_connect(path) as conn:
+            conn.executemany(WRITE_SQL, [(1, "2024-01-01", "Seed", 100)] * 20)
+        print(f"{n} iterations")
+        timed("read, open per query", per_call_read, path, n)
+        timed("read, pooled", pooled_read, path, n)
+        timed("write, open per query", per_call_write, path, n)
+        timed("write, pooled (WAL)", pooled_write, path, n)
+        close_connections()
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
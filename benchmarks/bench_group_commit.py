@@ -0,0 +1,93 @@
+"""Rows/sec for bursty exercise and weight logging: one commit per row versus GroupCommitWriter.
+
+    python benchmarks/bench_group_commit.py [rows] [producers]
+
+Two patterns. "acked": producer threads, like a server's request handlers,
+each send one row and wait for its commit before sending the next. "streamed":
+a feed pushes every row without waiting and collects the acknowledgements at
+the end. The baseline runs the same calls on one writer thread that commits
+each row on its own.
+"""
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from core import store
+from core.db import close_connections, get_connection, setup_database
+from core.writer import GroupCommitWriter
+
+def job(i):
+    uid = i % 20 + 1
+    d = f"2024-{i // 28 % 12 + 1:02d}-{i % 28 + 1:02d}"
+    if i % 4 == 0:
+        return store.add_weight, (uid, d, 70 + i % 10 / 10)
+    return store.add_exercise, (uid, d, "walk" if i % 3 else "cycling", 100 + i % 400)
+
+def fresh_db(tmp, name):
+    path = os.path.join(tmp, name)
+    setup_database(path)
+    conn = get_connection(path)
+    with conn:
+        conn.executemany("INSERT INTO users(name) VALUES(?)", [(f"user{i}",) for i in range(1, 21)])
+    return path
+
+def produce(submit, rows, producers):
+    """Each producer submits its share of jobs; producers=0 streams them all from this thread."""
+    t0 = time.perf_counter()
+    if not producers:
+        futures = [submit(fn, *args) for fn, args in map(job, range(rows))]
+        for f in futures:
+            f.result()
+        return time.perf_counter() - t0
+
+    def worker(k):
+        for i in range(k, rows, producers):
+            fn, args = job(i)
+            submit(fn, *args).result()
+    threads = [threading.Thread(target=worker, args=(k,)) for k in range(producers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return time.perf_counter() - t0
+
+def per_row(path, rows, producers, synchronous):
+    pool = ThreadPoolExecutor(max_workers=1)
+
+    def run(fn, *args):
+        conn = get_connection(path)
+        if synchronous:
+            conn.execute(f"PRAGMA synchronous={synchronous}")
+        return fn(conn, *args)
+
+    secs = produce(lambda fn, *args: pool.submit(run, fn, *args), rows, producers)
+    pool.shutdown()
+    return secs
+
+def grouped(path, rows, producers, synchronous, delay_ms):
+    with GroupCommitWriter(path, max_delay_ms=delay_ms, synchronous=synchronous) as writer:
+        secs = produce(writer.submit, rows, producers)
+    return secs, writer.batches
+
+def main(rows, producers):
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, n in ((f"acked, {producers} producers", producers), ("streamed", 0)):
+            print(f"{rows:,} rows, {label}")
+            for synchronous in ("NORMAL", "FULL"):
+                secs = per_row(fresh_db(tmp, f"row-{n}-{synchronous}.db"), rows, n, synchronous)
+                print(f"  synchronous={synchronous:<6} one commit per row        {rows / secs:10,.0f} rows/s")
+                for delay_ms in (0, 1, 5):
+                    path = fresh_db(tmp, f"group-{n}-{synchronous}-{delay_ms}.db")
+                    secs, batches = grouped(path, rows, n, synchronous, delay_ms)
+                    print(f"  synchronous={synchronous:<6} group commit, {delay_ms:>2} ms window "
+                          f"{rows / secs:10,.0f} rows/s  ({rows / batches:.0f} rows per commit)")
+            close_connections()
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:]]
+    main(*(args + [20_000, 64][len(args):]))
@@ -0,0 +1,101 @@
+"""Query plans and latency of the per-user, per-day log queries.
+
+Builds a throwaway database with N rows spread over many users and days, then
+times the queries the tabs run before and after the schema migrations.
+
+    python benchmarks/bench_indexes.py                 # 10k rows
+    python benchmarks/bench_indexes.py 10000 1000000 10000000
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from core.db import db_connect, migrate, setup_database
+
+QUERIES = {
+    "refresh_food_list":
+        "SELECT name, calories FROM foods WHERE user_id=? AND log_date=? ORDER BY id DESC",
+    "refresh_exercise_list":
+        "SELECT name, calories_burned FROM exercises WHERE user_id=? AND log_date=? ORDER BY id DESC",
+    "_foods_total_for_date":
+        "SELECT SUM(calories) FROM foods WHERE user_id=? AND log_date=?",
+    "refresh_progress_chart":
+        "SELECT log_date, weight_kg FROM weights WHERE user_id=? ORDER BY log_date",
+}
+
+USERS = 500
+DAYS = 3650
+REPEAT = 50
+
+def populate(conn, rows):
+    """Fills foods, exercises and weights with `rows` rows each."""
+    rnd = random.Random(42)
+    start = date(2015, 1, 1)
+    days = [(start + timedelta(days=i)).isoformat() for i in range(DAYS)]
+
+    def gen(n):
+        for _ in range(n):
+            yield rnd.randint(1, USERS), rnd.choice(days), "Item", rnd.uniform(50, 900)
+
+    batch = 100_000
+    for table, cols in (
+        ("foods", "user_id, log_date, name, calories"),
+        ("exercises", "user_id, log_date, name, calories_burned"),
+    ):
+        done = 0
+        while done < rows:
+            n = min(batch, rows - done)
+            with conn:
+                conn.executemany(f"INSERT INTO {table}({cols}) VALUES(?,?,?,?)", gen(n))
+            done += n
+    with conn:
+        conn.executemany(
+            "INSERT INTO weights(user_id, log_date, weight_kg) VALUES(?,?,?)",
+            ((u, d, k / 10) for u, d, _, k in gen(rows)),
+        )
+    return days
+
+def measure(conn, days):
+    """Prints the plan and mean latency of each query."""
+    rnd = random.Random(7)
+    for label, sql in QUERIES.items():
+        args = (1, days[0]) if "log_date=?" in sql else (1,)
+        plan = [r[3] for r in conn.execute("EXPLAIN QUERY PLAN " + sql, args)]
+        t0 = time.perf_counter()
+        for _ in range(REPEAT):
+            uid = rnd.randint(1, USERS)
+            a = (uid, rnd.choice(days)) if len(args) == 2 else (uid,)
+            conn.execute(sql, a).fetchall()
+        ms = (time.perf_counter() - t0) / REPEAT * 1000
+        print(f"  {label:<24} {ms:9.3f} ms   {' | '.join(plan)}")
+
+def run(rows):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        # Start from the unindexed baseline schema
+        setup_database(path, apply_migrations=False)
+        conn = db_connect(path)
+
+        t0 = time.perf_counter()
+        days = populate(conn, rows)
+        print(f"\n{rows:,} rows per table (populated in {time.perf_counter() - t0:.1f}s)")
+
+        print(" without indexes:")
+        measure(conn, days)
+
+        t0 = time.perf_counter()
+        migrate(conn)
+        conn.execute("ANALYZE")
+        print(f" with indexes (migration took {time.perf_counter() - t0:.1f}s):")
+        measure(conn, days)
+        conn.close()
+
+if __name__ == "__main__":
+    sizes = [int(a) for a in sys.argv[1:]] or [10_000]
+    for n in sizes:
+        run(n)
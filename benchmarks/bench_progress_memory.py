@@ -0,0 +1,68 @@
+"""Resident memory across repeated progress-chart refreshes.
+
+Compares the old pattern (a new pyplot figure per refresh, never closed) with
+the persistent WeightChart updated in place. Uses the Agg backend, so no
+display is needed.
+
+    python benchmarks/bench_progress_memory.py [refreshes]
+"""
+import os
+import resource
+import sys
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+from core.charts import WeightChart
+
+plt.rcParams["figure.max_open_warning"] = 0
+
+def rss_mb():
+    """Current resident set size in MB (Linux), falling back to the peak elsewhere."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+def series(n=365):
+    start = date(2024, 1, 1)
+    return [((start + timedelta(days=i)).isoformat(), 80 - i * 0.01) for i in range(n)]
+
+def old_refresh(rows):
+    from datetime import datetime
+    fig, ax = plt.subplots(figsize=(6.5, 3.8))
+    ax.plot([datetime.fromisoformat(d) for d, _ in rows], [w for _, w in rows], marker="o")
+    fig.autofmt_xdate()
+    fig.canvas.draw()
+
+def run(label, refresh, n):
+    samples = []
+    for i in range(n):
+        refresh()
+        if i % max(1, n // 10) == 0 or i == n - 1:
+            samples.append(rss_mb())
+    print(f"{label:<28} start {samples[0]:7.1f} MB  end {samples[-1]:7.1f} MB  "
+          f"growth {samples[-1] - samples[0]:+7.1f} MB")
+
+def main(n):
+    rows = series()
+    chart = WeightChart()
+    canvas = FigureCanvasAgg(chart.figure)
+
+    def persistent():
+        chart.set_series(rows)
+        canvas.draw()
+
+    print(f"{n} refreshes of a {len(rows)}-point series")
+    run("persistent WeightChart", persistent, n)
+    run("new pyplot figure each time", lambda: old_refresh(rows), min(n, 200))
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000)
@@ -0,0 +1,58 @@
+"""Macro pie and weight chart PNGs: drawn from scratch versus served by RenderCache.
+
+    python benchmarks/bench_render_cache.py [weigh-ins]
+
+"memory" repeats the same inputs in one process; "disk" is a fresh cache on
+the same folder, as after a restart.
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from core.charts import WeightChart, figure_png, macro_pie
+from core.render_cache import RenderCache
+
+def timed(fn, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1e3
+
+def main(points):
+    rng = random.Random(1)
+    first = date(2020, 1, 1)
+    rows = [((first + timedelta(days=i)).isoformat(), 80 + rng.gauss(0, 0.5)) for i in range(points)]
+    macro = {"protein": 30, "carb": 45, "fat": 25}
+
+    def pie():
+        return figure_png(macro_pie(macro, (4, 4), 100, "dark"))
+
+    def weight():
+        chart = WeightChart(figsize=(7, 4), dpi=180, fontname=None)
+        chart.set_series(rows)
+        return figure_png(chart.figure, tight=True)
+
+    charts = [
+        ("macro pie", ("macro_pie", [30, 45, 25], (4, 4), 100, "dark"), pie),
+        (f"weight, {points:,} pts", ("weight", rows, (7, 4), 180, "light"), weight),
+    ]
+    with tempfile.TemporaryDirectory() as tmp:
+        warm = RenderCache(tmp)
+        for label, spec, draw in charts:
+            draw()    # first draw also pays for matplotlib's font cache
+            cold = timed(draw)
+            warm.get_or_render(*spec, draw)
+            memory = timed(lambda: warm.get_or_render(*spec, draw))
+            disk = timed(lambda: RenderCache(tmp).get_or_render(*spec, draw))
+            print(f"{label:<20} render {cold:8.1f} ms   memory hit {memory:7.3f} ms   disk hit {disk:7.3f} ms")
+        print(f"stats: {warm.stats()}")
+
+if __name__ == "__main__":
+    main(*[int(a) for a in sys.argv[1:2]] or [3650])
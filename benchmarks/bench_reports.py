@@ -0,0 +1,41 @@
+"""Users/sec for the weekly report batch at different worker counts, with and without charts.
+
+    python benchmarks/bench_reports.py [users] [days]
+
+Reuses bench_analytics' filler, so every user has `days` of food, exercise and
+weight history. Each run writes to a fresh folder, so nothing is resumed.
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from bench_analytics import fill
+from core.db import close_connections, get_connection, setup_database
+from core.reports import generate_reports
+
+def main(users, days):
+    cpus = os.cpu_count() or 1
+    counts = sorted({1, 2, 4, cpus})
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        setup_database(path)
+        _, end = fill(get_connection(path), users, days)
+        close_connections()
+        print(f"{users} users x {days} days, {cpus} CPUs")
+        for charts in (False, True):
+            base = None
+            for workers in counts:
+                out = os.path.join(tmp, f"out-{charts}-{workers}")
+                t0 = time.perf_counter()
+                generate_reports(path, out, end, workers=workers, charts=charts)
+                rate = users / (time.perf_counter() - t0)
+                base = base or rate
+                print(f"  {'charts' if charts else 'no charts':<9} {workers:>2} workers {rate:8.1f} users/s "
+                      f"({rate / base:.1f}x)")
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:]]
+    main(*(args + [200, 365][len(args):]))
@@ -0,0 +1,71 @@
+"""FTS5 log search versus a LIKE '%x%' scan as the log grows.
+
+    python benchmarks/bench_search.py [rows ...]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from core.db import close_connections, deferred_search_index, get_connection, setup_database
+from core.search import KINDS, _search_like, search_logs
+
+WORDS = (
+    "rice white brown chicken breast curry dal lentil paneer tikka masala roti naan bread egg omelette "
+    "milk tea coffee banana apple yogurt salad soup pasta pizza burger fries oats honey almond peanut"
+).split()
+
+QUERIES = [
+    ("common word, newest first", dict(text="rice")),
+    ("common word, best match", dict(text="rice", order="rank")),
+    ("two words, one user", dict(text="paneer tik", user_id=3)),
+    ("rare word", dict(text="zucchini")),
+    ("common word, one month", dict(text="chicken", start="2023-03-01", end="2023-03-31")),
+]
+
+def fill(conn, n, seed=1):
+    rng = random.Random(seed)
+    days = [f"{2020 + i // 365}-{(i // 30) % 12 + 1:02d}-{i % 28 + 1:02d}" for i in range(365 * 4)]
+    with conn:
+        conn.execute("BEGIN")
+        conn.executemany(
+            "INSERT INTO users(name) VALUES(?)", [(f"user{i}",) for i in range(1, 21)]
+        )
+        rows = (
+            (rng.randint(1, 20), rng.choice(days), " ".join(rng.sample(WORDS, rng.randint(1, 3))), rng.randint(50, 900))
+            for _ in range(n)
+        )
+        with deferred_search_index(conn):
+            conn.executemany("INSERT INTO foods(user_id, log_date, name, calories) VALUES(?,?,?,?)", rows)
+        conn.execute("INSERT INTO foods(user_id, log_date, name, calories) VALUES(1, '2021-05-05', 'zucchini fritters', 220)")
+
+def timed(fn, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1e3
+
+def main(sizes):
+    for n in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "bench.db")
+            setup_database(path)
+            conn = get_connection(path)
+            t0 = time.perf_counter()
+            fill(conn, n)
+            print(f"{n:,} foods (inserted and indexed in {time.perf_counter() - t0:.1f} s)")
+            for label, q in QUERIES:
+                fts = timed(lambda: search_logs(conn, **q))
+                like = timed(lambda: _search_like(
+                    conn, q["text"], q.get("user_id"), q.get("start"), q.get("end"), KINDS, 0, 50
+                ), repeat=1)
+                print(f"  {label:<28} fts {fts:8.2f} ms   like {like:8.2f} ms")
+            close_connections()
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or [100_000, 1_000_000])
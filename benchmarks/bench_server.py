@@ -0,0 +1,120 @@
+"""Load test for the HTTP/JSON server: many keep-alive clients against a fresh database.
+
+    python benchmarks/bench_server.py [clients ...] [--requests N] [--writes FRACTION]
+
+The server runs in its own process (`python -m core serve --port 0`), so the
+clients' event loop doesn't share a GIL with it. Each client keeps one
+connection open and sends requests back to back: the given share are POSTs of
+food entries, the rest a mix of day summaries and food list pages.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+sys.path.insert(0, ROOT)
+
+from core.db import close_connections, get_connection, setup_database
+
+USERS = 50
+
+def fill(path):
+    setup_database(path)
+    conn = get_connection(path)
+    with conn:
+        conn.executemany(
+            "INSERT INTO users(name, gender, age, height_cm, weight_kg, activity, goal) "
+            "VALUES(?, 'Female', 35, 165, 68, 'Moderate', 'Maintain')",
+            [(f"user{i}",) for i in range(1, USERS + 1)],
+        )
+    close_connections()
+
+def start_server(path):
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "core", "--db", path, "serve", "--port", "0"],
+        cwd=ROOT, stdout=subprocess.PIPE, text=True,
+    )
+    line = proc.stdout.readline()
+    host, port = line.rsplit("/", 1)[1].strip().split(":")
+    return proc, host, int(port)
+
+async def request(reader, writer, method, path, body=None):
+    payload = json.dumps(body).encode() if body is not None else b""
+    writer.write(
+        f"{method} {path} HTTP/1.1\r\nHost: bench\r\nContent-Length: {len(payload)}\r\n\r\n".encode() + payload
+    )
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        h = await reader.readline()
+        if h == b"\r\n":
+            break
+        name, _, value = h.decode().partition(":")
+        if name.lower() == "content-length":
+            length = int(value)
+    await reader.readexactly(length)
+    return status
+
+async def client(host, port, n, write_share, seed, lat):
+    rng = random.Random(seed)
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for _ in range(n):
+            uid = rng.randint(1, USERS)
+            if rng.random() < write_share:
+                kind, args = "write", ("POST", f"/users/{uid}/foods", {"name": "oats", "kcal": rng.randint(100, 600)})
+            elif rng.random() < 0.5:
+                kind, args = "read", ("GET", f"/users/{uid}/summary")
+            else:
+                kind, args = "read", ("GET", f"/users/{uid}/foods?limit=50")
+            t0 = time.perf_counter()
+            status = await request(reader, writer, *args)
+            lat[kind].append(time.perf_counter() - t0)
+            if status >= 400:
+                lat["errors"].append(status)
+    finally:
+        writer.close()
+
+def pct(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p / 100 * len(values)))] * 1e3 if values else float("nan")
+
+async def run(host, port, clients, n, write_share):
+    lat = {"read": [], "write": [], "errors": []}
+    t0 = time.perf_counter()
+    await asyncio.gather(*(client(host, port, n, write_share, i, lat) for i in range(clients)))
+    return lat, time.perf_counter() - t0
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("clients", type=int, nargs="*", default=[50, 200, 500])
+    parser.add_argument("--requests", type=int, default=50, help="per client")
+    parser.add_argument("--writes", type=float, default=0.2, help="share of requests that are writes")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        fill(path)
+        proc, host, port = start_server(path)
+        try:
+            for c in args.clients:
+                lat, secs = asyncio.run(run(host, port, c, args.requests, args.writes))
+                total = len(lat["read"]) + len(lat["write"])
+                print(f"{c} clients, {total:,} requests in {secs:.2f} s ({total / secs:,.0f} req/s), "
+                      f"{len(lat['errors'])} errors")
+                for kind in ("read", "write"):
+                    print(f"  {kind:<6} p50 {pct(lat[kind], 50):7.1f} ms   p99 {pct(lat[kind], 99):7.1f} ms"
+                          f"   max {pct(lat[kind], 100):7.1f} ms")
+        finally:
+            proc.terminate()
+            proc.wait()
+
+if __name__ == "__main__":
+    main()
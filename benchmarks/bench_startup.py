@@ -0,0 +1,87 @@
+"""Startup cost: import time of the UI package and time to the first drawn frame.
+
+    python benchmarks/bench_startup.py [--record]
+
+Import time comes from `python -X importtime`. Time to first frame builds the
+app against a scratch database and waits until the window is mapped; it needs
+a display and is reported as n/a without one. --record appends the result to
+benchmarks/startup_history.csv so regressions show up in review.
+"""
+import csv
+import os
+import subprocess
+import sys
+import tempfile
+from datetime import datetime
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+HISTORY = os.path.join(ROOT, "benchmarks", "startup_history.csv")
+
+FIRST_FRAME = """
+import time
+t0 = time.perf_counter()
+import core.db
+core.db.DB_FILE = {db!r}
+from core.db import setup_database
+from ui.main_app import CalorieProApp
+setup_database()
+app = CalorieProApp()
+app.wait_visibility()
+app.update()
+print(time.perf_counter() - t0)
+app.on_close()
+"""
+
+def import_times(module="ui.main_app"):
+    """Returns (total ms, [(cumulative ms, module)] of the slowest top-level imports)."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # Top-level imports have no extra indentation in the package column
+        if not name.startswith("   "):
+            rows.append((int(cumulative) / 1000, name.strip()))
+    total = sum(ms for ms, _ in rows)
+    return total, sorted(rows, reverse=True)[:10]
+
+def first_frame_ms():
+    with tempfile.TemporaryDirectory() as tmp:
+        code = FIRST_FRAME.format(db=os.path.join(tmp, "bench.db"))
+        proc = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True)
+    if proc.returncode != 0:
+        return None
+    return float(proc.stdout.strip().splitlines()[-1]) * 1000
+
+def git_rev():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True
+        ).stdout.strip()
+    except OSError:
+        return ""
+
+def main(record):
+    total, slowest = import_times()
+    frame = first_frame_ms()
+    print(f"import ui.main_app: {total:.1f} ms")
+    for ms, name in slowest:
+        print(f"  {ms:8.1f} ms  {name}")
+    print(f"time to first frame: {'n/a (no display)' if frame is None else f'{frame:.1f} ms'}")
+    if record:
+        new = not os.path.exists(HISTORY)
+        with open(HISTORY, "a", newline="", encoding="utf-8") as f:
+            w = csv.writer(f)
+            if new:
+                w.writerow(["date", "commit", "python", "import_ms", "first_frame_ms"])
+            w.writerow([
+                datetime.now().strftime("%Y-%m-%d"), git_rev(), sys.version.split()[0],
+                f"{total:.1f}", "" if frame is None else f"{frame:.1f}",
+            ])
+
+if __name__ == "__main__":
+    main("--record" in sys.argv[1:])
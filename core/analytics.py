@@ -0,0 +1,163 @@
+"""Multi-day trends over the daily_totals rollup, the target timeline and the weight log.
+
+Everything is computed on a dense day grid with NumPy. A rolling window is a
+difference of two cumulative sums, so the 7, 30 and 90-day figures for a
+ten-year range cost a handful of array operations. Loading a range takes three
+queries (the rollup, the targets history and the weights), never one per day.
+
+A day with no log entries counts as not logged rather than as zero intake, so
+averages and adherence are taken over logged days only.
+"""
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+
+import numpy as np
+
+from core.rollup import range_totals
+from core.targets import load_timeline
+
+WINDOWS = (7, 30, 90)
+# A logged day is on target when its net intake is within this share of the target
+ADHERENCE_TOLERANCE = 0.10
+# Weight trend smoothing: each day moves the average this share of the way to the scale reading
+EMA_ALPHA = 0.1
+
+ROLLING_FIELDS = ("intake", "burn", "net", "adherence", "weight_slope")
+
+@dataclass
+class Trends:
+    dates: np.ndarray          # datetime64[D], one per day from start to end
+    food: np.ndarray           # kcal per day, 0 where nothing was logged
+    burned: np.ndarray
+    net: np.ndarray
+    logged: np.ndarray         # bool, the day has at least one entry
+    target: np.ndarray         # target in effect that day, NaN before the first
+    weight: np.ndarray         # the day's weigh-in, NaN on other days
+    weight_ema: np.ndarray     # smoothed weight, NaN before the first weigh-in
+    rolling: dict = field(default_factory=dict)  # window -> {ROLLING_FIELDS name: array}; slope in kg/week
+    slope_kg_week: float = float("nan")          # least-squares weight slope over the whole range
+
+    def __len__(self):
+        return len(self.dates)
+
+    def summary(self, i=-1):
+        """{window: {name: value}} for day i (the last day by default); NaN where there is no data."""
+        return {w: {name: float(a[i]) for name, a in cols.items()} for w, cols in self.rolling.items()}
+
+def _rolling_sum(a, window):
+    c = np.concatenate(([0.0], np.cumsum(a, dtype=np.float64)))
+    idx = np.arange(1, len(a) + 1)
+    return c[idx] - c[np.maximum(idx - window, 0)]
+
+def _ratio(num, den):
+    return np.divide(num, den, out=np.full(len(num), np.nan), where=den > 0)
+
+def _slope(t, y, m, window=None):
+    """Least-squares slope of y over t using the points where m is set; per trailing window if given."""
+    total = (lambda a: _rolling_sum(a, window)) if window else (lambda a: np.array([a.sum()]))
+    yz = np.where(m, y, 0.0)
+    tm = t * m
+    n, st, sy = total(m.astype(np.float64)), total(tm), total(yz)
+    stt, sty = total(tm * t), total(tm * yz)
+    den = n * stt - st * st
+    return _ratio(n * sty - st * sy, np.where(n >= 2, den, 0.0))
+
+def ema(y, alpha=EMA_ALPHA):
+    """Exponential moving average of a gap-free series, starting from y[0].
+
+    Uses the closed form e_j = d**j * (d * e_-1 + alpha * sum(x_i / d**i)) with
+    d = 1 - alpha, evaluated in blocks short enough that d**-i stays finite.
+    """
+    out = np.empty(len(y))
+    if not len(y):
+        return out
+    decay = 1.0 - alpha
+    block = max(1, int(100 / -np.log10(decay)))
+    prev = y[0]
+    for s in range(0, len(y), block):
+        x = y[s:s + block]
+        powers = decay ** np.arange(len(x))
+        out[s:s + len(x)] = powers * (decay * prev + alpha * np.cumsum(x / powers))
+        prev = out[s + len(x) - 1]
+    return out
+
+def compute_trends(dates, food, burned, logged, target, weight, windows=WINDOWS, skip=0):
+    """Trends from dense per-day arrays; the first `skip` days only warm up the windows and are dropped."""
+    food = np.asarray(food, dtype=np.float64)
+    burned = np.asarray(burned, dtype=np.float64)
+    logged = np.asarray(logged, dtype=bool)
+    target = np.asarray(target, dtype=np.float64)
+    weight = np.asarray(weight, dtype=np.float64)
+    net = food - burned
+    t = np.arange(len(food), dtype=np.float64)
+
+    has_target = logged & ~np.isnan(target)
+    on_target = has_target & (np.abs(net - np.nan_to_num(target)) <= ADHERENCE_TOLERANCE * np.nan_to_num(target))
+    measured = ~np.isnan(weight)
+    days_logged = logged.astype(np.float64)
+
+    rolling = {}
+    for w in windows:
+        count = _rolling_sum(days_logged, w)
+        rolling[w] = {
+            "intake": _ratio(_rolling_sum(food * logged, w), count),
+            "burn": _ratio(_rolling_sum(burned * logged, w), count),
+            "net": _ratio(_rolling_sum(net * logged, w), count),
+            "adherence": _ratio(_rolling_sum(on_target.astype(np.float64), w), _rolling_sum(has_target.astype(np.float64), w)),
+            "weight_slope": _slope(t, weight, measured, w) * 7,
+        }
+
+    # Carry each weigh-in forward to the next one, then smooth from the first
+    trend = np.full(len(weight), np.nan)
+    if measured.any():
+        last = np.maximum.accumulate(np.where(measured, np.arange(len(weight)), 0))
+        first = int(np.argmax(measured))
+        trend[first:] = ema(weight[last][first:])
+
+    keep = slice(skip, None)
+    return Trends(
+        dates=np.asarray(dates)[keep],
+        food=food[keep], burned=burned[keep], net=net[keep], logged=logged[keep],
+        target=target[keep], weight=weight[keep], weight_ema=trend[keep],
+        rolling={w: {k: a[keep] for k, a in cols.items()} for w, cols in rolling.items()},
+        slope_kg_week=float(_slope(t[keep], weight[keep], measured[keep])[0] * 7),
+    )
+
+def load_trends(conn, user_id, start, end, windows=WINDOWS):
+    """Reads what compute_trends needs for [start, end] in one transaction and returns Trends."""
+    lookback = max(windows) - 1
+    first = (date.fromisoformat(start) - timedelta(days=lookback)).isoformat()
+    with conn:
+        conn.execute("BEGIN")
+        totals = range_totals(conn, user_id, first, end)
+        timeline = load_timeline(conn, user_id, end)
+        weights = conn.execute(
+            "SELECT log_date, weight_kg FROM weights WHERE user_id=? AND log_date BETWEEN ? AND ? "
+            "ORDER BY log_date, id",
+            (user_id, first, end),
+        ).fetchall()
+
+    day0 = np.datetime64(first, "D")
+    dates = np.arange(day0, np.datetime64(end, "D") + 1)
+    n = len(dates)
+    food, burned, logged = np.zeros(n), np.zeros(n), np.zeros(n, dtype=bool)
+    if totals:
+        d, f, b, count = zip(*totals)
+        idx = (np.array(d, dtype="datetime64[D]") - day0).astype(np.int64)
+        food[idx], burned[idx], logged[idx] = f, b, np.array(count) > 0
+
+    target = np.full(n, np.nan)
+    if len(timeline):
+        pos = np.searchsorted(np.array(timeline.dates, dtype="datetime64[D]"), dates, side="right") - 1
+        values = np.array([np.nan if t["target"] is None else t["target"] for t in timeline.targets])
+        target = np.where(pos >= 0, values[np.maximum(pos, 0)], np.nan)
+
+    weight = np.full(n, np.nan)
+    if weights:
+        idx = (np.array([r[0][:10] for r in weights], dtype="datetime64[D]") - day0).astype(np.int64)
+        # Several weigh-ins on one day: the last one logged counts
+        _, last = np.unique(idx[::-1], return_index=True)
+        keep = len(idx) - 1 - last
+        weight[idx[keep]] = np.array([r[1] for r in weights], dtype=np.float64)[keep]
+
+    return compute_trends(dates, food, burned, logged, target, weight, windows, skip=lookback)
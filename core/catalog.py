@@ -0,0 +1,234 @@
+"""Food catalogue and the in-memory index behind the food name autocomplete.
+
+food_catalog (see core.db migration 5) holds one row per distinct food name.
+A trigger adds every logged food to it. load_dataset() merges an optional
+nutrient dataset with per-serving kcal and macros.
+
+FoodIndex answers a keystroke without touching the database. Names are kept in
+a sorted list, so a prefix lookup is a bisect plus a short scan. A word and
+trigram index catches matches in the middle of a name and small typos when the
+prefix finds too little. New foods are inserted in place, so the index never
+needs a full rebuild after the first load.
+"""
+import os
+from array import array
+from bisect import bisect_left, insort
+from dataclasses import dataclass
+
+from core.db import KEY_SPACES, name_key
+from core.importer import read_records
+
+# Optional nutrient dataset shipped next to the code: name,kcal[,serving,protein_g,carb_g,fat_g]
+DATASET_FILE = os.path.join(os.path.dirname(__file__), "data", "foods.csv")
+
+# Prefix matches looked at before ranking by use count
+PREFIX_SCAN = 200
+# Items a fuzzy query scores, taken from the postings of its rarest word
+FUZZY_CANDIDATES = 300
+# Share of a typed word's trigrams another word must contain to count as a match
+FUZZY_MIN_SCORE = 0.5
+
+@dataclass(slots=True)
+class CatalogItem:
+    id: int
+    name: str
+    kcal: float = None
+    serving: str = None
+    protein_g: float = None
+    carb_g: float = None
+    fat_g: float = None
+    uses: int = 0
+    source: str = "history"
+
+def _trigrams(word):
+    padded = f" {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+class FoodIndex:
+    """Sorted names for prefix lookups, plus a word index for inner-word and misspelt matches.
+
+    Food names share a small vocabulary ("chicken", "rice", ...), so the fuzzy
+    side indexes words rather than whole names: each word maps to the items
+    containing it, and word trigrams map to words. That keeps the build close
+    to linear in the number of items and a query bounded by the vocabulary.
+    """
+    def __init__(self, items=()):
+        self.items = {}        # id -> CatalogItem
+        self.by_key = {}       # name_key -> id
+        self.postings = {}     # word -> array of item ids
+        self._next_local_id = -1
+        pairs = []
+        for item in items:
+            key = name_key(item.name)
+            self.items[item.id] = item
+            self.by_key[key] = item.id
+            pairs.append((key, item.id))
+            for w in set(key.split()):
+                posting = self.postings.get(w)
+                if posting is None:
+                    posting = self.postings[w] = array("i")
+                posting.append(item.id)
+        pairs.sort()
+        self.keys = [k for k, _ in pairs]        # sorted name keys
+        self.key_ids = [i for _, i in pairs]     # ids, parallel to keys
+        self.vocab = sorted(self.postings)       # sorted words
+        self.word_grams = {}                     # trigram -> set of words
+        for w in self.vocab:
+            self._index_word(w)
+
+    def __len__(self):
+        return len(self.items)
+
+    def _index_word(self, word):
+        for g in _trigrams(word):
+            self.word_grams.setdefault(g, set()).add(word)
+
+    def get(self, name):
+        """The CatalogItem for an exact (case-insensitive) name, or None."""
+        item_id = self.by_key.get(name_key(name))
+        return None if item_id is None else self.items[item_id]
+
+    def add(self, item):
+        """Adds or replaces an item; a bisect plus one list insert per new name and new word."""
+        key = name_key(item.name)
+        old = self.by_key.get(key)
+        if old is not None:
+            # Same name: keep its slot in the sorted list and word postings
+            item.id = old
+            self.items[old] = item
+            return item
+        self.items[item.id] = item
+        self.by_key[key] = item.id
+        i = bisect_left(self.keys, key)
+        self.keys.insert(i, key)
+        self.key_ids.insert(i, item.id)
+        for w in set(key.split()):
+            posting = self.postings.get(w)
+            if posting is None:
+                posting = self.postings[w] = array("i")
+                insort(self.vocab, w)
+                self._index_word(w)
+            posting.append(item.id)
+        return item
+
+    def logged(self, name, kcal):
+        """Mirrors trg_foods_catalog_ins for a food just logged from this process."""
+        item = self.get(name)
+        if item is None:
+            item_id, self._next_local_id = self._next_local_id, self._next_local_id - 1
+            return self.add(CatalogItem(item_id, name.strip(KEY_SPACES), kcal, uses=1))
+        item.uses += 1
+        if item.source == "history":
+            item.kcal = kcal
+        return item
+
+    def prefix(self, text, limit=8):
+        """Items whose name starts with `text`, most used first."""
+        key = name_key(text)
+        if not key:
+            return []
+        i = bisect_left(self.keys, key)
+        found = []
+        for j in range(i, min(i + PREFIX_SCAN, len(self.keys))):
+            if not self.keys[j].startswith(key):
+                break
+            found.append(self.items[self.key_ids[j]])
+        found.sort(key=lambda item: -item.uses)
+        return found[:limit]
+
+    def _matching_words(self, token):
+        # Words starting with the token, plus (for 3+ letters) words sharing most of its trigrams
+        words = set()
+        i = bisect_left(self.vocab, token)
+        for j in range(i, min(i + PREFIX_SCAN, len(self.vocab))):
+            if not self.vocab[j].startswith(token):
+                break
+            words.add(self.vocab[j])
+        if len(token) >= 3:
+            grams = _trigrams(token)
+            shared = {}
+            for g in grams:
+                for w in self.word_grams.get(g, ()):
+                    shared[w] = shared.get(w, 0) + 1
+            words.update(w for w, n in shared.items() if n / len(grams) >= FUZZY_MIN_SCORE)
+        return words
+
+    def fuzzy(self, text, limit=8, exclude=()):
+        """Items whose words match the typed words by prefix or by trigram similarity."""
+        tokens = name_key(text).split()
+        matches = [m for m in map(self._matching_words, tokens) if m]
+        if not matches:
+            return []
+        # Candidates come from the rarest typed word; the others only score them
+        matches.sort(key=lambda words: sum(len(self.postings[w]) for w in words))
+        candidates = []
+        for w in matches[0]:
+            candidates.extend(self.postings[w][:FUZZY_CANDIDATES - len(candidates)])
+            if len(candidates) >= FUZZY_CANDIDATES:
+                break
+        scored = []
+        for item_id in set(candidates):
+            item = self.items.get(item_id)
+            if item is None or item_id in exclude:
+                continue
+            score = 0
+            if len(matches) > 1:
+                words = set(name_key(item.name).split())
+                score = sum(1 for m in matches[1:] if words & m)
+            scored.append((-score, -item.uses, item_id))
+        scored.sort()
+        return [self.items[i] for _, _, i in scored[:limit]]
+
+    def search(self, text, limit=8):
+        """Prefix matches, topped up with fuzzy matches when there are fewer than `limit`."""
+        found = self.prefix(text, limit)
+        if len(found) < limit:
+            seen = {item.id for item in found}
+            found += self.fuzzy(text, limit - len(found), exclude=seen)
+        return found
+
+def load_index(conn):
+    """Reads the whole catalogue into a FoodIndex."""
+    cur = conn.execute(
+        "SELECT id, name, kcal, serving, protein_g, carb_g, fat_g, uses, source FROM food_catalog"
+    )
+    return FoodIndex(CatalogItem(*r) for r in cur)
+
+def _number(record, *names):
+    for n in names:
+        v = record.get(n)
+        if v not in (None, ""):
+            return float(v)
+    return None
+
+def load_dataset(conn, path=DATASET_FILE, fmt=None):
+    """Merges a CSV/JSONL nutrient dataset into food_catalog and returns the number of rows merged.
+
+    Rows need name and kcal; serving, protein_g, carb_g and fat_g are optional.
+    Dataset values replace the kcal learnt from the log for the same name.
+    """
+    rows = []
+    for _, record in read_records(path, fmt):
+        if isinstance(record, ValueError) or not name_key(record.get("name") or ""):
+            continue
+        try:
+            kcal = _number(record, "kcal", "calories")
+            macros = [_number(record, c) for c in ("protein_g", "carb_g", "fat_g")]
+        except ValueError:
+            continue
+        if kcal is None:
+            continue
+        name = record["name"].strip(KEY_SPACES)
+        rows.append((name, name_key(name), kcal, record.get("serving") or None, *macros))
+    with conn:
+        conn.executemany(
+            """
+            INSERT INTO food_catalog(name, name_key, kcal, serving, protein_g, carb_g, fat_g, source)
+            VALUES (?,?,?,?,?,?,?,'dataset')
+            ON CONFLICT(name_key) DO UPDATE SET
+                name = excluded.name, kcal = excluded.kcal, serving = excluded.serving, protein_g = excluded.protein_g,
+                carb_g = excluded.carb_g, fat_g = excluded.fat_g, source = 'dataset'
+            """,
+            rows,
+        )
+    return len(rows)
@@ -0,0 +1,139 @@
+"""Charts that keep one Figure alive and update their artists in place.
+
+Figures are created with matplotlib.figure.Figure rather than pyplot, so they
+are never registered with pyplot's global figure manager and are freed as
+soon as the owning tab drops them.
+"""
+from io import BytesIO
+
+import matplotlib.dates as mdates
+import numpy as np
+from matplotlib.figure import Figure
+
+from core.series import WeightSeries
+
+# Above this many visible points the markers just smear into the line
+MARKER_LIMIT = 120
+
+# Colours for charts drawn as images, by appearance mode. Changes to how macro_pie,
+# WeightChart or figure_png draw must bump core.render_cache.RENDER_VERSION.
+THEMES = {
+    "light": {"face": "white", "text": "black"},
+    "dark": {"face": "#2b2b2b", "text": "#dce4ee"},
+}
+
+def macro_pie(macro, figsize=(4, 4), dpi=100, theme="light"):
+    """Pie of a {"protein", "carb", "fat"} percentage split."""
+    colors = THEMES[theme]
+    p, c, f = macro.get("protein", 30), macro.get("carb", 45), macro.get("fat", 25)
+    fig = Figure(figsize=figsize, dpi=dpi, facecolor=colors["face"])
+    ax = fig.add_subplot()
+    ax.pie([p, c, f], labels=[f"Protein {p}%", f"Carbs {c}%", f"Fat {f}%"], autopct="%1.0f%%", startangle=90,
+           textprops={"color": colors["text"]})
+    ax.set_title("Macro Split", color=colors["text"])
+    return fig
+
+def figure_png(fig, dpi=None, tight=False):
+    """Renders a Figure to PNG bytes."""
+    buf = BytesIO()
+    fig.savefig(buf, format="png", dpi=dpi or fig.dpi, facecolor=fig.get_facecolor(),
+                bbox_inches="tight" if tight else None)
+    return buf.getvalue()
+
+class WeightChart:
+    def __init__(self, figsize=(6.5, 3.8), dpi=100, window_days=7, fontname="Arial"):
+        self.figure = Figure(figsize=figsize, dpi=dpi)
+        self.ax = self.figure.add_subplot()
+        self.ax.xaxis_date()
+        (self.line,) = self.ax.plot([], [], marker="o", label="Weight")
+        (self.avg_line,) = self.ax.plot([], [], linewidth=2, alpha=0.7, label=f"{window_days}-day average")
+        font = {"fontname": fontname} if fontname else {}
+        self.ax.set_title("Weight Progress", fontsize=14, **font)
+        self.ax.set_xlabel("Date", fontsize=12, **font)
+        self.ax.set_ylabel("Weight (kg)", fontsize=12, **font)
+        self.ax.legend(loc="upper right")
+        self.figure.autofmt_xdate()
+        self.series = WeightSeries(window_days=window_days)
+        self._zoomed = False
+        self._updating = False
+        self.ax.callbacks.connect("xlim_changed", self._on_xlim_changed)
+
+    def __len__(self):
+        return len(self.series)
+
+    def max_points(self):
+        """About one point per horizontal pixel of the axes."""
+        width_in = self.figure.get_figwidth() * self.ax.get_position().width
+        return max(int(width_in * self.figure.dpi), 3)
+
+    def set_series(self, rows):
+        """Replaces the plotted data with [(log_date, weight_kg)] rows."""
+        self.series = WeightSeries(rows, window_days=self.series.window_days)
+        self._zoomed = False
+        self._update(rescale=True)
+
+    def add_point(self, log_date, weight_kg):
+        """Adds one entry in date order without re-reading the series."""
+        self.series.add(log_date, weight_kg)
+        self._update(rescale=not self._zoomed)
+
+    def _update(self, rescale, start=None, end=None):
+        x, y, avg = self.series.view(self.max_points(), start, end)
+        xs = mdates.date2num(x) if len(x) else []
+        self.line.set_data(xs, y)
+        self.line.set_marker("o" if len(x) <= MARKER_LIMIT else "")
+        self.avg_line.set_data(xs, avg)
+        if rescale:
+            self._updating = True
+            try:
+                self.ax.relim()
+                self.ax.autoscale_view()
+            finally:
+                self._updating = False
+
+    def _on_xlim_changed(self, ax):
+        # Zoom/pan from the toolbar: re-reduce the full-resolution data for the new range
+        if self._updating or not len(self.series):
+            return
+        lo, hi = ax.get_xlim()
+        start = mdates.num2date(lo).replace(tzinfo=None)
+        end = mdates.num2date(hi).replace(tzinfo=None)
+        first, last = self.series.x[0], self.series.x[-1]
+        self._zoomed = start > first.astype("O") or end < last.astype("O")
+        self._update(rescale=False, start=start, end=end)
+
+class TrendsChart:
+    """Net intake against target over a range, with rolling averages, above the weight trend."""
+    def __init__(self, figsize=(7.5, 4.6), dpi=100, windows=(7, 30), fontname="Arial"):
+        self.windows = windows
+        self.figure = Figure(figsize=figsize, dpi=dpi)
+        self.ax_net, self.ax_weight = self.figure.subplots(2, 1, sharex=True)
+        font = {"fontname": fontname} if fontname else {}
+        (self.net_line,) = self.ax_net.plot([], [], linewidth=0.8, alpha=0.35, label="Net")
+        self.avg_lines = {
+            w: self.ax_net.plot([], [], linewidth=2, label=f"{w}-day average")[0] for w in windows
+        }
+        (self.target_line,) = self.ax_net.plot([], [], linestyle="--", color="gray", label="Target")
+        self.ax_net.set_ylabel("kcal", fontsize=11, **font)
+        self.ax_net.set_title("Net Intake", fontsize=13, **font)
+        self.ax_net.legend(loc="upper right", fontsize=8)
+        (self.weight_dots,) = self.ax_weight.plot([], [], marker="o", markersize=3, linestyle="", label="Weigh-ins")
+        (self.ema_line,) = self.ax_weight.plot([], [], linewidth=2, label="Trend")
+        self.ax_weight.set_ylabel("Weight (kg)", fontsize=11, **font)
+        self.ax_weight.legend(loc="upper right", fontsize=8)
+        self.ax_weight.xaxis_date()
+        self.figure.autofmt_xdate()
+
+    def set_trends(self, trends):
+        """Plots a core.analytics.Trends."""
+        xs = mdates.date2num(trends.dates.astype("datetime64[s]")) if len(trends) else []
+        net = np.where(trends.logged, trends.net, np.nan)
+        self.net_line.set_data(xs, net)
+        for w, line in self.avg_lines.items():
+            line.set_data(xs, trends.rolling[w]["net"] if w in trends.rolling else [])
+        self.target_line.set_data(xs, trends.target)
+        self.weight_dots.set_data(xs, trends.weight)
+        self.ema_line.set_data(xs, trends.weight_ema)
+        for ax in (self.ax_net, self.ax_weight):
+            ax.relim()
+            ax.autoscale_view()
@@ -0,0 +1,479 @@
+"""Headless command-line interface: `python -m core <command> ...`.
+
+Everything here runs on the core layer only; customtkinter and matplotlib are
+never imported, so each invocation starts in milliseconds and can be called
+in a loop from scripts and scheduled jobs.
+"""
+import argparse
+import json
+import os
+import sqlite3
+import sys
+from datetime import date, timedelta
+
+from core import catalog, columnar, search, store
+from core.db import DB_FILE, get_connection, setup_database
+from core.export import EXPORT_TABLES, export_day_csv, export_range
+from core.importer import DEFAULT_BATCH_SIZE, TABLES, RowError, import_file
+from core.helpers import ACTIVITY_FACTORS, bmi_category, check_date, today_str
+from core.rollup import day_totals, range_totals, rebuild_daily_totals, verify_daily_totals
+from core.targets import compute_targets, get_targets, load_timeline
+
+class CLIError(Exception):
+    """A problem with the command's input, reported without a traceback."""
+
+def _date(value):
+    try:
+        return check_date(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError("date must be YYYY-MM-DD")
+
+def _resolve_user(conn, args):
+    if args.user_id is not None:
+        if store.get_profile(conn, args.user_id) is None:
+            raise CLIError(f"no profile with id {args.user_id}")
+        return args.user_id
+    if args.user:
+        uid = store.user_id_by_name(conn, args.user)
+        if uid is None:
+            raise CLIError(f"no profile named {args.user!r}")
+        return uid
+    raise CLIError("pass --user NAME or --user-id ID")
+
+def _emit(args, data, text):
+    print(json.dumps(data) if args.json else text)
+
+def calculate(gender, weight, height, age, activity, goal, macro=None):
+    """Same numbers as the Calculator tab, as a dict."""
+    r = compute_targets(gender, weight, height, age, activity, goal, macro)
+    return dict(r, goal=goal, bmi_category=bmi_category(r["bmi"]))
+
+def cmd_users(conn, args):
+    names = store.user_names(conn)
+    _emit(args, names, "\n".join(names))
+
+def cmd_log_food(conn, args):
+    uid = _resolve_user(conn, args)
+    new_id = store.add_food(conn, uid, args.date, args.name, args.kcal)
+    _emit(args, {"id": new_id}, f"Logged {args.name} ({args.kcal:.0f} kcal) on {args.date}")
+
+def cmd_log_exercise(conn, args):
+    uid = _resolve_user(conn, args)
+    new_id = store.add_exercise(conn, uid, args.date, args.name, args.kcal)
+    _emit(args, {"id": new_id}, f"Logged {args.name} ({args.kcal:.0f} kcal burned) on {args.date}")
+
+def cmd_log_weight(conn, args):
+    uid = _resolve_user(conn, args)
+    new_id = store.add_weight(conn, uid, args.date, args.weight)
+    _emit(args, {"id": new_id}, f"Logged {args.weight} kg on {args.date}")
+
+def _summary(conn, uid, name, d):
+    food, burned, entries = day_totals(conn, uid, d)
+    return {"user": name, "date": d, "food_kcal": food, "burned_kcal": burned,
+            "net_kcal": food - burned, "entries": entries}
+
+def cmd_summary(conn, args):
+    if args.all:
+        users = conn.execute("SELECT id, name FROM users ORDER BY id").fetchall()
+    else:
+        uid = _resolve_user(conn, args)
+        users = [(uid, store.get_profile(conn, uid)["name"])]
+    rows = [_summary(conn, uid, name, args.date) for uid, name in users]
+    text = "\n".join(
+        f"{r['user']} {r['date']}: food {r['food_kcal']:.0f} kcal • burned {r['burned_kcal']:.0f} kcal"
+        f" • net {r['net_kcal']:.0f} kcal ({r['entries']} entries)"
+        for r in rows
+    )
+    _emit(args, rows if args.all else rows[0], text)
+
+def cmd_report(conn, args):
+    uid = _resolve_user(conn, args)
+    start, end = args.start, args.end or today_str()
+    if start > end:
+        raise CLIError("--from must not be after --to")
+    # Two queries for any range: the daily rollup and the target timeline
+    totals = {d: (food, burned) for d, food, burned, _ in range_totals(conn, uid, start, end)}
+    timeline = load_timeline(conn, uid, end)
+    rows = []
+    for d, t in timeline.over(start, end):
+        food, burned = totals.get(d, (0.0, 0.0))
+        target = t["target"] if t else None
+        rows.append({"date": d, "target": target, "food_kcal": food, "burned_kcal": burned,
+                     "net_kcal": food - burned,
+                     "vs_target": None if target is None else food - burned - target})
+    _emit(args, rows, "\n".join(
+        f"{r['date']}: net {r['net_kcal']:.0f} kcal"
+        + (f" • target {r['target']:.0f} kcal • {r['vs_target']:+.0f}" if r["target"] is not None else " • no target")
+        for r in rows
+    ))
+
+def cmd_trends(conn, args):
+    # numpy is only loaded for this command
+    from core.analytics import load_trends
+
+    uid = _resolve_user(conn, args)
+    end = args.end or today_str()
+    start = args.start or (date.fromisoformat(end) - timedelta(days=89)).isoformat()
+    if start > end:
+        raise CLIError("--from must not be after --to")
+    trends = load_trends(conn, uid, start, end)
+    data = {str(w): {k: (None if v != v else round(v, 3)) for k, v in s.items()} for w, s in trends.summary().items()}
+    slope = trends.slope_kg_week
+    data["range"] = {"from": start, "to": end, "weight_slope": None if slope != slope else round(slope, 3)}
+
+    def num(v, spec):
+        return "n/a" if v != v else format(v, spec)
+
+    lines = [f"{start} to {end}"]
+    for w, s in trends.summary().items():
+        lines.append(
+            f"{w:>3} days: intake {num(s['intake'], '.0f')} • burn {num(s['burn'], '.0f')}"
+            f" • net {num(s['net'], '.0f')} kcal/day • on target {num(s['adherence'], '.0%')}"
+            f" • weight {num(s['weight_slope'], '+.2f')} kg/week"
+        )
+    lines.append(f"range weight slope: {num(slope, '+.2f')} kg/week")
+    _emit(args, data, "\n".join(lines))
+
+def cmd_export(conn, args):
+    os.makedirs(args.out, exist_ok=True)
+    if args.start is None and args.end is None:
+        if args.all_users:
+            raise CLIError("--all-users needs --from/--to")
+        paths = export_day_csv(conn, _resolve_user(conn, args), args.date, args.out)
+        _emit(args, list(paths), "Saved:\n" + "\n".join(paths))
+        return
+
+    start, end = args.start or args.end, args.end or args.start
+    if args.all_users:
+        user_ids, prefix = None, "all"
+    else:
+        uid = _resolve_user(conn, args)
+        user_ids, prefix = [uid], store.get_profile(conn, uid)["name"]
+
+    def progress(table, n):
+        if not args.json:
+            print(f"\r{table}: {n:,} rows", end="", file=sys.stderr, flush=True)
+
+    written = export_range(conn, args.out, start, end, user_ids, args.tables or tuple(EXPORT_TABLES),
+                           compress=args.gzip, prefix=prefix, progress=progress)
+    if not args.json:
+        print(file=sys.stderr)
+    _emit(args, {t: {"path": p, "rows": n} for t, (p, n) in written.items()},
+          "Saved:\n" + "\n".join(f"{p} ({n:,} rows)" for p, n in written.values()))
+
+def cmd_import(conn, args):
+    def progress(n):
+        if not args.json:
+            print(f"\r{n:,} rows", end="", file=sys.stderr, flush=True)
+
+    try:
+        r = import_file(conn, args.table, args.file, args.format, args.batch_size, args.strict, progress)
+    except (RowError, OSError) as e:
+        raise CLIError(str(e))
+    if not args.json:
+        print(file=sys.stderr)
+    lines = [f"Imported {r.inserted:,} {r.table} rows in {r.seconds:.2f}s ({r.rows_per_sec:,.0f} rows/s)"]
+    if r.skipped:
+        lines.append(f"Skipped {r.skipped:,} invalid rows:")
+        lines += [f"  line {n}: {msg}" for n, msg in r.errors]
+    _emit(args, {"table": r.table, "inserted": r.inserted, "skipped": r.skipped,
+                 "seconds": r.seconds, "rows_per_sec": r.rows_per_sec, "errors": r.errors},
+          "\n".join(lines))
+
+def cmd_parquet_export(conn, args):
+    user_ids = None
+    if args.user or args.user_id is not None:
+        user_ids = [_resolve_user(conn, args)]
+    try:
+        written = columnar.export_parquet(conn, args.out, args.tables or tuple(columnar.COLUMNS),
+                                          user_ids, args.start, args.end, args.batch_size)
+    except RuntimeError as e:
+        raise CLIError(str(e))
+    _emit(args, {t: {"files": f, "rows": n} for t, (f, n) in written.items()},
+          "\n".join(f"{t}: {n:,} rows in {f:,} files under {os.path.join(args.out, t)}"
+                    for t, (f, n) in written.items()))
+
+def cmd_parquet_import(conn, args):
+    try:
+        inserted = columnar.import_parquet(conn, args.path, args.batch_size)
+    except (RuntimeError, ValueError, OSError) as e:
+        raise CLIError(str(e))
+    _emit(args, inserted, "\n".join(f"{t}: imported {n:,} rows" for t, n in inserted.items())
+          or "no .parquet files found")
+
+def cmd_catalog(conn, args):
+    if args.action == "load":
+        path = args.file or catalog.DATASET_FILE
+        if not args.file and not os.path.exists(path):
+            raise CLIError(f"no bundled dataset at {path}; pass a CSV/JSONL file")
+        try:
+            n = catalog.load_dataset(conn, path)
+        except (OSError, ValueError) as e:
+            raise CLIError(str(e))
+        _emit(args, {"merged": n}, f"Merged {n:,} foods from {path}")
+        return
+    if not args.file:
+        raise CLIError("catalog search needs the text to look for")
+    items = catalog.load_index(conn).search(args.file, args.limit)
+    _emit(args, [{"name": i.name, "kcal": i.kcal, "serving": i.serving, "protein_g": i.protein_g,
+                  "carb_g": i.carb_g, "fat_g": i.fat_g, "uses": i.uses} for i in items],
+          "\n".join(f"{i.name}: {i.kcal:.0f} kcal" + (f" per {i.serving}" if i.serving else "")
+                    for i in items if i.kcal is not None))
+
+def cmd_search(conn, args):
+    uid = _resolve_user(conn, args) if args.user or args.user_id is not None else None
+    kinds = (args.kind,) if args.kind else search.KINDS
+    page = search.search_logs(conn, args.text, uid, args.start, args.end, kinds, args.order,
+                              args.page, args.page_size)
+    _emit(args, {"hits": [vars(h) for h in page.hits], "page": page.page, "has_more": page.has_more},
+          "\n".join(f"{h.log_date}  {h.kind:<8} {h.name} ({h.kcal or 0:.0f} kcal)" for h in page.hits)
+          + (f"\n… more with --page {page.page + 1}" if page.has_more else ""))
+
+def cmd_calculate(conn, args):
+    if args.user or args.user_id is not None:
+        uid = _resolve_user(conn, args)
+        targets = get_targets(conn, uid)
+        p = store.get_profile(conn, uid)
+        if targets is None:
+            raise CLIError(f"profile {p['name']!r} is incomplete; save it in the Profile tab first")
+        r = dict(targets, goal=p["goal"] or "Maintain", bmi_category=bmi_category(targets["bmi"]))
+    else:
+        r = calculate(args.gender, args.weight, args.height, args.age,
+                      args.activity or "Moderate", args.goal or "Maintain")
+    _emit(args, r, (
+        f"BMR: {r['bmr']:.0f} kcal/day\n"
+        f"TDEE: {r['tdee']:.0f} kcal/day\n"
+        f"Target (goal: {r['goal']}): {r['target']:.0f} kcal/day\n"
+        f"BMI: {r['bmi']:.1f} ({r['bmi_category']})\n"
+        f"Macros — Protein: {r['protein_g']:.0f} g, Carbs: {r['carb_g']:.0f} g, Fat: {r['fat_g']:.0f} g"
+    ))
+
+def cmd_rollup(conn, args):
+    if args.action == "rebuild":
+        n = rebuild_daily_totals(conn)
+        _emit(args, {"rows": n}, f"Rebuilt daily_totals: {n} rows")
+        return 0
+    drift = verify_daily_totals(conn)
+    text = "\n".join(f"user {u} {d}: expected {e}, found {a}" for u, d, e, a in drift[:50])
+    if drift:
+        text += f"\n{len(drift)} drifted rows; run 'python -m core rollup rebuild' to repair"
+    _emit(args, drift, text or "daily_totals is consistent")
+    return 1 if drift else 0
+
+def cmd_shards(conn, args):
+    # The process pool and shard layout are only loaded for this command
+    from core import shards
+
+    src = args.db or DB_FILE
+    if args.action == "migrate":
+        def progress(path, moved):
+            if not args.json:
+                print(f"{os.path.basename(path)}: " + ", ".join(f"{t} {n:,}" for t, n in moved.items()),
+                      file=sys.stderr)
+
+        try:
+            router = shards.migrate_to_shards(src, args.root, args.buckets, progress)
+        except ValueError as e:
+            raise CLIError(str(e))
+        files = router.shard_paths()
+        _emit(args, {"root": router.root, "shards": len(files)},
+              f"Wrote {len(files)} shards under {router.root}; later writes still go to {os.path.abspath(src)}")
+        return
+
+    if not os.path.exists(os.path.join(args.root, shards.CATALOG_FILE)):
+        raise CLIError(f"no sharded store at {args.root}")
+    router = shards.ShardRouter(args.root)
+    if args.action == "info":
+        files = router.shard_paths()
+        layout = f"{router.buckets} buckets" if router.buckets else "one file per user"
+        _emit(args, {"root": router.root, "buckets": router.buckets, "shards": len(files)},
+              f"{router.root}: {layout}, {len(files)} shard files")
+        return
+    end = args.end or today_str()
+    start = args.start or end
+    rows = shards.shard_report(router, start, end, workers=args.workers)
+    _emit(args, rows, "\n".join(
+        f"{r['user']}: {r['days']} days • food {r['food_kcal']:.0f} • burned {r['burned_kcal']:.0f}"
+        f" • net {r['net_kcal']:.0f} kcal" + (f" ({r['avg_net_kcal']:.0f}/day)" if r["days"] else "")
+        for r in rows
+    ))
+
+def cmd_weekly_reports(conn, args):
+    # numpy, matplotlib and the process pool are only loaded for this command
+    from core import reports
+
+    end = args.end or today_str()
+
+    def progress(done, total):
+        if not args.json:
+            print(f"\r{done:,}/{total:,} users", end="", file=sys.stderr, flush=True)
+
+    try:
+        rows = reports.generate_reports(
+            args.db or DB_FILE, args.out, end, workers=args.workers, charts=not args.no_charts,
+            restart=args.restart, progress=progress,
+        )
+    except ValueError as e:
+        raise CLIError(str(e))
+    if not args.json:
+        print(file=sys.stderr)
+    _emit(args, {"out": os.path.abspath(args.out), "users": len(rows)},
+          f"Wrote {len(rows)} weekly reports to {os.path.abspath(args.out)}")
+
+def cmd_serve(conn, args):
+    # asyncio and the HTTP layer are only loaded for this command
+    from core import server
+    server.run(args.db, args.host, args.port, args.readers, args.commit_delay_ms)
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m core", description="Calorie Calculator Pro, headless.")
+    parser.add_argument("--db", help="database file (default: the app database)")
+    parser.add_argument("--json", action="store_true", help="print machine-readable JSON")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    def with_user(p, required=True):
+        g = p.add_mutually_exclusive_group(required=required)
+        g.add_argument("--user", help="profile name")
+        g.add_argument("--user-id", type=int, help="profile id")
+        return p
+
+    def with_date(p):
+        p.add_argument("--date", type=_date, default=today_str(), help="YYYY-MM-DD (default: today)")
+        return p
+
+    sub.add_parser("users", help="list profile names").set_defaults(func=cmd_users)
+
+    p = with_date(with_user(sub.add_parser("log-food", help="log a food entry")))
+    p.add_argument("name")
+    p.add_argument("kcal", type=float)
+    p.set_defaults(func=cmd_log_food)
+
+    p = with_date(with_user(sub.add_parser("log-exercise", help="log an exercise entry")))
+    p.add_argument("name")
+    p.add_argument("kcal", type=float, help="calories burned")
+    p.set_defaults(func=cmd_log_exercise)
+
+    p = with_date(with_user(sub.add_parser("log-weight", help="log a weight entry")))
+    p.add_argument("weight", type=float, help="kg")
+    p.set_defaults(func=cmd_log_weight)
+
+    p = with_date(sub.add_parser("summary", help="food, exercise and net calories for a day"))
+    with_user(p, required=False)
+    p.add_argument("--all", action="store_true", help="every profile, one line each")
+    p.set_defaults(func=cmd_summary)
+
+    p = sub.add_parser("report", help="net calories against the target in effect on each day of a range")
+    with_user(p)
+    p.add_argument("--from", dest="start", type=_date, required=True)
+    p.add_argument("--to", dest="end", type=_date, help="default: today")
+    p.set_defaults(func=cmd_report)
+
+    p = sub.add_parser("trends", help="7/30/90-day rolling intake, burn, adherence and weight trend")
+    with_user(p)
+    p.add_argument("--from", dest="start", type=_date, help="default: 90 days before --to")
+    p.add_argument("--to", dest="end", type=_date, help="default: today")
+    p.set_defaults(func=cmd_trends)
+
+    p = with_date(sub.add_parser("export", help="export a day, or a date range with --from/--to, to CSV"))
+    with_user(p, required=False)
+    p.add_argument("--all-users", action="store_true", help="range export for every profile")
+    p.add_argument("--from", dest="start", type=_date, help="first day of a range export")
+    p.add_argument("--to", dest="end", type=_date, help="last day of a range export")
+    p.add_argument("--tables", nargs="+", choices=list(EXPORT_TABLES), help="range export tables (default: all)")
+    p.add_argument("--gzip", action="store_true", help="gzip the range export files")
+    p.add_argument("--out", default=".", help="output folder")
+    p.set_defaults(func=cmd_export)
+
+    p = sub.add_parser("import", help="bulk import foods, exercises or weights from CSV/JSONL")
+    p.add_argument("table", choices=list(TABLES))
+    p.add_argument("file", help=".csv or .jsonl, optionally .gz")
+    p.add_argument("--format", choices=["csv", "jsonl"], help="override detection by extension")
+    p.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    p.add_argument("--strict", action="store_true", help="abort on the first invalid row")
+    p.set_defaults(func=cmd_import)
+
+    p = sub.add_parser("parquet-export", help="write the log tables as Parquet, partitioned by user and month")
+    with_user(p, required=False)
+    p.add_argument("--out", required=True, help="output folder")
+    p.add_argument("--tables", nargs="+", choices=list(columnar.COLUMNS), help="default: all")
+    p.add_argument("--from", dest="start", type=_date)
+    p.add_argument("--to", dest="end", type=_date)
+    p.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    p.set_defaults(func=cmd_parquet_export)
+
+    p = sub.add_parser("parquet-import", help="load Parquet written by parquet-export")
+    p.add_argument("path", help="a .parquet file or a folder of them")
+    p.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    p.set_defaults(func=cmd_parquet_import)
+
+    p = sub.add_parser("search", help="find logged foods and exercises by name")
+    with_user(p, required=False)
+    p.add_argument("text")
+    p.add_argument("--from", dest="start", type=_date)
+    p.add_argument("--to", dest="end", type=_date)
+    p.add_argument("--kind", choices=search.KINDS)
+    p.add_argument("--order", choices=["recent", "rank"], default="recent")
+    p.add_argument("--page", type=int, default=0)
+    p.add_argument("--page-size", type=int, default=20)
+    p.set_defaults(func=cmd_search)
+
+    p = sub.add_parser("catalog", help="load a nutrient dataset into the food catalogue, or search it")
+    p.add_argument("action", choices=["load", "search"])
+    p.add_argument("file", nargs="?", help="load: CSV/JSONL dataset (default: the bundled one); search: text")
+    p.add_argument("--limit", type=int, default=10)
+    p.set_defaults(func=cmd_catalog)
+
+    p = sub.add_parser("weekly-reports", help="JSON and PNG report of the week for every profile, in parallel")
+    p.add_argument("out", help="output folder; an interrupted run resumes from its checkpoint")
+    p.add_argument("--to", dest="end", type=_date, help="last day of the week (default: today)")
+    p.add_argument("--workers", type=int, help="worker processes (default: one per CPU)")
+    p.add_argument("--no-charts", action="store_true", help="skip the PNG charts")
+    p.add_argument("--restart", action="store_true", help="ignore the checkpoint and redo every user")
+    p.set_defaults(func=cmd_weekly_reports, read_only=True)
+
+    p = sub.add_parser("shards", help="split the database into per-user shard files, or report across them")
+    p.add_argument("action", choices=["migrate", "info", "report"])
+    p.add_argument("root", help="directory of the sharded store")
+    p.add_argument("--buckets", type=int, default=16, help="migrate: shard files, or 0 for one per user")
+    p.add_argument("--from", dest="start", type=_date, help="report: first day (default: --to)")
+    p.add_argument("--to", dest="end", type=_date, help="report: last day (default: today)")
+    p.add_argument("--workers", type=int, help="report: worker processes (default: one per CPU)")
+    p.set_defaults(func=cmd_shards, read_only=True)
+
+    p = with_user(sub.add_parser("calculate", help="BMR, TDEE, target, BMI and macros"), required=False)
+    p.add_argument("--gender", default="Male", choices=["Male", "Female"])
+    p.add_argument("--weight", type=float, default=70.0, help="kg")
+    p.add_argument("--height", type=float, default=170.0, help="cm")
+    p.add_argument("--age", type=int, default=25)
+    p.add_argument("--activity", default="Moderate", choices=list(ACTIVITY_FACTORS))
+    p.add_argument("--goal", default="Maintain", choices=["Lose", "Maintain", "Gain"])
+    p.set_defaults(func=cmd_calculate)
+
+    p = sub.add_parser("serve", help="run the HTTP/JSON API (see core.server)")
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=8765, help="0 picks a free port")
+    p.add_argument("--readers", type=int, default=8, help="reader threads, one connection each")
+    p.add_argument("--commit-delay-ms", type=float, default=1,
+                   help="longest a write waits to share a commit with others (default 1)")
+    p.set_defaults(func=cmd_serve)
+
+    p = sub.add_parser("rollup", help="verify or rebuild the daily_totals rollup")
+    p.add_argument("action", choices=["verify", "rebuild"])
+    p.set_defaults(func=cmd_rollup)
+    return parser
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    conn = None
+    # These open --db read-only themselves, so it is neither migrated nor switched to WAL here
+    if not getattr(args, "read_only", False):
+        setup_database(args.db)
+        conn = get_connection(args.db)
+    try:
+        return args.func(conn, args) or 0
+    except CLIError as e:
+        parser.error(str(e))
+    except sqlite3.Error as e:
+        print(f"database error: {e}", file=sys.stderr)
+        return 1
@@ -0,0 +1,171 @@
+"""Parquet export and import of the log tables (requires pyarrow).
+
+Files are laid out Hive-style, one directory per user and month:
+
+    {root}/{table}/user_id={id}/month={YYYY-MM}/part-0.parquet
+
+Columns are typed: date32 dates, float32 calories and weights, and
+dictionary-encoded names, which makes repeated food names almost free. The
+writer streams the cursor in batches and keeps at most one partition open,
+so memory stays flat however large the table is. Every file also carries its
+user_id column, so a single file can be loaded back on its own.
+"""
+import os
+from datetime import date
+
+from core.db import deferred_search_index
+from core.importer import DEFAULT_BATCH_SIZE, insert_batches
+from core.targets import last_weight_id, record_weights_since
+
+# table -> [(column, arrow type name)], in SELECT/INSERT order
+COLUMNS = {
+    "foods": [("user_id", "int32"), ("log_date", "date32"), ("name", "dict"), ("calories", "float32")],
+    "exercises": [
+        ("user_id", "int32"), ("log_date", "date32"), ("name", "dict"), ("calories_burned", "float32"),
+    ],
+    "weights": [("user_id", "int32"), ("log_date", "date32"), ("weight_kg", "float32")],
+}
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise RuntimeError("Parquet support needs pyarrow: pip install pyarrow") from None
+    return pyarrow
+
+def _schema(pa, table):
+    types = {
+        "int32": pa.int32(),
+        "date32": pa.date32(),
+        "float32": pa.float32(),
+        "dict": pa.dictionary(pa.int32(), pa.string()),
+    }
+    return pa.schema([(name, types[t]) for name, t in COLUMNS[table]])
+
+def _record_batch(pa, schema, rows):
+    cols = list(zip(*rows))
+    arrays = []
+    for i, f in enumerate(schema):
+        values = cols[i]
+        if pa.types.is_date32(f.type):
+            values = [date.fromisoformat(v[:10]) for v in values]
+        arrays.append(pa.array(values, type=f.type))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+def export_parquet(conn, root, tables=tuple(COLUMNS), user_ids=None, start=None, end=None,
+                   batch_size=DEFAULT_BATCH_SIZE, progress=None):
+    """Writes each table as partitioned Parquet under root/{table}/ and returns {table: (files, rows)}."""
+    pa = _pyarrow()
+    pq = pa.parquet
+    written = {}
+    for table in tables:
+        schema = _schema(pa, table)
+        cols = ", ".join(c for c, _ in COLUMNS[table])
+        where, params = ["user_id IS NOT NULL", "log_date IS NOT NULL"], []
+        if start:
+            where.append("log_date >= ?")
+            params.append(start)
+        if end:
+            where.append("log_date <= ?")
+            params.append(end)
+        if user_ids is not None:
+            user_ids = list(user_ids)
+            where.append(f"user_id IN ({','.join('?' * len(user_ids))})")
+            params += user_ids
+        # Sorted by partition key, so each partition's rows arrive together
+        cur = conn.execute(
+            f"SELECT {cols} FROM {table} WHERE {' AND '.join(where)} ORDER BY user_id, log_date, id",
+            params,
+        )
+
+        files, rows_done = 0, 0
+        writer, part, batch = None, None, []
+
+        def flush():
+            nonlocal rows_done
+            if batch:
+                writer.write_batch(_record_batch(pa, schema, batch))
+                rows_done += len(batch)
+                batch.clear()
+                if progress:
+                    progress(table, rows_done)
+
+        try:
+            for row in cur:
+                key = (row[0], row[1][:7])
+                if key != part:
+                    if writer is not None:
+                        flush()
+                        writer.close()
+                    part = key
+                    folder = os.path.join(root, table, f"user_id={key[0]}", f"month={key[1]}")
+                    os.makedirs(folder, exist_ok=True)
+                    writer = pq.ParquetWriter(os.path.join(folder, "part-0.parquet"), schema)
+                    files += 1
+                batch.append(row)
+                if len(batch) >= batch_size:
+                    flush()
+            if writer is not None:
+                flush()
+        finally:
+            if writer is not None:
+                writer.close()
+        written[table] = (files, rows_done)
+    return written
+
+def _restore_float(v):
+    # float32 -> float64 widening shows noise like 70.0999984741; 7 significant digits undoes it
+    return None if v is None else float(f"{v:.7g}")
+
+def _table_for(schema, path):
+    names = set(schema.names)
+    for table, cols in COLUMNS.items():
+        if names == {c for c, _ in cols}:
+            return table
+    raise ValueError(f"{path}: columns {sorted(names)} don't match foods, exercises or weights")
+
+def parquet_files(path):
+    """The .parquet files at `path` (a file or a directory tree), in sorted order."""
+    if os.path.isfile(path):
+        return [path]
+    found = []
+    for folder, _, names in os.walk(path):
+        found += [os.path.join(folder, n) for n in names if n.endswith(".parquet")]
+    return sorted(found)
+
+def import_parquet(conn, path, batch_size=DEFAULT_BATCH_SIZE, progress=None):
+    """Loads Parquet files written by export_parquet back into SQLite in one transaction.
+
+    The target table is recognised from each file's columns. Returns {table: rows_inserted}.
+    """
+    pa = _pyarrow()
+    pq = pa.parquet
+    inserted = {}
+    with conn:
+        conn.execute("BEGIN IMMEDIATE")
+        after_id = last_weight_id(conn)
+        with deferred_search_index(conn):
+            for f in parquet_files(path):
+                pf = pq.ParquetFile(f)
+                table = _table_for(pf.schema_arrow, f)
+                names = [c for c, _ in COLUMNS[table]]
+                float_cols = [i for i, (_, t) in enumerate(COLUMNS[table]) if t == "float32"]
+
+                def rows():
+                    for rb in pf.iter_batches(batch_size=batch_size, columns=names):
+                        cols = [rb.column(i).to_pylist() for i in range(len(names))]
+                        cols[1] = [d.isoformat() for d in cols[1]]
+                        for i in float_cols:
+                            cols[i] = [_restore_float(v) for v in cols[i]]
+                        yield from zip(*cols)
+
+                sql = f"INSERT INTO {table}({', '.join(names)}) VALUES({','.join('?' * len(names))})"
+                n = insert_batches(conn, sql, rows(), batch_size)
+                inserted[table] = inserted.get(table, 0) + n
+                if progress:
+                    progress(table, inserted[table])
+        if inserted.get("weights"):
+            # Restored weights move the target like ones logged through add_weight
+            record_weights_since(conn, after_id)
+    return inserted
@@ -1,16 +1,110 @@
+import atexit
 import os
 import sqlite3
+import threading
+from contextlib import contextmanager
+from urllib.parse import quote
 
 # Cross-platform database path
 DB_FILE = os.path.join(os.path.dirname(__file__), "..", "calorie_pro.db")
 
-def db_connect():
+# Prepared statements kept per connection; the app issues a few dozen distinct queries
+STATEMENT_CACHE_SIZE = 256
+
+_local = threading.local()
+_pool_lock = threading.Lock()
+_pool = []          # every connection handed out by get_connection()
+_pool_generation = 0
+
+# Characters trimmed from both ends of a food name before it is keyed
+KEY_SPACES = " \t\n\r\xa0"
+_ASCII_LOWER = str.maketrans("ABCDEFGHIJKLMNOPQRSTUVWXYZ", "abcdefghijklmnopqrstuvwxyz")
+
+def name_key(name):
+    """The key a food name is catalogued under; the same as CATALOG_KEY computes in SQL."""
+    return None if name is None else name.strip(KEY_SPACES).translate(_ASCII_LOWER)
+
+def db_connect(path=None):
     """Establishes and returns a connection to the SQLite database."""
-    return sqlite3.connect(DB_FILE)
+    return sqlite3.connect(path or DB_FILE)
+
+def read_only_uri(path=None):
+    """A file: URI that opens the database read-only, for connect(uri=True) or ATTACH."""
+    return f"file:{quote(os.path.abspath(path or DB_FILE))}?mode=ro"
+
+def read_only_connection(path=None):
+    """Opens a connection that can only read, for worker processes that must never write."""
+    return sqlite3.connect(read_only_uri(path), uri=True)
+
+def _tune(conn):
+    """Applies the pragmas used by every long-lived connection."""
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA busy_timeout=5000")
+    return conn
+
+def get_connection(path=None):
+    """Returns this thread's long-lived connection to the database, opening it on first use.
+
+    Use `with conn:` for writes so they commit or roll back; never close it directly,
+    call close_connections() instead.
+    """
+    key = os.path.abspath(path or DB_FILE)
+    if getattr(_local, "generation", None) != _pool_generation:
+        _local.conns = {}
+        _local.generation = _pool_generation
+    conn = _local.conns.get(key)
+    if conn is None:
+        # check_same_thread is off only so close_connections() can run from the main thread
+        conn = _tune(sqlite3.connect(
+            key, cached_statements=STATEMENT_CACHE_SIZE, check_same_thread=False
+        ))
+        _local.conns[key] = conn
+        with _pool_lock:
+            _pool.append(conn)
+    return conn
+
+def close_connections():
+    """Closes every connection opened by get_connection(), in all threads."""
+    global _pool_generation
+    with _pool_lock:
+        conns = _pool[:]
+        _pool.clear()
+        _pool_generation += 1
+    for conn in conns:
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+
+atexit.register(close_connections)
+
+class QueryCounter:
+    """Counts the SQL statements run on a connection inside a `with` block.
 
-def setup_database():
+    BEGIN/COMMIT are counted too, so a single-transaction read of three
+    queries counts five.
+    """
+    def __init__(self, conn):
+        self.conn = conn
+        self.count = 0
+        self.statements = []
+
+    def _trace(self, sql):
+        self.count += 1
+        self.statements.append(sql)
+
+    def __enter__(self):
+        self.conn.set_trace_callback(self._trace)
+        return self
+
+    def __exit__(self, *exc):
+        self.conn.set_trace_callback(None)
+        return False
+
+def setup_database(path=None, apply_migrations=True):
     """Creates the necessary tables if they don't exist."""
-    conn = db_connect()
+    conn = db_connect(path)
     cur = conn.cursor()
     
     cur.execute("""
@@ -60,4 +154,398 @@ def setup_database():
     """)
     
     conn.commit()
+    if apply_migrations:
+        migrate(conn)
     conn.close()
+
+# Recomputes daily_totals from the raw logs; used by migration 2 and core.rollup
+DAILY_TOTALS_SELECT = """
+    SELECT user_id, log_date, SUM(food_kcal), SUM(burned_kcal), SUM(n) FROM (
+        SELECT user_id, log_date, SUM(COALESCE(calories, 0)) AS food_kcal,
+               0 AS burned_kcal, COUNT(*) AS n
+        FROM foods WHERE user_id IS NOT NULL AND log_date IS NOT NULL
+        GROUP BY user_id, log_date
+        UNION ALL
+        SELECT user_id, log_date, 0, SUM(COALESCE(calories_burned, 0)), COUNT(*)
+        FROM exercises WHERE user_id IS NOT NULL AND log_date IS NOT NULL
+        GROUP BY user_id, log_date
+    )
+    GROUP BY user_id, log_date
+"""
+
+def _rollup_triggers(table, kcal_col, total_col):
+    """Returns triggers that keep daily_totals in step with inserts, deletes and updates on `table`."""
+    add = f"""
+        INSERT INTO daily_totals(user_id, log_date, {total_col}, entry_count)
+        VALUES (NEW.user_id, NEW.log_date, COALESCE(NEW.{kcal_col}, 0), 1)
+        ON CONFLICT(user_id, log_date) DO UPDATE SET
+            {total_col} = {total_col} + excluded.{total_col},
+            entry_count = entry_count + 1;
+    """
+    remove = f"""
+        UPDATE daily_totals SET
+            {total_col} = {total_col} - COALESCE(OLD.{kcal_col}, 0),
+            entry_count = entry_count - 1
+        WHERE user_id = OLD.user_id AND log_date = OLD.log_date;
+        DELETE FROM daily_totals
+        WHERE user_id = OLD.user_id AND log_date = OLD.log_date AND entry_count <= 0;
+    """
+    new_ok = "NEW.user_id IS NOT NULL AND NEW.log_date IS NOT NULL"
+    old_ok = "OLD.user_id IS NOT NULL AND OLD.log_date IS NOT NULL"
+    return [
+        f"CREATE TRIGGER IF NOT EXISTS trg_{table}_totals_ins AFTER INSERT ON {table} "
+        f"WHEN {new_ok} BEGIN {add} END",
+        f"CREATE TRIGGER IF NOT EXISTS trg_{table}_totals_del AFTER DELETE ON {table} "
+        f"WHEN {old_ok} BEGIN {remove} END",
+        # An update is a delete of the old row plus an insert of the new one
+        f"CREATE TRIGGER IF NOT EXISTS trg_{table}_totals_upd_old "
+        f"AFTER UPDATE OF user_id, log_date, {kcal_col} ON {table} "
+        f"WHEN {old_ok} BEGIN {remove} END",
+        f"CREATE TRIGGER IF NOT EXISTS trg_{table}_totals_upd_new "
+        f"AFTER UPDATE OF user_id, log_date, {kcal_col} ON {table} "
+        f"WHEN {new_ok} BEGIN {add} END",
+    ]
+
+# users columns the cached targets are computed from
+TARGET_INPUTS = ("gender", "age", "height_cm", "weight_kg", "activity", "goal", "macro_json")
+
+# Foods are matched to the catalogue case-insensitively, ignoring surrounding whitespace.
+# Plain SQL, so any SQLite client can write foods; name_key() above must agree, so it
+# folds only ASCII letters, as SQLite's lower() does.
+CATALOG_NAME = f"trim({{}}, char({', '.join(str(ord(c)) for c in KEY_SPACES)}))"
+CATALOG_KEY = f"lower({CATALOG_NAME})"
+
+# Each logged food counts as a use; history entries follow the latest logged kcal,
+# dataset entries keep their per-serving values
+CATALOG_TRIGGER = f"""
+    CREATE TRIGGER IF NOT EXISTS trg_foods_catalog_ins AFTER INSERT ON foods
+    WHEN {CATALOG_KEY.format("NEW.name")} <> ''
+    BEGIN
+        INSERT INTO food_catalog(name, name_key, kcal, source, uses)
+        VALUES ({CATALOG_NAME.format("NEW.name")}, {CATALOG_KEY.format("NEW.name")}, NEW.calories, 'history', 1)
+        ON CONFLICT(name_key) DO UPDATE SET
+            uses = uses + 1,
+            kcal = CASE WHEN source = 'history' THEN excluded.kcal ELSE kcal END;
+    END
+"""
+
+def has_fts5(conn):
+    """True if this SQLite build includes the FTS5 extension."""
+    try:
+        conn.execute("CREATE VIRTUAL TABLE temp.fts5_probe USING fts5(x)")
+    except sqlite3.OperationalError:
+        return False
+    conn.execute("DROP TABLE temp.fts5_probe")
+    return True
+
+# log_search rowids sort by log date: the day number in the high 32 bits, then id*2 + 0 for foods
+# or + 1 for exercises. "Newest first" and date ranges are then rowid scans FTS5 does natively.
+SEARCH_ROWID = "((COALESCE(CAST(julianday({t}.log_date) AS INTEGER), 0) << 32) + {t}.id * 2 + {offset})"
+
+def _log_search_triggers(table, kind, offset):
+    """Triggers that mirror `table` into log_search."""
+    add = f"""
+        INSERT INTO log_search(rowid, name, owner, kind, user_id, log_date)
+        VALUES ({SEARCH_ROWID.format(t="NEW", offset=offset)}, NEW.name, 'u' || NEW.user_id, '{kind}',
+                NEW.user_id, NEW.log_date);
+    """
+    remove = f"DELETE FROM log_search WHERE rowid = {SEARCH_ROWID.format(t='OLD', offset=offset)};"
+    return [
+        f"CREATE TRIGGER IF NOT EXISTS trg_{table}_search_ins AFTER INSERT ON {table} BEGIN {add} END",
+        f"CREATE TRIGGER IF NOT EXISTS trg_{table}_search_del AFTER DELETE ON {table} BEGIN {remove} END",
+        f"CREATE TRIGGER IF NOT EXISTS trg_{table}_search_upd AFTER UPDATE OF user_id, log_date, name ON {table} "
+        f"BEGIN {remove} {add} END",
+    ]
+
+def _search_backfill(table, kind, offset, min_id=0):
+    return (
+        f"INSERT INTO log_search(rowid, name, owner, kind, user_id, log_date) "
+        f"SELECT {SEARCH_ROWID.format(t=table, offset=offset)}, name, 'u' || user_id, '{kind}', "
+        f"user_id, log_date FROM {table} WHERE id > {int(min_id)} ORDER BY 1"
+    )
+
+@contextmanager
+def transaction(conn):
+    """`with conn:` that nests: inside an already open transaction it is a savepoint instead.
+
+    Lets a store function commit on its own when called alone, and join the
+    batch when the group-commit writer (core.writer) runs it with others.
+    """
+    if not conn.in_transaction:
+        with conn:
+            yield conn
+        return
+    conn.execute("SAVEPOINT tx")
+    try:
+        yield conn
+    except BaseException:
+        conn.execute("ROLLBACK TO tx")
+        conn.execute("RELEASE tx")
+        raise
+    conn.execute("RELEASE tx")
+
+@contextmanager
+def deferred_search_index(conn):
+    """For bulk inserts inside an open transaction: index new foods/exercises in one pass at the end.
+
+    FTS5 flushes its pending terms at every trigger statement, so indexing row
+    by row costs several times the insert itself. This drops the insert
+    triggers for the duration (DDL is transactional, so a rollback restores
+    them) and indexes everything past the previous max ids afterwards.
+    """
+    if not conn.execute("SELECT 1 FROM sqlite_master WHERE name='log_search'").fetchone():
+        yield
+        return
+    tables = (("foods", "food", 0), ("exercises", "exercise", 1))
+    last_ids = {}
+    for table, _, _ in tables:
+        last_ids[table] = conn.execute(f"SELECT COALESCE(MAX(id), 0) FROM {table}").fetchone()[0]
+        conn.execute(f"DROP TRIGGER IF EXISTS trg_{table}_search_ins")
+    yield
+    for table, kind, offset in tables:
+        conn.execute(_search_backfill(table, kind, offset, last_ids[table]))
+        conn.execute(_log_search_triggers(table, kind, offset)[0])
+
+def _create_log_search(conn):
+    # Without FTS5 there is no index to build; core.search falls back to LIKE scans
+    if not has_fts5(conn):
+        return
+    statements = [
+        # owner holds 'u<user_id>' as an indexed token, so a user filter is part of the MATCH
+        """
+        CREATE VIRTUAL TABLE IF NOT EXISTS log_search USING fts5(
+            name, owner, kind UNINDEXED, user_id UNINDEXED, log_date UNINDEXED,
+            tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3'
+        )
+        """,
+        *_log_search_triggers("foods", "food", 0),
+        *_log_search_triggers("exercises", "exercise", 1),
+        "DELETE FROM log_search",
+    ]
+    statements += [_search_backfill("foods", "food", 0), _search_backfill("exercises", "exercise", 1)]
+    for sql in statements:
+        conn.execute(sql)
+
+def _backfill_targets_history(conn):
+    # Computed from the profiles in Python, like the Calculator tab; user_targets is
+    # only filled on a first lookup, so it is usually empty on an upgrade
+    from core.targets import backfill_history
+    backfill_history(conn)
+
+def _reconcile_targets_history(conn):
+    from core.targets import reconcile_history
+    reconcile_history(conn)
+
+def _canonical_dates(conn):
+    # Dates saved before check_date rewrote other ISO spellings (2024-W01-1, 20240101) to
+    # YYYY-MM-DD; the rollup and search triggers follow the updated rows
+    from core.helpers import check_date
+    for table, col in (("foods", "log_date"), ("exercises", "log_date"), ("weights", "log_date"),
+                       ("targets_history", "effective_date")):
+        fixes = []
+        for (value,) in conn.execute(
+            f"SELECT DISTINCT {col} FROM {table} WHERE {col} NOT GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]'"
+        ).fetchall():
+            try:
+                fixes.append((check_date(str(value)), value))
+            except ValueError:
+                continue
+        conn.executemany(f"UPDATE {table} SET {col}=? WHERE {col}=?", fixes)
+
+def _rekey_food_catalog(conn):
+    # Names that now share a key are merged into one entry: a dataset entry wins over
+    # history, then the most used, and the uses are added up
+    conn.execute(f"UPDATE food_catalog SET name = {CATALOG_NAME.format('name')} WHERE name <> {CATALOG_NAME.format('name')}")
+    groups = {}
+    for row in conn.execute("SELECT id, name, source, uses FROM food_catalog"):
+        groups.setdefault(name_key(row[1]), []).append(row)
+    empty = groups.pop("", [])
+    conn.executemany("DELETE FROM food_catalog WHERE id=?", [(r[0],) for r in empty])
+    for key, rows in groups.items():
+        rows.sort(key=lambda r: (r[2] == "history", -r[3], r[0]))
+        keep = rows[0][0]
+        if len(rows) > 1:
+            conn.executemany("DELETE FROM food_catalog WHERE id=?", [(r[0],) for r in rows[1:]])
+            conn.execute("UPDATE food_catalog SET uses=? WHERE id=?", (sum(r[3] for r in rows), keep))
+        # Via a placeholder, so no row takes a key another row still holds
+        conn.execute("UPDATE food_catalog SET name_key='#' || id WHERE id=?", (keep,))
+    conn.executemany(
+        "UPDATE food_catalog SET name_key=? WHERE id=?", [(key, rows[0][0]) for key, rows in groups.items()]
+    )
+
+# Versioned schema changes, applied in order on top of the base tables above.
+# The applied version is tracked in SQLite's own PRAGMA user_version.
+MIGRATIONS = [
+    (1, [
+        # Every log query filters on WHERE user_id=? AND log_date=?
+        "CREATE INDEX IF NOT EXISTS idx_foods_user_date ON foods(user_id, log_date)",
+        "CREATE INDEX IF NOT EXISTS idx_exercises_user_date ON exercises(user_id, log_date)",
+        # The progress chart reads (log_date, weight_kg) for one user, so cover both
+        "CREATE INDEX IF NOT EXISTS idx_weights_user_date ON weights(user_id, log_date, weight_kg)",
+    ]),
+    (2, [
+        # One row per user and day, maintained by the triggers below (see core.rollup)
+        """
+        CREATE TABLE IF NOT EXISTS daily_totals (
+            user_id INTEGER NOT NULL,
+            log_date TEXT NOT NULL,
+            food_kcal REAL NOT NULL DEFAULT 0,
+            burned_kcal REAL NOT NULL DEFAULT 0,
+            entry_count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (user_id, log_date)
+        ) WITHOUT ROWID
+        """,
+        *_rollup_triggers("foods", "calories", "food_kcal"),
+        *_rollup_triggers("exercises", "calories_burned", "burned_kcal"),
+        "DELETE FROM daily_totals",
+        "INSERT INTO daily_totals(user_id, log_date, food_kcal, burned_kcal, entry_count) "
+        + DAILY_TOTALS_SELECT,
+    ]),
+    (3, [
+        # Bumped whenever an input to the calorie target changes (see core.targets)
+        "ALTER TABLE users ADD COLUMN profile_version INTEGER NOT NULL DEFAULT 1",
+        """
+        CREATE TABLE IF NOT EXISTS user_targets (
+            user_id INTEGER PRIMARY KEY,
+            profile_version INTEGER NOT NULL,
+            bmr REAL NOT NULL,
+            tdee REAL NOT NULL,
+            target REAL NOT NULL,
+            bmi REAL NOT NULL,
+            protein_g REAL NOT NULL,
+            carb_g REAL NOT NULL,
+            fat_g REAL NOT NULL
+        )
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_users_profile_version
+        AFTER UPDATE OF {", ".join(TARGET_INPUTS)} ON users
+        WHEN {" OR ".join(f"OLD.{c} IS NOT NEW.{c}" for c in TARGET_INPUTS)}
+        BEGIN
+            UPDATE users SET profile_version = profile_version + 1 WHERE id = NEW.id;
+            DELETE FROM user_targets WHERE user_id = NEW.id;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_users_targets_del AFTER DELETE ON users
+        BEGIN
+            DELETE FROM user_targets WHERE user_id = OLD.id;
+        END
+        """,
+    ]),
+    (4, [
+        # Append-only; the entry with the latest effective_date <= d is the target on day d
+        """
+        CREATE TABLE IF NOT EXISTS targets_history (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            effective_date TEXT NOT NULL,
+            source TEXT NOT NULL,
+            profile_version INTEGER NOT NULL,
+            weight_kg REAL,
+            bmr REAL NOT NULL,
+            tdee REAL NOT NULL,
+            target REAL NOT NULL,
+            bmi REAL NOT NULL,
+            protein_g REAL NOT NULL,
+            carb_g REAL NOT NULL,
+            fat_g REAL NOT NULL
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_targets_history_user_date ON targets_history(user_id, effective_date, id)",
+        _backfill_targets_history,
+    ]),
+    (5, [
+        # One row per distinct food name, from the log history and optional nutrient datasets
+        """
+        CREATE TABLE IF NOT EXISTS food_catalog (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            name_key TEXT NOT NULL UNIQUE,
+            kcal REAL,
+            serving TEXT,
+            protein_g REAL,
+            carb_g REAL,
+            fat_g REAL,
+            source TEXT NOT NULL DEFAULT 'history',
+            uses INTEGER NOT NULL DEFAULT 0
+        )
+        """,
+        CATALOG_TRIGGER,
+        f"""
+        INSERT INTO food_catalog(name, name_key, kcal, source, uses)
+        SELECT {CATALOG_NAME.format("name")}, name_key, calories, 'history', uses FROM (
+            SELECT name, calories, {CATALOG_KEY.format("name")} AS name_key,
+                   COUNT(*) OVER w AS uses,
+                   ROW_NUMBER() OVER (w ORDER BY id DESC) AS rn
+            FROM foods
+            WHERE {CATALOG_KEY.format("name")} <> ''
+            WINDOW w AS (PARTITION BY {CATALOG_KEY.format("name")})
+        )
+        WHERE rn = 1
+        """,
+    ]),
+    (6, [
+        # Full-text index over food and exercise names (see core.search)
+        _create_log_search,
+    ]),
+    (7, [
+        # Databases upgraded to 4 before its backfill read the profiles got no history
+        _backfill_targets_history,
+    ]),
+    (8, [
+        # Keys made when only spaces were trimmed; names that now share a key are merged
+        "DROP TRIGGER IF EXISTS trg_foods_catalog_ins",
+        CATALOG_TRIGGER,
+        _rekey_food_catalog,
+    ]),
+    (9, [
+        # Lookups appended an entry on every cache miss, and users.weight_kg lagged behind
+        # the newest logged weight, so the cached target and the timeline disagreed
+        _reconcile_targets_history,
+    ]),
+    (10, [
+        # The trigger from 8 called name_key(), a function only this app's connections had
+        "DROP TRIGGER IF EXISTS trg_foods_catalog_ins",
+        CATALOG_TRIGGER,
+        _rekey_food_catalog,
+    ]),
+    (11, [
+        # A `shards migrate` from an earlier build locked its source with these; the
+        # single file is the live database even after a migration
+        *(f"DROP TRIGGER IF EXISTS trg_sharded_{table}_{op}"
+          for table in ("users", "foods", "exercises", "weights") for op in ("insert", "update", "delete")),
+    ]),
+    (12, [
+        _canonical_dates,
+    ]),
+]
+
+def schema_version(conn):
+    """Returns the schema version recorded in the database."""
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+def require_latest(conn, path=None):
+    """Raises ValueError unless the database is at the newest schema version (for read-only readers)."""
+    version, latest = schema_version(conn), MIGRATIONS[-1][0]
+    if version != latest:
+        raise ValueError(f"{os.path.abspath(path or DB_FILE)} is at schema version {version}, not {latest}; "
+                         "open it with the app or any other command first")
+
+def migrate(conn):
+    """Applies any pending migrations, each in its own transaction."""
+    current = schema_version(conn)
+    for version, statements in MIGRATIONS:
+        if version <= current:
+            continue
+        with conn:
+            conn.execute("BEGIN")
+            for step in statements:
+                # A step is SQL, or a function of the connection for changes that depend on the build
+                if callable(step):
+                    step(conn)
+                else:
+                    conn.execute(step)
+            conn.execute(f"PRAGMA user_version = {version}")
+        current = version
+    return current
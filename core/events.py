@@ -0,0 +1,91 @@
+"""Invalidation bus: writes publish the data topics they touched, views subscribe to topics.
+
+Topics are strings such as "foods:3:2025-01-31" (built by the helpers below);
+subscriptions are fnmatch patterns, so "foods:3:*" follows every day of user 3.
+Publishing does not call anyone straight away. Matching subscribers are marked
+pending and run together the next time the event loop is idle, each at most
+once, however many events arrived in between. The counters show how much that
+saves.
+"""
+import logging
+from fnmatch import fnmatchcase
+
+USERS = "users"     # the list of profiles
+
+log = logging.getLogger(__name__)
+
+def foods_topic(user_id, log_date="*"):
+    return f"foods:{user_id}:{log_date}"
+
+def exercises_topic(user_id, log_date="*"):
+    return f"exercises:{user_id}:{log_date}"
+
+def weights_topic(user_id):
+    return f"weights:{user_id}"
+
+def profile_topic(user_id):
+    return f"profile:{user_id}"
+
+class EventBus:
+    """Coalesces published topics into at most one call per subscriber per idle cycle.
+
+    `defer(fn)` must arrange for fn() to run once the loop is idle; the app passes
+    Tk's after_idle. Everything runs on that one thread.
+    """
+    def __init__(self, defer):
+        self.defer = defer
+        self._subs = {}             # name -> (patterns, callback)
+        self._pending = {}          # name -> callback, in the order they were first hit
+        self._scheduled = False
+        self.published = 0          # events published
+        self.executed = 0           # subscriber calls made
+        self.suppressed = 0         # calls saved because the subscriber was already pending
+        self.counts = {}            # name -> [executed, suppressed]
+
+    def subscribe(self, name, patterns, callback):
+        """Registers (or replaces) the subscription called `name`."""
+        self._subs[name] = (tuple(patterns), callback)
+        self.counts.setdefault(name, [0, 0])
+
+    def unsubscribe(self, name):
+        self._subs.pop(name, None)
+        self._pending.pop(name, None)
+
+    def publish(self, *topics, source=None):
+        """Marks every subscriber matching one of `topics` for the next idle cycle.
+
+        `source` names a subscriber that has already brought itself up to date, so it is skipped.
+        """
+        self.published += 1
+        for name, (patterns, callback) in self._subs.items():
+            if name == source or not any(fnmatchcase(t, p) for t in topics for p in patterns):
+                continue
+            if name in self._pending:
+                self.suppressed += 1
+                self.counts[name][1] += 1
+            else:
+                self._pending[name] = callback
+        if self._pending and not self._scheduled:
+            self._scheduled = True
+            self.defer(self.flush)
+
+    def flush(self):
+        """Runs the pending subscribers; events they publish go to the next cycle."""
+        pending, self._pending = self._pending, {}
+        self._scheduled = False
+        for name, callback in pending.items():
+            self.executed += 1
+            self.counts[name][0] += 1
+            callback()
+        if pending:
+            log.debug("Refresh cycle ran %s (executed %d, suppressed %d so far)",
+                      ", ".join(pending), self.executed, self.suppressed)
+
+    def stats(self):
+        """{"published", "executed", "suppressed", "by_name": {name: (executed, suppressed)}}."""
+        return {
+            "published": self.published,
+            "executed": self.executed,
+            "suppressed": self.suppressed,
+            "by_name": {name: tuple(c) for name, c in self.counts.items()},
+        }
@@ -0,0 +1,90 @@
+"""Runs database work off the Tk main thread.
+
+Jobs run in submission order on one worker thread, which owns its own pooled
+connection, so SQLite never sees concurrent writers from the app. Results are
+handed back on the main thread by polling from the Tk mainloop with after().
+
+Jobs submitted with a `key` coalesce: only the newest job for a key delivers
+its result, and older ones still waiting to start are skipped entirely. Tabs
+use this so that quick profile switches don't render stale refreshes.
+"""
+import queue
+from concurrent.futures import ThreadPoolExecutor
+
+from core.db import close_connections, get_connection
+
+class Superseded(Exception):
+    """Raised inside a job's future when a newer job with the same key replaced it."""
+
+class DBExecutor:
+    def __init__(self, root, on_error=None, poll_ms=15):
+        self.root = root
+        self.on_error = on_error
+        self.poll_ms = poll_ms
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db")
+        self._results = queue.SimpleQueue()
+        self._latest = {}       # key -> ticket of the newest job for that key
+        self._next_ticket = 0
+        self._pending = 0       # jobs whose result hasn't been delivered yet
+        self._polling = False
+        self.submitted = 0      # jobs ever submitted, for diagnostics
+        self.dropped = 0        # stale results discarded, for diagnostics
+
+    def submit(self, fn, *args, on_done=None, on_error=None, key=None, **kwargs):
+        """Runs fn(conn, *args, **kwargs) on the DB thread and calls on_done(result) on the main thread.
+
+        Must be called from the main thread. Returns the concurrent.futures.Future.
+        """
+        self._next_ticket += 1
+        self.submitted += 1
+        ticket = self._next_ticket
+        if key is not None:
+            self._latest[key] = ticket
+        future = self._pool.submit(self._run, key, ticket, fn, args, kwargs)
+        future.add_done_callback(
+            lambda f: self._results.put((key, ticket, f, on_done, on_error))
+        )
+        self._pending += 1
+        if not self._polling:
+            self._polling = True
+            self.root.after(self.poll_ms, self._poll)
+        return future
+
+    def is_current(self, key, ticket):
+        return key is None or self._latest.get(key) == ticket
+
+    def _run(self, key, ticket, fn, args, kwargs):
+        if not self.is_current(key, ticket):
+            raise Superseded(key)
+        return fn(get_connection(), *args, **kwargs)
+
+    def _poll(self):
+        while True:
+            try:
+                key, ticket, future, on_done, on_error = self._results.get_nowait()
+            except queue.Empty:
+                break
+            self._pending -= 1
+            self._deliver(key, ticket, future, on_done, on_error)
+        if self._pending:
+            self.root.after(self.poll_ms, self._poll)
+        else:
+            self._polling = False
+
+    def _deliver(self, key, ticket, future, on_done, on_error):
+        if not self.is_current(key, ticket):
+            self.dropped += 1
+            return
+        exc = future.exception()
+        if exc is not None:
+            handler = on_error or self.on_error
+            if handler is None:
+                raise exc
+            handler(exc)
+        elif on_done is not None:
+            on_done(future.result())
+
+    def shutdown(self):
+        """Waits for queued jobs to finish, then closes the worker's connection."""
+        self._pool.shutdown(wait=True)
+        close_connections()
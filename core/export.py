@@ -0,0 +1,93 @@
+"""File exports of the log tables.
+
+Rows are streamed from the cursor in chunks and written with csv.writer, so
+names containing commas or quotes round-trip and memory stays bounded no
+matter how many rows are exported.
+"""
+import csv
+import gzip
+import os
+
+CHUNK_SIZE = 2000
+
+# table -> (CSV header, columns selected from the table aliased as t)
+EXPORT_TABLES = {
+    "foods": (["User", "Date", "Food", "Calories"], "t.log_date, t.name, t.calories"),
+    "exercises": (["User", "Date", "Exercise", "CaloriesBurned"], "t.log_date, t.name, t.calories_burned"),
+    "weights": (["User", "Date", "WeightKg"], "t.log_date, t.weight_kg"),
+    "daily_totals": (
+        ["User", "Date", "FoodCalories", "CaloriesBurned", "Entries"],
+        "t.log_date, t.food_kcal, t.burned_kcal, t.entry_count",
+    ),
+}
+
+def _open_csv(path, compress):
+    if compress:
+        return gzip.open(path, "wt", encoding="utf-8", newline="")
+    return open(path, "w", encoding="utf-8", newline="")
+
+def _stream(cur, chunk_size):
+    while True:
+        rows = cur.fetchmany(chunk_size)
+        if not rows:
+            return
+        yield rows
+
+def export_day_csv(conn, user_id, d, folder):
+    """Writes one day's foods and exercises to two CSV files in `folder` and returns their paths."""
+    cur = conn.cursor()
+    cur.execute("SELECT name FROM users WHERE id=?", (user_id,))
+    uname_row = cur.fetchone()
+    uname = uname_row[0] if uname_row else "user"
+
+    paths = []
+    for table, header, cols in (
+        ("foods", ["Food", "Calories"], "name, calories"),
+        ("exercises", ["Exercise", "CaloriesBurned"], "name, calories_burned"),
+    ):
+        path = os.path.join(folder, f"{uname}_{d}_{table}.csv")
+        cur.execute(f"SELECT {cols} FROM {table} WHERE user_id=? AND log_date=? ORDER BY id", (user_id, d))
+        with _open_csv(path, False) as f:
+            w = csv.writer(f)
+            w.writerow(header)
+            for rows in _stream(cur, CHUNK_SIZE):
+                w.writerows(rows)
+        paths.append(path)
+    return tuple(paths)
+
+def export_range(conn, folder, start, end, user_ids=None, tables=tuple(EXPORT_TABLES),
+                 compress=False, prefix="export", chunk_size=CHUNK_SIZE, progress=None):
+    """Exports rows dated start..end (inclusive) for the given users (default: all) to CSV.
+
+    Writes one file per table, {prefix}_{table}_{start}_{end}.csv[.gz], and
+    returns {table: (path, rows_written)}. progress(table, rows_written) is
+    called after every chunk.
+    """
+    where = "t.log_date BETWEEN ? AND ?"
+    params = [start, end]
+    if user_ids is not None:
+        user_ids = list(user_ids)
+        where += f" AND t.user_id IN ({','.join('?' * len(user_ids))})"
+        params += user_ids
+
+    written = {}
+    ext = ".csv.gz" if compress else ".csv"
+    for table in tables:
+        header, cols = EXPORT_TABLES[table]
+        path = os.path.join(folder, f"{prefix}_{table}_{start}_{end}{ext}")
+        cur = conn.execute(
+            f"SELECT u.name, {cols} FROM {table} t JOIN users u ON u.id = t.user_id "
+            f"WHERE {where} ORDER BY t.user_id, t.log_date",
+            params,
+        )
+        count = 0
+        with _open_csv(path, compress) as f:
+            w = csv.writer(f)
+            w.writerow(header)
+            for rows in _stream(cur, chunk_size):
+                w.writerows(rows)
+                count += len(rows)
+                if progress:
+                    progress(table, count)
+        written[table] = (path, count)
+    return written
@@ -1,4 +1,4 @@
-from datetime import date
+from datetime import date, datetime
 
 ACTIVITY_FACTORS = {
     "Sedentary": 1.2,
@@ -12,6 +12,14 @@ def today_str():
     """Returns today's date in YYYY-MM-DD format."""
     return date.today().strftime("%Y-%m-%d")
 
+def check_date(d):
+    """Returns the date as YYYY-MM-DD, or raises ValueError if it isn't an ISO date.
+
+    Other ISO spellings Python accepts (2024-W01-1, 20240101, a time suffix) are
+    rewritten, so every stored log_date sorts and parses the same way.
+    """
+    return datetime.fromisoformat((d or "").strip()).date().isoformat()
+
 def calc_bmr(gender, weight_kg, height_cm, age_years):
     """Calculates Basal Metabolic Rate (BMR) using the Mifflin-St Jeor equation."""
     gender = gender.lower()
@@ -35,3 +43,90 @@ def apply_goal(tdee, goal):
         return tdee + 500
     else:  # Maintain
         return tdee
+
+def calc_bmi(weight_kg, height_cm):
+    """Calculates Body Mass Index."""
+    return weight_kg / ((height_cm / 100) ** 2)
+
+def bmi_category(bmi):
+    """Returns the WHO category for a BMI value."""
+    if bmi < 18.5:
+        return "Underweight"
+    elif bmi < 25:
+        return "Normal"
+    elif bmi < 30:
+        return "Overweight"
+    else:
+        return "Obese"
+
+def macro_grams(target, macro):
+    """Splits a calorie target into (protein, carb, fat) grams from percentage shares."""
+    p_g = target * macro["protein"] / 100 / 4
+    c_g = target * macro["carb"] / 100 / 4
+    f_g = target * macro["fat"] / 100 / 9
+    return p_g, c_g, f_g
+
+# Integer codes used by batch_targets: the index into each tuple
+GENDERS = ("Male", "Female")
+ACTIVITY_LEVELS = tuple(ACTIVITY_FACTORS)
+GOALS = ("Lose", "Maintain", "Gain")
+
+def encode(values, levels, default=None, ignore_case=True):
+    """Maps a sequence of labels to integer codes (index into `levels`) as a NumPy array.
+
+    Labels not in `levels` get the code of `default`, or -1. Each distinct
+    label is looked up once, so this stays fast for millions of rows.
+    """
+    import numpy as np
+
+    fold = str.lower if ignore_case else str
+    index = {fold(l): i for i, l in enumerate(levels)}
+    missing = index.get(fold(default), -1) if default is not None else -1
+    uniques, inverse = np.unique(np.asarray(values, dtype=str), return_inverse=True)
+    codes = np.array([index.get(fold(u), missing) for u in uniques], dtype=np.int8)
+    return codes[inverse].reshape(-1)
+
+def batch_targets(gender, weight_kg, height_cm, age_years, activity, goal, macro=None):
+    """Vectorised calc_bmr/calc_tdee/apply_goal/calc_bmi/macro_grams over whole columns.
+
+    gender, activity and goal are code arrays (see GENDERS, ACTIVITY_LEVELS,
+    GOALS and encode()) or label sequences, which are encoded the way the
+    scalar functions read them. macro is a {"protein", "carb", "fat"} dict of
+    percentages, scalars or per-row arrays. Returns a dict of float64 arrays:
+    bmr, tdee, target, bmi and protein_g/carb_g/fat_g when macro is given. The
+    arithmetic runs in the same order as the scalar functions, so the results
+    are bit-for-bit identical to them.
+    """
+    import numpy as np
+
+    def codes(values, levels, default, ignore_case=True):
+        a = np.asarray(values)
+        if a.dtype.kind in "iu":
+            return a
+        return encode(a, levels, default, ignore_case)
+
+    # The scalar functions treat anything but "male" as female, unknown activity as
+    # Moderate (matched case-sensitively) and anything but lose/gain as maintain
+    male = codes(gender, GENDERS, "Female") == 0
+    act = codes(activity, ACTIVITY_LEVELS, "Moderate", ignore_case=False)
+    g = codes(goal, GOALS, "Maintain")
+    w = np.asarray(weight_kg, dtype=np.float64)
+    h = np.asarray(height_cm, dtype=np.float64)
+    age = np.asarray(age_years, dtype=np.float64)
+
+    base = 10 * w + 6.25 * h - 5 * age
+    bmr = np.where(male, base + 5, base - 161)
+    factors = np.array([ACTIVITY_FACTORS[l] for l in ACTIVITY_LEVELS] + [ACTIVITY_FACTORS["Moderate"]])
+    tdee = bmr * factors[np.where((act >= 0) & (act < len(ACTIVITY_LEVELS)), act, -1)]
+    target = np.where(g == 0, tdee - 500, np.where(g == 2, tdee + 500, tdee))
+    out = {
+        "bmr": bmr,
+        "tdee": tdee,
+        "target": target,
+        "bmi": w / ((h / 100) ** 2),
+    }
+    if macro is not None:
+        out["protein_g"] = target * np.asarray(macro["protein"]) / 100 / 4
+        out["carb_g"] = target * np.asarray(macro["carb"]) / 100 / 4
+        out["fat_g"] = target * np.asarray(macro["fat"]) / 100 / 9
+    return out
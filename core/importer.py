@@ -0,0 +1,205 @@
+"""Streaming bulk import of foods, exercises and weights from CSV or JSON Lines.
+
+Rows are read one at a time, validated the same way the logger tabs validate
+input, and inserted with executemany in fixed-size batches inside a single
+transaction, so memory use doesn't depend on the file size and a failed
+import leaves the database untouched.
+
+Accepted columns (CSV header or JSON keys):
+    user or user_id          profile name or id
+    date or log_date         YYYY-MM-DD
+    name                     food/exercise name (foods, exercises)
+    calories / kcal          foods
+    calories_burned / kcal   exercises
+    weight_kg / weight       weights
+"""
+import csv
+import gzip
+import io
+import json
+import os
+import time
+from dataclasses import dataclass, field
+
+from core.db import deferred_search_index
+from core.helpers import check_date
+from core.targets import last_weight_id, record_weights_since
+
+DEFAULT_BATCH_SIZE = 5000
+MAX_REPORTED_ERRORS = 20
+
+# table -> (insert statement, accepted names for the value column)
+TABLES = {
+    "foods": (
+        "INSERT INTO foods(user_id, log_date, name, calories) VALUES(?,?,?,?)",
+        ("calories", "kcal"),
+    ),
+    "exercises": (
+        "INSERT INTO exercises(user_id, log_date, name, calories_burned) VALUES(?,?,?,?)",
+        ("calories_burned", "kcal", "calories"),
+    ),
+    "weights": (
+        "INSERT INTO weights(user_id, log_date, weight_kg) VALUES(?,?,?)",
+        ("weight_kg", "weight"),
+    ),
+}
+
+@dataclass
+class ImportResult:
+    table: str
+    inserted: int = 0
+    skipped: int = 0
+    seconds: float = 0.0
+    errors: list = field(default_factory=list)   # first MAX_REPORTED_ERRORS (line, message)
+
+    @property
+    def rows_per_sec(self):
+        return self.inserted / self.seconds if self.seconds else 0.0
+
+class RowError(ValueError):
+    """A row failed validation while importing with strict=True."""
+
+def _open_text(path):
+    if path.endswith(".gz"):
+        return io.TextIOWrapper(gzip.open(path, "rb"), encoding="utf-8", newline="")
+    return open(path, "r", encoding="utf-8", newline="")
+
+def detect_format(path):
+    """Returns "csv" or "jsonl" from the file extension (a trailing .gz is ignored)."""
+    base = path[:-3] if path.endswith(".gz") else path
+    ext = os.path.splitext(base)[1].lower()
+    if ext == ".csv":
+        return "csv"
+    if ext in (".jsonl", ".ndjson", ".json"):
+        return "jsonl"
+    raise ValueError(f"can't tell the format of {path!r}; pass fmt='csv' or 'jsonl'")
+
+def read_records(path, fmt=None):
+    """Yields (line_number, dict) for each record in the file, lazily.
+
+    A JSON line that doesn't parse to an object is yielded as a ValueError instead.
+    """
+    fmt = fmt or detect_format(path)
+    with _open_text(path) as f:
+        if fmt == "csv":
+            reader = csv.DictReader(f)
+            for record in reader:
+                yield reader.line_num, record
+        else:
+            for n, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    record = None
+                yield n, record if isinstance(record, dict) else ValueError("not a JSON object")
+
+def _pick(record, names):
+    for n in names:
+        v = record.get(n)
+        if v not in (None, ""):
+            return v
+    return None
+
+class _UserResolver:
+    """Maps user names/ids from the file to ids in the database, caching lookups."""
+    def __init__(self, conn):
+        self.conn = conn
+        self.by_name = {}
+        self.known_ids = set()
+
+    def __call__(self, record):
+        uid = _pick(record, ("user_id",))
+        if uid is not None:
+            uid = int(uid)
+            if uid not in self.known_ids:
+                if not self.conn.execute("SELECT 1 FROM users WHERE id=?", (uid,)).fetchone():
+                    raise ValueError(f"no profile with id {uid}")
+                self.known_ids.add(uid)
+            return uid
+        name = _pick(record, ("user", "user_name"))
+        if name is None:
+            raise ValueError("missing user or user_id")
+        if name not in self.by_name:
+            r = self.conn.execute("SELECT id FROM users WHERE name=?", (name,)).fetchone()
+            if not r:
+                raise ValueError(f"no profile named {name!r}")
+            self.by_name[name] = r[0]
+        return self.by_name[name]
+
+def parse_record(table, record, resolve_user):
+    """Validates one record and returns the tuple to insert, or raises ValueError."""
+    if isinstance(record, ValueError):
+        raise record
+    _, value_cols = TABLES[table]
+    uid = resolve_user(record)
+    try:
+        d = check_date(str(_pick(record, ("date", "log_date")) or ""))
+    except ValueError:
+        raise ValueError("date must be YYYY-MM-DD")
+    raw = _pick(record, value_cols)
+    try:
+        value = float(raw)
+    except (TypeError, ValueError):
+        raise ValueError(f"{value_cols[0]} must be a number")
+    if table == "weights":
+        return (uid, d, value)
+    name = (_pick(record, ("name",)) or "").strip()
+    if not name:
+        raise ValueError("missing name")
+    return (uid, d, name, value)
+
+def insert_batches(conn, sql, rows, batch_size=DEFAULT_BATCH_SIZE, progress=None):
+    """executemany()s `rows` in chunks of batch_size; the caller owns the transaction."""
+    batch = []
+    total = 0
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            conn.executemany(sql, batch)
+            total += len(batch)
+            batch.clear()
+            if progress:
+                progress(total)
+    if batch:
+        conn.executemany(sql, batch)
+        total += len(batch)
+        if progress:
+            progress(total)
+    return total
+
+def import_file(conn, table, path, fmt=None, batch_size=DEFAULT_BATCH_SIZE, strict=False, progress=None):
+    """Imports a CSV/JSONL file into `table` in one transaction and returns an ImportResult.
+
+    Invalid rows are skipped and reported, or abort the import when strict is True.
+    progress(rows_inserted) is called after every batch.
+    """
+    if table not in TABLES:
+        raise ValueError(f"unknown table {table!r}")
+    sql, _ = TABLES[table]
+    result = ImportResult(table)
+    resolve_user = _UserResolver(conn)
+
+    def valid_rows():
+        for line, record in read_records(path, fmt):
+            try:
+                yield parse_record(table, record, resolve_user)
+            except ValueError as e:
+                if strict:
+                    raise RowError(f"line {line}: {e}") from None
+                result.skipped += 1
+                if len(result.errors) < MAX_REPORTED_ERRORS:
+                    result.errors.append((line, str(e)))
+
+    t0 = time.perf_counter()
+    with conn:
+        conn.execute("BEGIN IMMEDIATE")
+        after_id = last_weight_id(conn) if table == "weights" else None
+        with deferred_search_index(conn):
+            result.inserted = insert_batches(conn, sql, valid_rows(), batch_size, progress)
+        if after_id is not None:
+            # Imported weights move the target like ones logged through add_weight
+            record_weights_since(conn, after_id)
+    result.seconds = time.perf_counter() - t0
+    return result
@@ -0,0 +1,170 @@
+"""Content-addressed cache of rendered chart images.
+
+A chart is identified by what it shows and how: (kind, input data, size, dpi,
+theme) plus the versions of the chart code and matplotlib, hashed with
+SHA-256. Drawing the same inputs again returns the stored PNG bytes instead
+of building a new figure.
+
+Two tiers: an LRU dict in memory capped at `max_bytes`, and PNG files under
+`folder` (capped at `max_disk_bytes`, oldest first out) that survive restarts.
+A disk hit is promoted into memory. Without a folder only memory is used.
+"""
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+# Bump whenever core.charts changes how any cached chart is drawn
+RENDER_VERSION = 1
+DEFAULT_MEMORY_BYTES = 32 * 1024 * 1024
+DEFAULT_DISK_BYTES = 256 * 1024 * 1024
+# Next to the database, like the database itself
+CACHE_DIR = os.path.join(os.path.dirname(__file__), "..", "chart_cache")
+
+def chart_key(kind, data, size, dpi, theme):
+    """Hex digest naming a chart; `data` is anything JSON can encode (tuples become lists).
+
+    The chart code's RENDER_VERSION and matplotlib's version are part of the key,
+    so images drawn by older code are never served from the disk tier.
+    """
+    # Imported here so the app doesn't load matplotlib before a chart is drawn
+    import matplotlib
+
+    blob = json.dumps([RENDER_VERSION, matplotlib.__version__, kind, data, list(size), dpi, theme],
+                      separators=(",", ":"), default=str)
+    return hashlib.sha256(blob.encode()).hexdigest()
+
+class RenderCache:
+    def __init__(self, folder=None, max_bytes=DEFAULT_MEMORY_BYTES, max_disk_bytes=DEFAULT_DISK_BYTES):
+        self.folder = folder
+        self.max_bytes = max_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self._items = OrderedDict()    # key -> png bytes, least recently used first
+        self._bytes = 0
+        self._disk_bytes = None        # measured on the first disk write
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _path(self, key):
+        return os.path.join(self.folder, key[:2], key + ".png")
+
+    def get(self, key):
+        """The cached PNG bytes for `key`, or None."""
+        with self._lock:
+            png = self._items.get(key)
+            if png is not None:
+                self._items.move_to_end(key)
+                self.memory_hits += 1
+                return png
+        png = self._read_disk(key)
+        with self._lock:
+            if png is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._remember(key, png)
+        return png
+
+    def put(self, key, png):
+        with self._lock:
+            self._remember(key, png)
+        if self.folder:
+            self._write_disk(key, png)
+
+    def get_or_render(self, kind, data, size, dpi, theme, render):
+        """PNG bytes for the chart, calling render() -> bytes only when neither tier has it."""
+        key = chart_key(kind, data, size, dpi, theme)
+        png = self.get(key)
+        if png is None:
+            png = render()
+            self.put(key, png)
+        return png
+
+    def clear(self):
+        """Empties the memory tier; files on disk are kept."""
+        with self._lock:
+            self._items.clear()
+            self._bytes = 0
+
+    def stats(self):
+        """{"memory_hits", "disk_hits", "misses", "evictions", "entries", "bytes"}."""
+        with self._lock:
+            return {
+                "memory_hits": self.memory_hits, "disk_hits": self.disk_hits, "misses": self.misses,
+                "evictions": self.evictions, "entries": len(self._items), "bytes": self._bytes,
+            }
+
+    def _remember(self, key, png):
+        # Called with the lock held
+        old = self._items.pop(key, None)
+        if old is not None:
+            self._bytes -= len(old)
+        if len(png) > self.max_bytes:
+            return
+        self._items[key] = png
+        self._bytes += len(png)
+        while self._bytes > self.max_bytes:
+            _, dropped = self._items.popitem(last=False)
+            self._bytes -= len(dropped)
+            self.evictions += 1
+
+    def _read_disk(self, key):
+        if not self.folder:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                png = f.read()
+            os.utime(path)    # recently used files are pruned last
+        except OSError:
+            return None
+        return png
+
+    def _write_disk(self, key, png):
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(png)
+            os.replace(tmp, path)
+        except OSError:
+            return    # the disk tier is best effort; the memory tier still has it
+        with self._lock:
+            if self._disk_bytes is None:
+                self._disk_bytes = sum(size for _, size, _ in self._disk_files())
+            else:
+                self._disk_bytes += len(png)
+            over = self._disk_bytes > self.max_disk_bytes
+        if over:
+            self._prune_disk()
+
+    def _disk_files(self):
+        for root, _, names in os.walk(self.folder):
+            for name in names:
+                if name.endswith(".png"):
+                    path = os.path.join(root, name)
+                    try:
+                        st = os.stat(path)
+                    except OSError:
+                        continue
+                    yield path, st.st_size, st.st_mtime
+
+    def _prune_disk(self):
+        """Deletes the least recently used files until the folder is down to 3/4 of its cap."""
+        files = sorted(self._disk_files(), key=lambda f: f[2])
+        total = sum(size for _, size, _ in files)
+        for path, size, _ in files:
+            if total <= self.max_disk_bytes * 3 // 4:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+        with self._lock:
+            self._disk_bytes = total
@@ -0,0 +1,186 @@
+"""Weekly reports for every profile, rendered in parallel worker processes.
+
+Users are split into chunks and handed to a ProcessPoolExecutor. Each worker
+opens one read-only connection, renders its charts with matplotlib's Agg
+backend, and writes per user into the output directory:
+
+    user-{id}.json          the week's totals, adherence and weight change
+    user-{id}-trends.png    net intake against target with the weight trend
+    user-{id}-weight.png    the whole weight history, as the Export tab saves it
+
+The parent appends one line per finished user to checkpoint.jsonl, so an
+interrupted run picks up where it stopped when started again with the same
+week. summary.csv collects every user's row once all are done.
+"""
+import csv
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date, timedelta
+
+import numpy as np
+
+from core.analytics import load_trends
+from core.db import read_only_connection, require_latest
+
+REPORT_DAYS = 7
+# The trends chart shows this many days up to the end of the report week
+CHART_DAYS = 28
+CHUNK_SIZE = 25
+CHECKPOINT_FILE = "checkpoint.jsonl"
+SUMMARY_FILE = "summary.csv"
+SUMMARY_FIELDS = ("user_id", "user", "from", "to", "days_logged", "food_kcal", "burned_kcal", "net_kcal",
+                  "avg_net_kcal", "target", "adherence", "weight_start", "weight_end", "weight_change")
+
+_conn = None    # the worker process's read-only connection
+
+def _init_worker(path):
+    global _conn
+    import matplotlib
+    matplotlib.use("Agg")
+    _conn = read_only_connection(path)
+
+def _num(v, digits=1):
+    v = float(v)
+    return None if v != v else round(v, digits)
+
+def _write_atomic(path, write):
+    tmp = path + ".tmp"
+    write(tmp)
+    os.replace(tmp, path)
+
+def week_report(conn, user_id, start, end, trends=None):
+    """The report row for one user over [start, end]; pass `trends` covering at least that range to reuse it."""
+    if trends is None:
+        trends = load_trends(conn, user_id, start, end, windows=(REPORT_DAYS,))
+    week = trends.dates >= np.datetime64(start, "D")
+    logged = trends.logged[week]
+    food = float((trends.food[week] * logged).sum())
+    burned = float((trends.burned[week] * logged).sum())
+    days = int(logged.sum())
+    weights = trends.weight[week]
+    weights = weights[~np.isnan(weights)]
+    row = conn.execute("SELECT name FROM users WHERE id=?", (user_id,)).fetchone()
+    return {
+        "user_id": user_id, "user": row[0] if row else None, "from": start, "to": end,
+        "days_logged": days, "food_kcal": round(food, 1), "burned_kcal": round(burned, 1),
+        "net_kcal": round(food - burned, 1), "avg_net_kcal": round((food - burned) / days, 1) if days else None,
+        "target": _num(trends.target[-1]) if len(trends) else None,
+        "adherence": _num(trends.rolling[REPORT_DAYS]["adherence"][-1], 3) if len(trends) else None,
+        "weight_start": _num(weights[0]) if len(weights) else None,
+        "weight_end": _num(weights[-1]) if len(weights) else None,
+        "weight_change": _num(weights[-1] - weights[0], 2) if len(weights) >= 2 else None,
+    }
+
+def _render_user(conn, user_id, start, end, out, charts):
+    chart_start = min(start, (date.fromisoformat(end) - timedelta(days=CHART_DAYS - 1)).isoformat())
+    trends = load_trends(conn, user_id, chart_start, end, windows=(REPORT_DAYS,))
+    report = week_report(conn, user_id, start, end, trends)
+    base = os.path.join(out, f"user-{user_id}")
+    if charts:
+        from core.charts import TrendsChart, WeightChart
+
+        chart = TrendsChart(figsize=(7.5, 4.6), windows=(REPORT_DAYS,), fontname=None)
+        chart.set_trends(trends)
+        chart.ax_net.set_title(f"{report['user']}: {start} to {end}")
+        # Fixed margins instead of bbox_inches="tight", which lays every chart out twice
+        _write_atomic(base + "-trends.png", lambda p: chart.figure.savefig(p, format="png"))
+        rows = conn.execute(
+            "SELECT log_date, weight_kg FROM weights WHERE user_id=? AND log_date <= ? ORDER BY log_date",
+            (user_id, end),
+        ).fetchall()
+        if rows:
+            weight = WeightChart(figsize=(7, 4), fontname=None)
+            weight.set_series(rows)
+            weight.figure.subplots_adjust(bottom=0.22)
+            _write_atomic(base + "-weight.png", lambda p: weight.figure.savefig(p, format="png"))
+
+    def dump(p):
+        with open(p, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    _write_atomic(base + ".json", dump)
+    return report
+
+def _render_chunk(user_ids, start, end, out, charts):
+    """Runs in a worker process: writes the reports for `user_ids` and returns their rows."""
+    return [_render_user(_conn, uid, start, end, out, charts) for uid in user_ids]
+
+def _read_checkpoint(path, header):
+    """{user_id: row} already finished for the same run, or None if there is no checkpoint."""
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        lines = f.read().splitlines()
+    try:
+        first = json.loads(lines[0])
+    except (IndexError, ValueError):
+        return None
+    if first != header:
+        raise ValueError(f"{path} belongs to another run ({first}); use another output folder or restart")
+    done = {}
+    for line in lines[1:]:
+        try:
+            row = json.loads(line)
+        except ValueError:
+            break
+        done[row["user_id"]] = row
+    return done
+
+def generate_reports(path, out, end, days=REPORT_DAYS, user_ids=None, workers=None, chunk_size=CHUNK_SIZE,
+                     charts=True, restart=False, progress=None):
+    """Writes the week ending `end` for every user (or `user_ids`) to `out` and returns all rows by user id.
+
+    Resumes from out/checkpoint.jsonl unless `restart`. progress(done, total) is
+    called after every finished chunk.
+    """
+    os.makedirs(out, exist_ok=True)
+    start = (date.fromisoformat(end) - timedelta(days=days - 1)).isoformat()
+    header = {"from": start, "to": end, "charts": charts}
+    checkpoint = os.path.join(out, CHECKPOINT_FILE)
+    done = (None if restart else _read_checkpoint(checkpoint, header)) or {}
+
+    # Rewritten whole so a line torn by a crash doesn't swallow the next append
+    def rewrite(p):
+        with open(p, "w", encoding="utf-8") as f:
+            f.writelines(json.dumps(r) + "\n" for r in [header, *done.values()])
+    _write_atomic(checkpoint, rewrite)
+
+    conn = read_only_connection(path)
+    try:
+        require_latest(conn, path)
+        ids = [r[0] for r in conn.execute("SELECT id FROM users ORDER BY id")]
+    finally:
+        conn.close()
+    if user_ids is not None:
+        wanted = set(user_ids)
+        ids = [uid for uid in ids if uid in wanted]
+    todo = [uid for uid in ids if uid not in done]
+    total, finished = len(ids), len(ids) - len(todo)
+    if progress:
+        progress(finished, total)
+
+    if todo:
+        chunks = [todo[i:i + chunk_size] for i in range(0, len(todo), chunk_size)]
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(path,)) as pool, \
+                open(checkpoint, "a", encoding="utf-8") as log:
+            futures = [pool.submit(_render_chunk, c, start, end, out, charts) for c in chunks]
+            for f in as_completed(futures):
+                rows = f.result()
+                for row in rows:
+                    log.write(json.dumps(row) + "\n")
+                    done[row["user_id"]] = row
+                log.flush()
+                os.fsync(log.fileno())
+                finished += len(rows)
+                if progress:
+                    progress(finished, total)
+
+    rows = [done[uid] for uid in ids]
+
+    def write_summary(p):
+        with open(p, "w", encoding="utf-8", newline="") as f:
+            w = csv.DictWriter(f, SUMMARY_FIELDS)
+            w.writeheader()
+            w.writerows(rows)
+    _write_atomic(os.path.join(out, SUMMARY_FILE), write_summary)
+    return rows
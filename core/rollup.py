@@ -0,0 +1,76 @@
+"""Per-day totals kept in the daily_totals table.
+
+The table is maintained by triggers on foods and exercises (see core.db).
+`python -m core rollup verify` reports drift and `python -m core rollup rebuild`
+recomputes it from the raw logs.
+"""
+from core.db import DAILY_TOTALS_SELECT
+
+# Totals are REAL sums, so allow for float error from incremental updates
+TOLERANCE = 1e-6
+
+def day_totals(conn, user_id, log_date):
+    """Returns (food_kcal, burned_kcal, entry_count) for one user and day."""
+    row = conn.execute(
+        "SELECT food_kcal, burned_kcal, entry_count FROM daily_totals WHERE user_id=? AND log_date=?",
+        (user_id, log_date),
+    ).fetchone()
+    return row or (0.0, 0.0, 0)
+
+def range_totals(conn, user_id, start, end):
+    """Returns [(log_date, food_kcal, burned_kcal, entry_count)] for days with entries in [start, end]."""
+    return conn.execute(
+        "SELECT log_date, food_kcal, burned_kcal, entry_count FROM daily_totals "
+        "WHERE user_id=? AND log_date BETWEEN ? AND ? ORDER BY log_date",
+        (user_id, start, end),
+    ).fetchall()
+
+def verify_daily_totals(conn):
+    """Compares daily_totals with the raw logs and returns the rows that differ.
+
+    Each item is (user_id, log_date, expected, actual), where expected/actual are
+    (food_kcal, burned_kcal, entry_count) tuples or None when the row is missing.
+    """
+    # The scratch table lives in TEMP, so this transaction never touches the main file
+    with conn:
+        conn.execute("DROP TABLE IF EXISTS temp.expected_totals")
+        conn.execute(
+            "CREATE TEMP TABLE expected_totals(user_id, log_date, food_kcal, burned_kcal, entry_count, "
+            "PRIMARY KEY (user_id, log_date))"
+        )
+        conn.execute("INSERT INTO temp.expected_totals " + DAILY_TOTALS_SELECT)
+        drift = []
+        rows = conn.execute(f"""
+            SELECT e.user_id, e.log_date, e.food_kcal, e.burned_kcal, e.entry_count,
+                   d.food_kcal, d.burned_kcal, d.entry_count
+            FROM temp.expected_totals e
+            LEFT JOIN daily_totals d ON d.user_id = e.user_id AND d.log_date = e.log_date
+            WHERE d.user_id IS NULL
+               OR abs(e.food_kcal - d.food_kcal) > {TOLERANCE}
+               OR abs(e.burned_kcal - d.burned_kcal) > {TOLERANCE}
+               OR e.entry_count != d.entry_count
+        """)
+        for uid, d, *vals in rows:
+            actual = tuple(vals[3:]) if vals[3] is not None else None
+            drift.append((uid, d, tuple(vals[:3]), actual))
+        rows = conn.execute("""
+            SELECT d.user_id, d.log_date, d.food_kcal, d.burned_kcal, d.entry_count
+            FROM daily_totals d
+            LEFT JOIN temp.expected_totals e ON e.user_id = d.user_id AND e.log_date = d.log_date
+            WHERE e.user_id IS NULL
+        """)
+        for uid, d, *vals in rows:
+            drift.append((uid, d, None, tuple(vals)))
+        conn.execute("DROP TABLE temp.expected_totals")
+    return drift
+
+def rebuild_daily_totals(conn):
+    """Recomputes daily_totals from foods and exercises in one transaction; returns the row count."""
+    with conn:
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute("DELETE FROM daily_totals")
+        conn.execute(
+            "INSERT INTO daily_totals(user_id, log_date, food_kcal, burned_kcal, entry_count) "
+            + DAILY_TOTALS_SELECT
+        )
+        return conn.execute("SELECT COUNT(*) FROM daily_totals").fetchone()[0]
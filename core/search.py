@@ -0,0 +1,149 @@
+"""Search over every logged food and exercise name.
+
+log_search is an FTS5 table kept in step with foods and exercises by triggers
+(core.db migration 6). Each user's rows carry a 'u<id>' token, so a per-user
+search is an index intersection rather than a filter over every match, and
+rowids order by log date, so newest-first results and date ranges come
+straight off the index. If SQLite was built without FTS5 the same API falls
+back to LIKE scans of the log tables, which is correct but slow on large
+histories.
+"""
+import re
+from dataclasses import dataclass, field
+
+PAGE_SIZE = 50
+KINDS = ("food", "exercise")
+
+@dataclass
+class SearchHit:
+    kind: str           # "food" or "exercise"
+    entry_id: int       # id in foods or exercises
+    user_id: int
+    log_date: str
+    name: str
+    kcal: float
+    score: float = 0.0  # bm25, lower is better; 0 for the LIKE fallback
+
+@dataclass
+class SearchPage:
+    hits: list = field(default_factory=list)
+    page: int = 0
+    page_size: int = PAGE_SIZE
+    has_more: bool = False
+
+def fts_available(conn):
+    """True if the log_search index exists in this database."""
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name='log_search'"
+    ).fetchone() is not None
+
+def match_query(text):
+    """Turns typed text into an FTS5 query: every word must match, the last one as a prefix.
+
+    Words are quoted, so punctuation and FTS operators in the input are taken literally.
+    """
+    words = re.findall(r"\w+", text)
+    if not words:
+        return None
+    terms = [f'"{w}"' for w in words]
+    terms[-1] += "*"
+    return " ".join(terms)
+
+def _like_filters(start, end, params):
+    where = []
+    if start:
+        where.append("log_date >= ?")
+        params.append(start)
+    if end:
+        where.append("log_date <= ?")
+        params.append(end)
+    return where
+
+def search_logs(conn, text, user_id=None, start=None, end=None, kinds=KINDS, order="recent",
+                page=0, page_size=PAGE_SIZE):
+    """Returns a SearchPage of entries whose name matches `text`.
+
+    order is "recent" (newest log date first) or "rank" (best bm25 match first);
+    page counts from 0. "recent" stops reading the index once the page is full,
+    so it stays fast however common the word; "rank" has to score every match.
+    """
+    if order not in ("rank", "recent"):
+        raise ValueError(f"unknown order {order!r}")
+    if fts_available(conn):
+        rows = _search_fts(conn, text, user_id, start, end, kinds, order, page, page_size)
+    else:
+        rows = _search_like(conn, text, user_id, start, end, kinds, page, page_size)
+    hits = [SearchHit(*r) for r in rows[:page_size]]
+    return SearchPage(hits, page, page_size, has_more=len(rows) > page_size)
+
+def _search_fts(conn, text, user_id, start, end, kinds, order, page, page_size):
+    query = match_query(text)
+    if query is None:
+        return []
+    query = f"name:({query})"
+    if user_id is not None:
+        query += f" AND owner:u{int(user_id)}"
+    params = [query]
+    where = ["log_search MATCH ?"]
+    # rowids start with the day number (see SEARCH_ROWID in core.db), so dates are a rowid range
+    if start:
+        where.append("rowid >= (CAST(julianday(?) AS INTEGER) << 32)")
+        params.append(start)
+    if end:
+        where.append("rowid < ((CAST(julianday(?) AS INTEGER) + 1) << 32)")
+        params.append(end)
+    if tuple(kinds) != KINDS:
+        where.append(f"kind IN ({','.join('?' * len(kinds))})")
+        params += list(kinds)
+    # Selecting rank makes FTS5 score every row, so only ask for it when ordering by it
+    order_by, score = ("rank", "rank") if order == "rank" else ("rowid DESC", "0.0")
+    # One extra row tells whether there is a next page; the joins only touch the page's rows
+    params += [page_size + 1, page * page_size]
+    return conn.execute(
+        f"""
+        SELECT s.kind, s.entry_id, s.user_id, s.log_date, s.name,
+               COALESCE(f.calories, e.calories_burned), s.score
+        FROM (
+            SELECT kind, (rowid & 4294967295) >> 1 AS entry_id, user_id, log_date, name, {score} AS score
+            FROM log_search
+            WHERE {' AND '.join(where)}
+            ORDER BY {order_by}
+            LIMIT ? OFFSET ?
+        ) s
+        LEFT JOIN foods f ON s.kind = 'food' AND f.id = s.entry_id
+        LEFT JOIN exercises e ON s.kind = 'exercise' AND e.id = s.entry_id
+        ORDER BY {"s.score" if order == "rank" else "s.log_date DESC, s.entry_id DESC"}
+        """,
+        params,
+    ).fetchall()
+
+def _search_like(conn, text, user_id, start, end, kinds, page, page_size):
+    words = re.findall(r"\w+", text)
+    if not words:
+        return []
+    parts, params = [], []
+    for kind, table, kcal_col in (("food", "foods", "calories"), ("exercise", "exercises", "calories_burned")):
+        if kind not in kinds:
+            continue
+        where = ["name LIKE ? ESCAPE '\\'"] * len(words)
+        params += ["%" + w.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%" for w in words]
+        if user_id is not None:
+            where.append("user_id = ?")
+            params.append(user_id)
+        where += _like_filters(start, end, params)
+        parts.append(
+            f"SELECT '{kind}', id, user_id, log_date, name, {kcal_col}, 0.0 FROM {table} "
+            f"WHERE {' AND '.join(where)}"
+        )
+    if not parts:
+        return []
+    params += [page_size + 1, page * page_size]
+    # No relevance score without FTS5, so "rank" also lists the newest entries first
+    return conn.execute(
+        f"{' UNION ALL '.join(parts)} ORDER BY 4 DESC, 2 DESC LIMIT ? OFFSET ?", params
+    ).fetchall()
+
+def last_logged(conn, text, user_id=None):
+    """The newest entry matching `text`, or None: "when did I last log paneer"."""
+    page = search_logs(conn, text, user_id, order="recent", page_size=1)
+    return page.hits[0] if page.hits else None
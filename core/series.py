@@ -0,0 +1,83 @@
+"""Vectorized time-series preparation for the weight charts.
+
+Rows from the weights table are parsed once into NumPy arrays, the rolling
+average is computed over the full-resolution data, and only then is the
+series reduced to about one point per pixel with LTTB (largest triangle
+three buckets), which keeps the visual peaks and troughs of the line.
+"""
+import numpy as np
+
+def parse_series(rows):
+    """Turns [(log_date, value)] rows into (datetime64[s] array, float64 array) sorted by date."""
+    if not rows:
+        return np.array([], dtype="datetime64[s]"), np.array([], dtype=np.float64)
+    dates, values = zip(*rows)
+    x = np.array(dates, dtype="datetime64[s]")
+    y = np.array(values, dtype=np.float64)
+    if np.any(x[1:] < x[:-1]):
+        order = np.argsort(x, kind="stable")
+        x, y = x[order], y[order]
+    return x, y
+
+def rolling_mean(x, y, window_days):
+    """Mean of the samples within the trailing `window_days` of each point; irregular spacing is fine."""
+    if len(x) == 0:
+        return y.copy()
+    t = x.astype("datetime64[s]").astype(np.int64)
+    left = np.searchsorted(t, t - int(window_days * 86400), side="right")
+    csum = np.concatenate(([0.0], np.cumsum(y)))
+    idx = np.arange(1, len(y) + 1)
+    return (csum[idx] - csum[left]) / (idx - left)
+
+def lttb_indices(x, y, threshold):
+    """Indices of the points LTTB keeps when reducing the series to `threshold` points."""
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    t = x.astype("datetime64[s]").astype(np.float64) if x.dtype.kind == "M" else x.astype(np.float64)
+    # Bucket edges for the n-2 interior points; first and last points are always kept
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    out = np.empty(threshold, dtype=np.int64)
+    out[0], out[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        lo, hi = edges[i], edges[i + 1]
+        nlo, nhi = hi, edges[i + 2] if i + 2 < len(edges) else n
+        # Average of the next bucket is the third corner of the triangle
+        cx, cy = t[nlo:nhi].mean(), y[nlo:nhi].mean()
+        bx, by = t[lo:hi], y[lo:hi]
+        area = np.abs((t[a] - cx) * (by - y[a]) - (t[a] - bx) * (cy - y[a]))
+        a = lo + int(np.argmax(area))
+        out[i + 1] = a
+    return out
+
+class WeightSeries:
+    """Full-resolution weights with their rolling average; hands out downsampled views."""
+    def __init__(self, rows=(), window_days=7):
+        self.window_days = window_days
+        self.x, self.y = parse_series(list(rows))
+        self.avg = rolling_mean(self.x, self.y, window_days)
+
+    def __len__(self):
+        return len(self.x)
+
+    def add(self, log_date, value):
+        """Inserts one sample in date order and recomputes the rolling average."""
+        when = np.datetime64(log_date, "s")
+        i = int(np.searchsorted(self.x, when, side="right"))
+        self.x = np.insert(self.x, i, when)
+        self.y = np.insert(self.y, i, value)
+        self.avg = rolling_mean(self.x, self.y, self.window_days)
+
+    def view(self, max_points, start=None, end=None):
+        """Returns (x, y, avg) for the samples in [start, end], reduced to at most max_points."""
+        lo, hi = 0, len(self.x)
+        if start is not None:
+            lo = int(np.searchsorted(self.x, np.datetime64(start, "s"), side="left"))
+        if end is not None:
+            hi = int(np.searchsorted(self.x, np.datetime64(end, "s"), side="right"))
+        # Keep one neighbour either side so the line runs off the edges when zoomed
+        lo, hi = max(lo - 1, 0), min(hi + 1, len(self.x))
+        x, y, avg = self.x[lo:hi], self.y[lo:hi], self.avg[lo:hi]
+        keep = lttb_indices(x, y, max_points)
+        return x[keep], y[keep], avg[keep]
@@ -0,0 +1,381 @@
+"""Local HTTP/JSON API over the core layer: `python -m core serve`.
+
+Lets many people log into one database through a single process. Reads run
+on a bounded pool of threads, each with its own connection; WAL lets them
+read while a write is in progress. Every write goes through one group-commit
+writer (core.writer), so SQLite never sees two writers, a burst of requests
+waits its turn instead of failing with "database is locked", and concurrent
+writes share one commit.
+
+HTTP/1.1 with keep-alive is parsed directly on asyncio streams, so no web
+framework is needed. Endpoints (user ids in the path; dates default to today):
+
+    GET    /health
+    GET    /users                              POST /users  {name, gender, age, height, weight, activity, goal, macro}
+    GET    /users/{id}/profile                 GET  /users/{id}/targets
+    GET    /users/{id}/summary?date=
+    GET    /users/{id}/foods?date=&before_id=&limit=       (same for /exercises)
+    POST   /users/{id}/foods {date, name, kcal}            (same for /exercises)
+    DELETE /users/{id}/foods?date=                         (same for /exercises)
+    GET    /users/{id}/weights                 POST /users/{id}/weights {date, weight}
+    GET    /calculate?gender=&weight=&height=&age=&activity=&goal=
+"""
+import asyncio
+import json
+import logging
+import re
+import signal
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from urllib.parse import parse_qsl, urlsplit
+
+from core import store
+from core.db import close_connections, get_connection
+from core.writer import DEFAULT_MAX_DELAY_MS, GroupCommitWriter
+from core.helpers import bmi_category, check_date, today_str
+from core.rollup import day_totals
+from core.targets import DEFAULT_MACRO, cached_targets, compute_targets, get_targets
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+# Reader threads, each holding one connection
+READ_WORKERS = 8
+# Writes waiting for the writer; further requests wait for a slot
+WRITE_QUEUE_SIZE = 1024
+MAX_BODY = 64 * 1024
+# Seconds an idle keep-alive connection is kept open
+IDLE_TIMEOUT = 30
+
+log = logging.getLogger(__name__)
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+class CoreService:
+    """Runs core functions for the server: reads on a thread pool, writes in order through one writer."""
+    def __init__(self, path=None, readers=READ_WORKERS, commit_delay_ms=DEFAULT_MAX_DELAY_MS):
+        self.path = path
+        self.commit_delay_ms = commit_delay_ms
+        self._readers = ThreadPoolExecutor(max_workers=readers, thread_name_prefix="db-read")
+        self._writer = None
+        self._slots = None
+        self.reads = 0
+        self.writes = 0
+
+    def _call(self, fn, args):
+        return fn(get_connection(self.path), *args)
+
+    async def start(self):
+        self._slots = asyncio.Semaphore(WRITE_QUEUE_SIZE)
+        self._writer = GroupCommitWriter(self.path, max_delay_ms=self.commit_delay_ms)
+
+    async def close(self):
+        """Commits the queued writes, then stops the threads and closes their connections."""
+        if self._writer is not None:
+            await asyncio.get_running_loop().run_in_executor(None, self._writer.close)
+        self._readers.shutdown(wait=True)
+        close_connections()
+
+    async def read(self, fn, *args):
+        """fn(conn, *args) on a reader thread."""
+        self.reads += 1
+        return await asyncio.get_running_loop().run_in_executor(self._readers, self._call, fn, args)
+
+    async def write(self, fn, *args):
+        """fn(conn, *args) on the writer thread, after every write queued before it; returns once committed."""
+        async with self._slots:
+            result = await asyncio.wrap_future(self._writer.submit(fn, *args))
+        self.writes += 1
+        return result
+
+    def queued(self):
+        return self._writer.pending() if self._writer is not None else 0
+
+# --- request helpers ---
+
+def _field(data, name, convert=str, default=None):
+    value = data.get(name, default)
+    if value is None:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, f"missing {name!r}")
+    try:
+        return convert(value)
+    except (TypeError, ValueError):
+        raise HTTPError(HTTPStatus.BAD_REQUEST, f"invalid {name!r}: {value!r}") from None
+
+def _date(data, name="date"):
+    return _field(data, name, check_date, today_str())
+
+def _macro(data):
+    # Percentage shares as the Profile tab saves them: protein, carb and fat adding up to 100
+    macro = data.get("macro", DEFAULT_MACRO)
+    if not isinstance(macro, dict):
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "'macro' must be an object of protein, carb and fat percentages")
+    shares = {}
+    for key in DEFAULT_MACRO:
+        value = macro.get(key)
+        if value is None:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, f"missing 'macro.{key}'")
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or not 0 <= value <= 100:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, f"'macro.{key}' must be a percentage from 0 to 100")
+        shares[key] = value
+    if abs(sum(shares.values()) - 100) > 1e-6:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "'macro' protein + carb + fat must equal 100")
+    return shares
+
+def _content_length(headers):
+    # None for anything but a plain non-negative integer (int() would also take "+5" or "1_0")
+    value = headers.get("content-length") or "0"
+    return int(value) if value.isascii() and value.isdigit() else None
+
+def _require_user(conn, user_id):
+    if store.get_profile(conn, user_id) is None:
+        raise HTTPError(HTTPStatus.NOT_FOUND, f"no profile with id {user_id}")
+
+def _checked(fn):
+    """Wraps a store write so it 404s for a missing user, inside the same writer job."""
+    def run(conn, user_id, *args):
+        _require_user(conn, user_id)
+        return fn(conn, user_id, *args)
+    return run
+
+_add_food = _checked(store.add_food)
+_add_exercise = _checked(store.add_exercise)
+_add_weight = _checked(store.add_weight)
+_reset_food_day = _checked(store.reset_food_day)
+_reset_exercise_day = _checked(store.reset_exercise_day)
+
+def _profile(conn, user_id):
+    profile = store.get_profile(conn, user_id)
+    if profile is None:
+        raise HTTPError(HTTPStatus.NOT_FOUND, f"no profile with id {user_id}")
+    return profile
+
+def _day_summary(conn, user_id, d):
+    _require_user(conn, user_id)
+    food, burned, entries = day_totals(conn, user_id, d)
+    return {"date": d, "food_kcal": food, "burned_kcal": burned, "net_kcal": food - burned,
+            "entries": entries, "target": None}
+
+def _page(page_fn, count_fn):
+    def run(conn, user_id, d, before_id, limit):
+        _require_user(conn, user_id)
+        rows = page_fn(conn, user_id, d, before_id, limit)
+        return {"date": d, "count": count_fn(conn, user_id, d),
+                "entries": [{"id": i, "name": n, "kcal": k} for i, n, k in rows]}
+    return run
+
+_food_page = _page(store.food_page, store.count_foods)
+_exercise_page = _page(store.exercise_page, store.count_exercises)
+
+async def _targets(svc, user_id):
+    # The cache is a read; only a miss (a profile edited since) needs the writer
+    targets = await svc.read(cached_targets, user_id)
+    if targets is None:
+        targets = await svc.write(get_targets, user_id)
+    return targets
+
+# --- handlers: (service, user_id or None, query, body) -> (status, data) ---
+
+async def health(svc, _uid, _query, _body):
+    return HTTPStatus.OK, {"ok": True, "queued_writes": svc.queued(), "reads": svc.reads, "writes": svc.writes}
+
+async def list_users(svc, _uid, _query, _body):
+    return HTTPStatus.OK, await svc.read(store.user_names)
+
+async def save_profile(svc, _uid, _query, body):
+    uid = await svc.write(
+        store.save_profile, _field(body, "name"), _field(body, "gender", default="Male"),
+        _field(body, "age", int), _field(body, "height", float), _field(body, "weight", float),
+        _field(body, "activity", default="Moderate"), _field(body, "goal", default="Maintain"),
+        _macro(body),
+    )
+    return HTTPStatus.CREATED, {"id": uid}
+
+async def profile(svc, uid, _query, _body):
+    return HTTPStatus.OK, await svc.read(_profile, uid)
+
+async def targets(svc, uid, _query, _body):
+    await svc.read(_require_user, uid)
+    return HTTPStatus.OK, await _targets(svc, uid)
+
+async def summary(svc, uid, query, _body):
+    result = await svc.read(_day_summary, uid, _date(query))
+    t = await _targets(svc, uid)
+    if t:
+        result["target"] = t["target"]
+    return HTTPStatus.OK, result
+
+def _log_handlers(page, add, reset):
+    async def get(svc, uid, query, _body):
+        before = _field(query, "before_id", int, -1)
+        limit = min(_field(query, "limit", int, store.LIST_PAGE), store.LIST_PAGE)
+        return HTTPStatus.OK, await svc.read(page, uid, _date(query), None if before < 0 else before, limit)
+
+    async def post(svc, uid, _query, body):
+        name = _field(body, "name").strip()
+        if not name:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "'name' must not be empty")
+        new_id = await svc.write(add, uid, _date(body), name, _field(body, "kcal", float))
+        return HTTPStatus.CREATED, {"id": new_id}
+
+    async def delete(svc, uid, query, _body):
+        return HTTPStatus.OK, {"deleted": await svc.write(reset, uid, _date(query))}
+
+    return get, post, delete
+
+foods_get, foods_post, foods_delete = _log_handlers(_food_page, _add_food, _reset_food_day)
+exercises_get, exercises_post, exercises_delete = _log_handlers(_exercise_page, _add_exercise, _reset_exercise_day)
+
+async def weights_get(svc, uid, _query, _body):
+    await svc.read(_require_user, uid)
+    rows = await svc.read(store.weight_series, uid)
+    return HTTPStatus.OK, [{"date": d, "weight": w} for d, w in rows]
+
+async def weights_post(svc, uid, _query, body):
+    new_id = await svc.write(_add_weight, uid, _date(body), _field(body, "weight", float))
+    return HTTPStatus.CREATED, {"id": new_id}
+
+async def calculate(_svc, _uid, query, _body):
+    goal = _field(query, "goal", default="Maintain")
+    r = compute_targets(
+        _field(query, "gender", default="Male"), _field(query, "weight", float), _field(query, "height", float),
+        _field(query, "age", int), _field(query, "activity", default="Moderate"), goal,
+    )
+    return HTTPStatus.OK, dict(r, goal=goal, bmi_category=bmi_category(r["bmi"]))
+
+# (method, path pattern, handler); a (\d+) group is the user id
+ROUTES = [
+    ("GET", r"/health", health),
+    ("GET", r"/users", list_users),
+    ("POST", r"/users", save_profile),
+    ("GET", r"/users/(\d+)/profile", profile),
+    ("GET", r"/users/(\d+)/targets", targets),
+    ("GET", r"/users/(\d+)/summary", summary),
+    ("GET", r"/users/(\d+)/foods", foods_get),
+    ("POST", r"/users/(\d+)/foods", foods_post),
+    ("DELETE", r"/users/(\d+)/foods", foods_delete),
+    ("GET", r"/users/(\d+)/exercises", exercises_get),
+    ("POST", r"/users/(\d+)/exercises", exercises_post),
+    ("DELETE", r"/users/(\d+)/exercises", exercises_delete),
+    ("GET", r"/users/(\d+)/weights", weights_get),
+    ("POST", r"/users/(\d+)/weights", weights_post),
+    ("GET", r"/calculate", calculate),
+]
+_ROUTES = [(m, re.compile(p + r"/?"), h) for m, p, h in ROUTES]
+
+async def dispatch(svc, method, target, body):
+    """Runs one request and returns (status, JSON-able data)."""
+    parts = urlsplit(target)
+    allowed = []
+    for m, pattern, handler in _ROUTES:
+        match = pattern.fullmatch(parts.path)
+        if not match:
+            continue
+        if m != method:
+            allowed.append(m)
+            continue
+        query = dict(parse_qsl(parts.query))
+        uid = int(match.group(1)) if pattern.groups else None
+        try:
+            data = json.loads(body) if body else {}
+        except ValueError:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "body is not valid JSON") from None
+        if not isinstance(data, dict):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "body must be a JSON object")
+        return await handler(svc, uid, query, data)
+    if allowed:
+        raise HTTPError(HTTPStatus.METHOD_NOT_ALLOWED, f"use {', '.join(allowed)}")
+    raise HTTPError(HTTPStatus.NOT_FOUND, f"no route for {parts.path}")
+
+async def _respond(svc, method, target, body):
+    try:
+        status, data = await dispatch(svc, method, target, body)
+    except HTTPError as e:
+        status, data = e.status, {"error": str(e)}
+    except sqlite3.IntegrityError as e:
+        status, data = HTTPStatus.CONFLICT, {"error": str(e)}
+    except ValueError as e:
+        status, data = HTTPStatus.BAD_REQUEST, {"error": str(e)}
+    except Exception as e:
+        log.exception("%s %s failed", method, target)
+        status, data = HTTPStatus.INTERNAL_SERVER_ERROR, {"error": f"{type(e).__name__}: {e}"}
+    return status, json.dumps(data).encode()
+
+async def handle_client(svc, reader, writer):
+    """Serves requests on one connection until the client closes it or goes idle."""
+    try:
+        while True:
+            try:
+                line = await asyncio.wait_for(reader.readline(), IDLE_TIMEOUT)
+            except asyncio.TimeoutError:
+                break
+            if not line:
+                break
+            try:
+                method, target, version = line.decode("latin-1").split()
+            except ValueError:
+                break
+            headers = {}
+            while True:
+                h = await reader.readline()
+                if h in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = h.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+            # Without a usable length the rest of the stream can't be framed, so the connection is closed
+            length = _content_length(headers)
+            if length is None:
+                status, payload = HTTPStatus.BAD_REQUEST, b'{"error": "invalid Content-Length"}'
+                keep_alive = False
+            elif length > MAX_BODY:
+                status, payload = HTTPStatus.REQUEST_ENTITY_TOO_LARGE, b'{"error": "body too large"}'
+                keep_alive = False
+            else:
+                body = await reader.readexactly(length) if length else b""
+                status, payload = await _respond(svc, method.upper(), target, body)
+                conn_header = headers.get("connection", "").lower()
+                keep_alive = conn_header != "close" and (version != "HTTP/1.0" or conn_header == "keep-alive")
+            writer.write(
+                f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+                f"Content-Type: application/json\r\nContent-Length: {len(payload)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode() + payload
+            )
+            await writer.drain()
+            if not keep_alive:
+                break
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+async def serve(path=None, host=DEFAULT_HOST, port=DEFAULT_PORT, readers=READ_WORKERS,
+                commit_delay_ms=DEFAULT_MAX_DELAY_MS, ready=None):
+    """Runs the server until cancelled. `ready(host, port)` is called once it is listening."""
+    svc = CoreService(path, readers, commit_delay_ms)
+    await svc.start()
+    try:
+        # SIGTERM stops the server the same way Ctrl+C does, finishing queued writes first
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+    except (NotImplementedError, RuntimeError):
+        pass    # Windows event loops have no signal handlers
+    server = await asyncio.start_server(lambda r, w: handle_client(svc, r, w), host, port, backlog=1024)
+    try:
+        if ready:
+            ready(*server.sockets[0].getsockname()[:2])
+        async with server:
+            await server.serve_forever()
+    finally:
+        await svc.close()
+
+def run(path=None, host=DEFAULT_HOST, port=DEFAULT_PORT, readers=READ_WORKERS,
+        commit_delay_ms=DEFAULT_MAX_DELAY_MS):
+    """Blocking entry point for the CLI; stops on Ctrl+C."""
+    def ready(h, p):
+        print(f"listening on http://{h}:{p}", flush=True)
+    try:
+        asyncio.run(serve(path, host, port, readers, commit_delay_ms, ready))
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        pass
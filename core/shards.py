@@ -0,0 +1,207 @@
+"""Optional sharded storage: per-user or hash-bucketed log files plus a small catalog.
+
+Layout under a root directory:
+
+    {root}/catalog.db            users, user_targets, targets_history
+    {root}/shards/shard-007.db   foods, exercises, weights, daily_totals, log_search, food_catalog
+
+With `buckets` N > 0 a user's logs live in shard user_id % N; with 0 every
+user gets a file of their own (user-{id}.db). Each shard has its own write
+lock, so users on different shards never wait for each other.
+
+ShardRouter.connection(user_id) opens the user's shard with the catalog
+ATTACHed. Shards have no users or targets tables, so unqualified names in
+core.store and core.targets resolve to the catalog and the existing
+functions work on it unchanged. In WAL mode a write that touches both files
+(a weight, which also appends to targets_history) commits each file
+separately rather than atomically. Entry ids are unique per shard, not
+across shards. Each shard keeps its own food catalogue, learnt from the
+foods logged in it.
+
+Only the `shards` commands use the router; the app, the server and the other
+CLI commands open the single file, which stays the live database. A migration
+is a copy of it at that moment: the shards do not follow later writes, so
+migrate again into a fresh root to report on newer data.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from core.db import (
+    db_connect, deferred_search_index, get_connection, read_only_connection, read_only_uri, require_latest,
+    setup_database,
+)
+
+CATALOG_FILE = "catalog.db"
+SHARD_DIR = "shards"
+DEFAULT_BUCKETS = 16
+# Tables that live only in the catalog; dropped from every shard
+CATALOG_TABLES = ("users", "user_targets", "targets_history")
+LOG_TABLES = {
+    "foods": "user_id, log_date, name, calories",
+    "exercises": "user_id, log_date, name, calories_burned",
+    "weights": "user_id, log_date, weight_kg",
+}
+
+def _create_shard(path):
+    setup_database(path)
+    conn = db_connect(path)
+    with conn:
+        for table in CATALOG_TABLES:
+            conn.execute(f"DROP TABLE IF EXISTS {table}")
+    conn.close()
+
+def _create_catalog(path, buckets):
+    setup_database(path)
+    conn = db_connect(path)
+    with conn:
+        conn.execute("CREATE TABLE IF NOT EXISTS shard_meta (key TEXT PRIMARY KEY, value TEXT)")
+        conn.execute("INSERT OR IGNORE INTO shard_meta VALUES ('buckets', ?)", (str(buckets),))
+    conn.close()
+
+class ShardRouter:
+    """Maps user ids to shard files and hands out connections for them."""
+    def __init__(self, root, buckets=None):
+        """Opens the sharded store at `root`, creating it with `buckets` (default 16) if it is new."""
+        self.root = os.path.abspath(root)
+        self.catalog_path = os.path.join(self.root, CATALOG_FILE)
+        os.makedirs(os.path.join(self.root, SHARD_DIR), exist_ok=True)
+        if not os.path.exists(self.catalog_path):
+            _create_catalog(self.catalog_path, DEFAULT_BUCKETS if buckets is None else buckets)
+        conn = db_connect(self.catalog_path)
+        self.buckets = int(conn.execute("SELECT value FROM shard_meta WHERE key='buckets'").fetchone()[0])
+        conn.close()
+        if buckets is not None and buckets != self.buckets:
+            raise ValueError(f"{root} is split into {self.buckets} buckets, not {buckets}")
+        self._ready = set()                   # shard paths known to exist
+        self._attached = {}                   # id -> connection with the catalog attached
+
+    def shard_name(self, user_id):
+        if self.buckets:
+            return f"shard-{int(user_id) % self.buckets:03d}.db"
+        return f"user-{int(user_id)}.db"
+
+    def shard_path(self, user_id):
+        return os.path.join(self.root, SHARD_DIR, self.shard_name(user_id))
+
+    def shard_paths(self):
+        """Every shard file that exists, sorted."""
+        folder = os.path.join(self.root, SHARD_DIR)
+        return sorted(os.path.join(folder, n) for n in os.listdir(folder) if n.endswith(".db"))
+
+    def catalog(self):
+        """This thread's connection to the catalog (users and targets only)."""
+        return get_connection(self.catalog_path)
+
+    def connection(self, user_id):
+        """This thread's connection to the user's shard, with the catalog attached."""
+        path = self.shard_path(user_id)
+        if path not in self._ready:
+            if not os.path.exists(path):
+                _create_shard(path)
+            self._ready.add(path)
+        conn = get_connection(path)
+        if self._attached.get(id(conn)) is not conn:
+            conn.execute("ATTACH DATABASE ? AS catalog", (self.catalog_path,))
+            self._attached[id(conn)] = conn
+        return conn
+
+    def groups(self, user_ids):
+        """{shard path: [user ids]} for the given users."""
+        out = {}
+        for uid in user_ids:
+            out.setdefault(self.shard_path(uid), []).append(uid)
+        return out
+
+def _shard_totals(path, user_ids, start, end):
+    """Runs in a worker process: (user_id, days logged, food kcal, burned kcal) per user in one shard."""
+    if not os.path.exists(path):
+        return [(uid, 0, 0.0, 0.0) for uid in user_ids]
+    conn = read_only_connection(path)
+    try:
+        found = {
+            r[0]: r for r in conn.execute(
+                f"SELECT user_id, COUNT(*), SUM(food_kcal), SUM(burned_kcal) FROM daily_totals "
+                f"WHERE user_id IN ({','.join('?' * len(user_ids))}) AND log_date BETWEEN ? AND ? "
+                "GROUP BY user_id",
+                [*user_ids, start, end],
+            )
+        }
+    finally:
+        conn.close()
+    return [found.get(uid, (uid, 0, 0.0, 0.0)) for uid in user_ids]
+
+def shard_report(router, start, end, user_ids=None, workers=None):
+    """Per-user totals for [start, end] across every shard, one worker process per shard at a time.
+
+    Returns [{"user_id", "user", "days", "food_kcal", "burned_kcal", "net_kcal", "avg_net_kcal"}] by user id.
+    """
+    names = dict(router.catalog().execute("SELECT id, name FROM users").fetchall())
+    ids = sorted(names) if user_ids is None else sorted(user_ids)
+    groups = router.groups(ids)
+    rows = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_shard_totals, path, uids, start, end) for path, uids in groups.items()]
+        for f in futures:
+            rows += f.result()
+    report = []
+    for uid, days, food, burned in sorted(rows):
+        food, burned = food or 0.0, burned or 0.0
+        report.append({
+            "user_id": uid, "user": names.get(uid), "days": days, "food_kcal": food, "burned_kcal": burned,
+            "net_kcal": food - burned, "avg_net_kcal": (food - burned) / days if days else None,
+        })
+    return report
+
+def migrate_to_shards(src, root, buckets=DEFAULT_BUCKETS, progress=None):
+    """Copies a single-file database into a new sharded store at `root` and returns its ShardRouter.
+
+    Users, cached targets and the targets history go to the catalog with their
+    ids; each user's foods, exercises and weights go to their shard in log order.
+    The daily totals, search index and food catalogue of each shard are built by
+    its triggers as the rows arrive. progress(shard path, {table: rows}) is
+    called after each shard.
+
+    The source is attached read-only and must already be at the current schema
+    version; it is left exactly as it was.
+    """
+    src = os.path.abspath(src)
+    if os.path.exists(os.path.join(root, CATALOG_FILE)):
+        raise ValueError(f"{root} already holds a sharded store")
+    if not os.path.exists(src):
+        raise ValueError(f"{src} does not exist")
+    conn = read_only_connection(src)
+    try:
+        require_latest(conn, src)
+    finally:
+        conn.close()
+    router = ShardRouter(root, buckets)
+    source = read_only_uri(src)
+
+    conn = db_connect(router.catalog_path)
+    with conn:
+        conn.execute("ATTACH DATABASE ? AS src", (source,))
+        for table in CATALOG_TABLES:
+            conn.execute(f"INSERT INTO main.{table} SELECT * FROM src.{table}")
+    conn.execute("DETACH DATABASE src")
+    user_ids = [r[0] for r in conn.execute("SELECT id FROM users ORDER BY id")]
+    conn.close()
+
+    for path, uids in router.groups(user_ids).items():
+        _create_shard(path)
+        moved = {}
+        conn = db_connect(path)
+        with conn:
+            conn.execute("ATTACH DATABASE ? AS src", (source,))
+            conn.execute("BEGIN IMMEDIATE")
+            with deferred_search_index(conn):
+                for table, cols in LOG_TABLES.items():
+                    moved[table] = conn.execute(
+                        f"INSERT INTO main.{table}({cols}) SELECT {cols} FROM src.{table} "
+                        f"WHERE user_id IN ({','.join('?' * len(uids))}) ORDER BY id",
+                        uids,
+                    ).rowcount
+        conn.execute("DETACH DATABASE src")
+        conn.close()
+        if progress:
+            progress(path, moved)
+    return router
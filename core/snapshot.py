@@ -0,0 +1,47 @@
+"""Everything the tabs show for one user and day, loaded in a single read transaction."""
+from dataclasses import dataclass, field
+
+from core.rollup import day_totals
+from core.store import count_exercises, count_foods, exercise_page, food_page, get_profile, weight_series
+from core.targets import get_targets
+
+@dataclass
+class DaySnapshot:
+    user_id: int
+    log_date: str
+    profile: dict
+    foods: list = field(default_factory=list)        # first page of [(id, name, calories)], newest first
+    exercises: list = field(default_factory=list)    # first page of [(id, name, calories_burned)], newest first
+    food_count: int = 0
+    exercise_count: int = 0
+    food_kcal: float = 0.0
+    burned_kcal: float = 0.0
+    weights: list = field(default_factory=list)      # [(log_date, weight_kg)], oldest first
+    targets: dict = None                             # core.targets.get_targets(), None if the profile is incomplete
+
+    def matches(self, user_id, log_date=None):
+        """True if this snapshot can stand in for a query about `user_id` (and `log_date`)."""
+        return self.user_id == user_id and (log_date is None or self.log_date == log_date)
+
+def load_day_snapshot(conn, user_id, log_date):
+    """Reads the profile, targets, the day's logs and totals and the weight series; None if the user is gone."""
+    # One transaction gives every part the same view of the database
+    with conn:
+        conn.execute("BEGIN")
+        profile = get_profile(conn, user_id)
+        if profile is None:
+            return None
+        food_kcal, burned_kcal, _ = day_totals(conn, user_id, log_date)
+        return DaySnapshot(
+            user_id=user_id,
+            log_date=log_date,
+            profile=profile,
+            foods=food_page(conn, user_id, log_date),
+            exercises=exercise_page(conn, user_id, log_date),
+            food_count=count_foods(conn, user_id, log_date),
+            exercise_count=count_exercises(conn, user_id, log_date),
+            food_kcal=food_kcal,
+            burned_kcal=burned_kcal,
+            weights=weight_series(conn, user_id),
+            targets=get_targets(conn, user_id),
+        )
@@ -0,0 +1,158 @@
+"""Queries shared by the tabs, the snapshot loader and the command-line tools."""
+import json
+
+from core.db import transaction
+from core.targets import DEFAULT_MACRO, get_targets, record_profile, record_weight
+
+def get_profile(conn, user_id):
+    """Returns the profile dict used as main_app.current_user, or None if the user doesn't exist."""
+    r = conn.execute(
+        "SELECT name, gender, age, height_cm, weight_kg, activity, goal, macro_json "
+        "FROM users WHERE id=?", (user_id,)
+    ).fetchone()
+    if not r:
+        return None
+    name, gender, age, height, weight, activity, goal, macro_json = r
+    return {
+        "name": name,
+        "gender": gender,
+        "age": age,
+        "height": height,
+        "weight": weight,
+        "activity": activity,
+        "goal": goal,
+        "macro": json.loads(macro_json) if macro_json else dict(DEFAULT_MACRO),
+    }
+
+# Rows per page for the day lists; pages are keyed on id, newest first
+LIST_PAGE = 200
+
+def _log_page(conn, table, kcal_col, user_id, log_date, before_id, limit):
+    if before_id is None:
+        return conn.execute(
+            f"SELECT id, name, {kcal_col} FROM {table} WHERE user_id=? AND log_date=? "
+            "ORDER BY id DESC LIMIT ?",
+            (user_id, log_date, limit),
+        ).fetchall()
+    return conn.execute(
+        f"SELECT id, name, {kcal_col} FROM {table} WHERE user_id=? AND log_date=? AND id < ? "
+        "ORDER BY id DESC LIMIT ?",
+        (user_id, log_date, before_id, limit),
+    ).fetchall()
+
+def food_page(conn, user_id, log_date, before_id=None, limit=LIST_PAGE):
+    """Returns up to `limit` [(id, name, calories)] for one day, newest first, older than before_id."""
+    return _log_page(conn, "foods", "calories", user_id, log_date, before_id, limit)
+
+def exercise_page(conn, user_id, log_date, before_id=None, limit=LIST_PAGE):
+    """Returns up to `limit` [(id, name, calories_burned)] for one day, newest first, older than before_id."""
+    return _log_page(conn, "exercises", "calories_burned", user_id, log_date, before_id, limit)
+
+def count_foods(conn, user_id, log_date):
+    """Number of food entries on a day (an index-only count)."""
+    return conn.execute("SELECT COUNT(*) FROM foods WHERE user_id=? AND log_date=?", (user_id, log_date)).fetchone()[0]
+
+def count_exercises(conn, user_id, log_date):
+    """Number of exercise entries on a day (an index-only count)."""
+    return conn.execute(
+        "SELECT COUNT(*) FROM exercises WHERE user_id=? AND log_date=?", (user_id, log_date)
+    ).fetchone()[0]
+
+def weight_series(conn, user_id):
+    """Returns [(log_date, weight_kg)] for a user, oldest first."""
+    return conn.execute(
+        "SELECT log_date, weight_kg FROM weights WHERE user_id=? ORDER BY log_date",
+        (user_id,)
+    ).fetchall()
+
+def user_names(conn):
+    """Returns all profile names, sorted case-insensitively."""
+    return [r[0] for r in conn.execute("SELECT name FROM users ORDER BY name COLLATE NOCASE")]
+
+def first_user_name(conn):
+    """Returns the name of the oldest profile, or None."""
+    r = conn.execute("SELECT name FROM users ORDER BY id LIMIT 1").fetchone()
+    return r[0] if r else None
+
+def user_id_by_name(conn, name):
+    """Returns the id of the profile called `name`, or None."""
+    r = conn.execute("SELECT id FROM users WHERE name=?", (name,)).fetchone()
+    return r[0] if r else None
+
+def create_user(conn, name):
+    """Creates an empty profile; raises sqlite3.IntegrityError if the name is taken."""
+    with transaction(conn):
+        return conn.execute("INSERT INTO users(name) VALUES(?)", (name,)).lastrowid
+
+def save_profile(conn, name, gender, age, height, weight, activity, goal, macro):
+    """Creates or updates the profile called `name` and returns its id."""
+    macro_json = json.dumps(macro)
+    with transaction(conn):
+        cur = conn.cursor()
+        cur.execute("SELECT id FROM users WHERE name=?", (name,))
+        row = cur.fetchone()
+        if row:
+            uid = row[0]
+            cur.execute(
+                """
+                UPDATE users SET gender=?, age=?, height_cm=?, weight_kg=?, activity=?, goal=?, macro_json=?
+                WHERE id=?
+                """,
+                (gender, age, height, weight, activity, goal, macro_json, uid),
+            )
+        else:
+            cur.execute(
+                """
+                INSERT INTO users(name, gender, age, height_cm, weight_kg, activity, goal, macro_json)
+                VALUES(?,?,?,?,?,?,?,?)
+                """,
+                (name, gender, age, height, weight, activity, goal, macro_json),
+            )
+            uid = cur.lastrowid
+        # If an input changed the version trigger dropped the cached row; recompute it in this transaction
+        get_targets(conn, uid)
+        record_profile(conn, uid)
+        return uid
+
+def add_food(conn, user_id, log_date, name, kcal):
+    """Logs a food entry and returns its id."""
+    with transaction(conn):
+        return conn.execute(
+            "INSERT INTO foods(user_id, log_date, name, calories) VALUES(?,?,?,?)",
+            (user_id, log_date, name, kcal)
+        ).lastrowid
+
+def add_exercise(conn, user_id, log_date, name, kcal):
+    """Logs an exercise entry and returns its id."""
+    with transaction(conn):
+        return conn.execute(
+            "INSERT INTO exercises(user_id, log_date, name, calories_burned) VALUES(?,?,?,?)",
+            (user_id, log_date, name, kcal)
+        ).lastrowid
+
+def add_weight(conn, user_id, log_date, weight_kg):
+    """Logs a weight entry, records the target it implies, and returns its id.
+
+    An entry newer than any before it also becomes the profile's weight.
+    """
+    with transaction(conn):
+        new_id = conn.execute(
+            "INSERT INTO weights(user_id, log_date, weight_kg) VALUES(?,?,?)",
+            (user_id, log_date, weight_kg)
+        ).lastrowid
+        record_weight(conn, user_id, log_date, weight_kg)
+        return new_id
+
+def reset_food_day(conn, user_id, log_date):
+    """Deletes a day's food entries and returns how many were removed."""
+    with transaction(conn):
+        return conn.execute(
+            "DELETE FROM foods WHERE user_id=? AND log_date=?", (user_id, log_date)
+        ).rowcount
+
+def reset_exercise_day(conn, user_id, log_date):
+    """Deletes a day's exercise entries and returns how many were removed."""
+    with transaction(conn):
+        return conn.execute(
+            "DELETE FROM exercises WHERE user_id=? AND log_date=?", (user_id, log_date)
+        ).rowcount
@@ -0,0 +1,242 @@
+"""Per-profile cache of the computed calorie target and macro grams.
+
+user_targets holds one row per user, tagged with the users.profile_version
+it was computed from. A trigger bumps the version and drops the cached row
+whenever one of the inputs (core.db.TARGET_INPUTS) changes, so a read is a
+single primary-key lookup and is recomputed at most once per profile edit.
+
+targets_history keeps every target that was in effect, appended when a profile
+save or a logged weight changes it, so reports over a date range can use a
+TargetTimeline instead of recomputing a BMR per day from later data. A weight
+that becomes the newest entry of the timeline is also written to users.weight_kg,
+so the cached target and the timeline's current entry always agree.
+"""
+import json
+from bisect import bisect_right
+from datetime import date, timedelta
+
+from core.helpers import apply_goal, calc_bmi, calc_bmr, calc_tdee, macro_grams, today_str
+
+DEFAULT_MACRO = {"protein": 30, "carb": 45, "fat": 25}
+
+FIELDS = ("bmr", "tdee", "target", "bmi", "protein_g", "carb_g", "fat_g")
+
+def compute_targets(gender, weight, height, age, activity, goal, macro=None):
+    """BMR, TDEE, goal-adjusted target, BMI and macro grams as a dict, same as the Calculator tab."""
+    bmr = calc_bmr(gender, weight, height, age)
+    tdee = calc_tdee(bmr, activity)
+    target = apply_goal(tdee, goal)
+    p_g, c_g, f_g = macro_grams(target, macro or DEFAULT_MACRO)
+    return {
+        "bmr": bmr, "tdee": tdee, "target": target, "bmi": calc_bmi(weight, height),
+        "protein_g": p_g, "carb_g": c_g, "fat_g": f_g,
+    }
+
+def _profile_inputs(conn, user_id):
+    # (compute_targets args, profile_version), or None if the profile is missing or incomplete
+    r = conn.execute(
+        "SELECT gender, weight_kg, height_cm, age, activity, goal, macro_json, profile_version "
+        "FROM users WHERE id=?", (user_id,)
+    ).fetchone()
+    if not r or None in r[:4] or not r[2]:
+        return None
+    gender, weight, height, age, activity, goal, macro_json, version = r
+    args = [gender, weight, height, age, activity or "Moderate", goal or "Maintain",
+            json.loads(macro_json) if macro_json else None]
+    return args, version
+
+def _write(conn, sql, params):
+    # Join the caller's transaction (a profile save or a snapshot read) rather than committing it early
+    if conn.in_transaction:
+        conn.execute(sql, params)
+    else:
+        with conn:
+            conn.execute(sql, params)
+
+def _append_history(conn, user_id, effective_date, source, version, weight, t):
+    _write(
+        conn,
+        f"INSERT INTO targets_history(user_id, effective_date, source, profile_version, weight_kg, "
+        f"{', '.join(FIELDS)}) VALUES(?,?,?,?,?,{','.join('?' * len(FIELDS))})",
+        (user_id, effective_date, source, version, weight, *(t[f] for f in FIELDS)),
+    )
+
+def refresh_targets(conn, user_id):
+    """Recomputes and stores a user's cached targets; returns them, or None if the profile is incomplete."""
+    inputs = _profile_inputs(conn, user_id)
+    if inputs is None:
+        return None
+    args, version = inputs
+    t = compute_targets(*args)
+    _write(
+        conn,
+        f"INSERT OR REPLACE INTO user_targets(user_id, profile_version, {', '.join(FIELDS)}) "
+        f"VALUES(?,?,{','.join('?' * len(FIELDS))})",
+        (user_id, version, *(t[f] for f in FIELDS)),
+    )
+    return t
+
+def _latest_entry(conn, user_id, on=None):
+    # (effective_date, weight_kg, *FIELDS) of the newest history entry (in effect on `on`), or None
+    sql = f"SELECT effective_date, weight_kg, {', '.join(FIELDS)} FROM targets_history WHERE user_id=?"
+    params = [user_id]
+    if on:
+        sql += " AND effective_date <= ?"
+        params.append(on)
+    return conn.execute(sql + " ORDER BY effective_date DESC, id DESC LIMIT 1", params).fetchone()
+
+def _sync_weight(conn, user_id):
+    # users.weight_kg follows the newest entry; the version trigger then drops the cached targets
+    latest = _latest_entry(conn, user_id)
+    if latest and latest[1] is not None:
+        _write(conn, "UPDATE users SET weight_kg=? WHERE id=? AND weight_kg IS NOT ?", (latest[1], user_id, latest[1]))
+
+def record_profile(conn, user_id):
+    """Appends the profile's targets to targets_history, effective from today, if they differ from today's entry.
+
+    Called after a profile save; returns the targets, or None if the profile is incomplete.
+    """
+    inputs = _profile_inputs(conn, user_id)
+    if inputs is None:
+        return None
+    args, version = inputs
+    t = compute_targets(*args)
+    latest = _latest_entry(conn, user_id, today_str())
+    if latest is None or tuple(latest[1:]) != (args[1], *(t[f] for f in FIELDS)):
+        _append_history(conn, user_id, today_str(), "profile", version, args[1], t)
+    return t
+
+def record_weight(conn, user_id, log_date, weight_kg):
+    """Appends the target implied by a newly logged weight to targets_history, effective from log_date."""
+    record_weights(conn, [(user_id, log_date, weight_kg)])
+
+def record_weights(conn, rows):
+    """record_weight for many [(user_id, log_date, weight_kg)] rows at once; returns the entries appended."""
+    inputs = {}
+    history = []
+    for user_id, log_date, weight_kg in rows:
+        if user_id not in inputs:
+            inputs[user_id] = _profile_inputs(conn, user_id)
+        if inputs[user_id] is None or weight_kg is None or not log_date:
+            continue
+        args, version = inputs[user_id]
+        t = compute_targets(args[0], weight_kg, *args[2:])
+        history.append((user_id, log_date, "weight", version, weight_kg, *(t[f] for f in FIELDS)))
+    sql = (f"INSERT INTO targets_history(user_id, effective_date, source, profile_version, weight_kg, "
+           f"{', '.join(FIELDS)}) VALUES(?,?,?,?,?,{','.join('?' * len(FIELDS))})")
+    if conn.in_transaction:
+        conn.executemany(sql, history)
+    else:
+        with conn:
+            conn.executemany(sql, history)
+    for user_id in {h[0] for h in history}:
+        _sync_weight(conn, user_id)
+    return len(history)
+
+def last_weight_id(conn):
+    """The highest weights id so far; pass it to record_weights_since after a bulk insert."""
+    return conn.execute("SELECT COALESCE(MAX(id), 0) FROM weights").fetchone()[0]
+
+def record_weights_since(conn, after_id):
+    """Appends history for every weight inserted with an id above `after_id` (imports skip add_weight)."""
+    return record_weights(conn, conn.execute(
+        "SELECT user_id, log_date, weight_kg FROM weights WHERE id > ? ORDER BY log_date, id", (after_id,)
+    ))
+
+def backfill_history(conn):
+    """Seeds targets_history for profiles that have none yet; returns the entries appended.
+
+    Nothing older is known, so the current profile's targets hold from the user's
+    first logged day (food, exercise or weight), and each weight already logged
+    then adds its entry as record_weight would have.
+    """
+    appended = 0
+    user_ids = [r[0] for r in conn.execute(
+        "SELECT id FROM users WHERE id NOT IN (SELECT user_id FROM targets_history) ORDER BY id"
+    )]
+    for user_id in user_ids:
+        inputs = _profile_inputs(conn, user_id)
+        if inputs is None:
+            continue
+        args, version = inputs
+        first = conn.execute(
+            "SELECT MIN(d) FROM (SELECT MIN(log_date) AS d FROM daily_totals WHERE user_id=? "
+            "UNION ALL SELECT MIN(log_date) FROM weights WHERE user_id=?)",
+            (user_id, user_id),
+        ).fetchone()[0]
+        _append_history(conn, user_id, first or today_str(), "profile", version, args[1], compute_targets(*args))
+        appended += 1 + record_weights(conn, conn.execute(
+            "SELECT user_id, log_date, weight_kg FROM weights WHERE user_id=? ORDER BY log_date, id", (user_id,)
+        ).fetchall())
+    return appended
+
+def reconcile_history(conn):
+    """Drops the 'profile' entries that were only recomputations, then brings users.weight_kg up to date.
+
+    Lookups used to append an entry per cache miss, effective from the day of the
+    lookup; one with the profile_version of an earlier 'profile' entry is such a
+    repeat. Returns the entries removed.
+    """
+    removed = conn.execute(
+        "DELETE FROM targets_history WHERE source = 'profile' AND EXISTS ("
+        "SELECT 1 FROM targets_history h WHERE h.user_id = targets_history.user_id AND h.source = 'profile' "
+        "AND h.profile_version = targets_history.profile_version AND h.id < targets_history.id)"
+    ).rowcount
+    for (user_id,) in conn.execute("SELECT DISTINCT user_id FROM targets_history").fetchall():
+        _sync_weight(conn, user_id)
+    return removed
+
+def cached_targets(conn, user_id):
+    """The cached targets dict if it matches the current profile version, else None; never writes."""
+    r = conn.execute(
+        f"SELECT {', '.join('t.' + f for f in FIELDS)} FROM user_targets t "
+        "JOIN users u ON u.id = t.user_id AND u.profile_version = t.profile_version "
+        "WHERE t.user_id=?", (user_id,)
+    ).fetchone()
+    return dict(zip(FIELDS, r)) if r else None
+
+def get_targets(conn, user_id):
+    """Returns the cached targets dict for a user, computing it on a miss; None if the profile is incomplete."""
+    return cached_targets(conn, user_id) or refresh_targets(conn, user_id)
+
+class TargetTimeline:
+    """A user's targets over time: each targets_history entry holds until the next one.
+
+    Lookups bisect the sorted effective dates, so resolving a whole date range
+    costs one O(log n) search plus a walk, with no per-day queries.
+    """
+    def __init__(self, entries=()):
+        # entries: [(effective_date, targets dict)] sorted by date; later entries win on the same date
+        self.dates = [d for d, _ in entries]
+        self.targets = [t for _, t in entries]
+
+    def __len__(self):
+        return len(self.dates)
+
+    def at(self, d):
+        """The targets dict in effect on date d, or None before the first entry."""
+        i = bisect_right(self.dates, d) - 1
+        return self.targets[i] if i >= 0 else None
+
+    def over(self, start, end):
+        """[(date, targets dict or None)] for every day start..end (inclusive)."""
+        day, last = date.fromisoformat(start), date.fromisoformat(end)
+        i = bisect_right(self.dates, start) - 1
+        out = []
+        while day <= last:
+            d = day.isoformat()
+            while i + 1 < len(self.dates) and self.dates[i + 1] <= d:
+                i += 1
+            out.append((d, self.targets[i] if i >= 0 else None))
+            day += timedelta(days=1)
+        return out
+
+def load_timeline(conn, user_id, end=None):
+    """Reads a user's targets_history (up to `end`, if given) into a TargetTimeline."""
+    sql = f"SELECT effective_date, {', '.join(FIELDS)} FROM targets_history WHERE user_id=?"
+    params = [user_id]
+    if end:
+        sql += " AND effective_date <= ?"
+        params.append(end)
+    rows = conn.execute(sql + " ORDER BY effective_date, id", params).fetchall()
+    return TargetTimeline([(r[0], dict(zip(FIELDS, r[1:]))) for r in rows])
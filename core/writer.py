@@ -0,0 +1,165 @@
+"""Group-commit writer: many small writes, one transaction per batch.
+
+Callers submit store functions (store.add_food, add_exercise, add_weight,
+...) and get a concurrent.futures.Future back. A single thread collects jobs
+until `max_rows` have arrived or the oldest has waited `max_delay_ms`, runs
+them all inside one BEGIN IMMEDIATE ... COMMIT, and only then resolves their
+futures. A caller that waits on its future therefore knows the row is
+committed; `max_delay_ms` is the durability window, the longest a write can
+sit unacknowledged. Each job runs in its own savepoint, so one failing job
+fails only its own future. close() commits whatever is still queued.
+
+Store functions open their transaction with core.db.transaction(), which
+turns into a savepoint inside the batch, so they need no changes to be
+batched.
+"""
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from core.db import deferred_search_index, get_connection
+
+DEFAULT_MAX_DELAY_MS = 1
+DEFAULT_MAX_ROWS = 500
+# From this many jobs in a batch, index new names for search in one pass at commit
+SEARCH_DEFER_MIN_ROWS = 256
+
+log = logging.getLogger(__name__)
+
+_STOP = object()
+
+class GroupCommitWriter:
+    """Runs submitted fn(conn, *args) jobs on one thread, committing them in batches.
+
+    synchronous: None keeps the connection's setting (NORMAL in WAL mode, which
+    can lose the last commits on power loss but never corrupts); "FULL" makes
+    every batch commit durable on disk before its futures resolve.
+    """
+    def __init__(self, path=None, max_delay_ms=DEFAULT_MAX_DELAY_MS, max_rows=DEFAULT_MAX_ROWS,
+                 synchronous=None):
+        self.path = path
+        self.max_delay = max_delay_ms / 1000
+        self.max_rows = max_rows
+        self.synchronous = synchronous
+        self._queue = queue.SimpleQueue()
+        self._closed = False
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.rows = 0
+        self._thread = threading.Thread(target=self._run, name="db-group-commit", daemon=True)
+        self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def submit(self, fn, *args):
+        """Queues fn(conn, *args); the Future resolves with its result once its batch commits.
+
+        fn must open any transaction of its own with core.db.transaction(), not `with conn:`.
+        """
+        future = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("writer is closed")
+            self._queue.put((fn, args, future))
+        return future
+
+    def pending(self):
+        """Jobs queued and not yet picked up by the writer thread."""
+        return self._queue.qsize()
+
+    def flush(self):
+        """Blocks until everything submitted so far is committed."""
+        self.submit(lambda conn: None).result()
+
+    def close(self):
+        """Commits everything still queued, then stops the thread. Safe to call twice."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(_STOP)
+        self._thread.join()
+
+    def _collect(self, first):
+        batch = [first]
+        deadline = time.monotonic() + self.max_delay
+        stop = False
+        while len(batch) < self.max_rows:
+            timeout = deadline - time.monotonic()
+            try:
+                job = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if job is _STOP:
+                stop = True
+                break
+            batch.append(job)
+        return batch, stop
+
+    def _run(self):
+        conn = get_connection(self.path)
+        if self.synchronous:
+            conn.execute(f"PRAGMA synchronous={self.synchronous}")
+        stop = False
+        while not stop:
+            job = self._queue.get()
+            if job is _STOP:
+                break
+            batch, stop = self._collect(job)
+            self._commit(conn, batch)
+        # Anything that slipped in behind the stop marker is still committed
+        rest = []
+        while True:
+            try:
+                job = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if job is not _STOP:
+                rest.append(job)
+        if rest:
+            self._commit(conn, rest)
+
+    def _commit(self, conn, batch):
+        done = []
+        try:
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                if len(batch) >= SEARCH_DEFER_MIN_ROWS:
+                    with deferred_search_index(conn):
+                        self._run_jobs(conn, batch, done)
+                else:
+                    self._run_jobs(conn, batch, done)
+        except Exception as e:
+            # The commit itself failed: nothing in the batch was written
+            log.exception("group commit of %d jobs failed", len(batch))
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        self.batches += 1
+        self.rows += len(batch)
+        for future, ok, value in done:
+            if ok:
+                future.set_result(value)
+            else:
+                future.set_exception(value)
+
+    def _run_jobs(self, conn, batch, done):
+        for fn, args, future in batch:
+            conn.execute("SAVEPOINT job")
+            try:
+                value = fn(conn, *args)
+            except Exception as e:
+                conn.execute("ROLLBACK TO job")
+                conn.execute("RELEASE job")
+                done.append((future, False, e))
+            else:
+                conn.execute("RELEASE job")
+                done.append((future, True, value))
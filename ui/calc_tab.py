@@ -1,8 +1,10 @@
 import customtkinter as ctk
+from io import BytesIO
 from tkinter import messagebox
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-from core.helpers import calc_bmr, calc_tdee, apply_goal, ACTIVITY_FACTORS
+from core.helpers import calc_bmr, calc_tdee, apply_goal, calc_bmi, bmi_category, macro_grams, ACTIVITY_FACTORS
+
+PIE_SIZE = (4, 4)   # inches
+PIE_DPI = 100
 
 class CalcTab:
     def __init__(self, tab_view, main_app):
@@ -10,7 +12,9 @@ class CalcTab:
         self.main_app = main_app
         self.frame = ctk.CTkFrame(self.tab_view)
         self.frame.pack(fill="both", expand=True, padx=16, pady=16)
-        self.chart_canvas = None
+        self.chart_label = None
+        self.chart_image = None
+        self._chart_spec = None   # (kind, data, size, dpi, theme) of the pie on screen
         self._build_ui()
 
     def _build_ui(self):
@@ -79,20 +83,10 @@ class CalcTab:
         target = apply_goal(tdee, goal)
 
         macro = (self.main_app.current_user or {}).get("macro", {"protein": 30, "carb": 45, "fat": 25})
-        p_pct, c_pct, f_pct = macro["protein"], macro["carb"], macro["fat"]
-        p_g = target * p_pct / 100 / 4
-        c_g = target * c_pct / 100 / 4
-        f_g = target * f_pct / 100 / 9
-
-        bmi = weight / ((height / 100) ** 2)
-        if bmi < 18.5:
-            bmi_cat = "Underweight"
-        elif bmi < 25:
-            bmi_cat = "Normal"
-        elif bmi < 30:
-            bmi_cat = "Overweight"
-        else:
-            bmi_cat = "Obese"
+        p_g, c_g, f_g = macro_grams(target, macro)
+
+        bmi = calc_bmi(weight, height)
+        bmi_cat = bmi_category(bmi)
 
         self.lbl_summary.configure(text=(
             f"BMR: {bmr:.0f} kcal/day\n"
@@ -102,18 +96,33 @@ class CalcTab:
             f"Macros — Protein: {p_g:.0f} g, Carbs: {c_g:.0f} g, Fat: {f_g:.0f} g"
         ))
 
-        # Clear previous chart
-        for w in self.chart_area.winfo_children():
-            w.destroy()
-        plt.close("all")  # Close any previous figures to prevent Mac memory leak
+        self._show_pie(macro)
 
-        fig, ax = plt.subplots(figsize=(4, 4), dpi=100)
-        ax.pie([p_pct, c_pct, f_pct], labels=[f"Protein {p_pct}%", f"Carbs {c_pct}%", f"Fat {f_pct}%"],
-               autopct="%1.0f%%", startangle=90)
-        ax.set_title("Macro Split")
+    def redraw_pie(self):
+        """Redraws the pie on screen, if any, for the current appearance mode."""
+        if self._chart_spec:
+            self._show_pie(dict(zip(("protein", "carb", "fat"), self._chart_spec[1])))
 
-        self.chart_canvas = FigureCanvasTkAgg(fig, master=self.chart_area)
-        self.chart_canvas.draw()
-        self.chart_canvas.get_tk_widget().pack(pady=4)
+    def _show_pie(self, macro):
+        theme = ctk.get_appearance_mode().lower()
+        spec = ("macro_pie", [macro["protein"], macro["carb"], macro["fat"]], PIE_SIZE, PIE_DPI, theme)
+        if spec == self._chart_spec:
+            return
 
-        self.main_app.current_target = target
+        def render():
+            # matplotlib is only loaded once a pie is actually drawn
+            from ui.charts import figure_png, macro_pie
+            return figure_png(macro_pie(macro, PIE_SIZE, PIE_DPI, theme))
+
+        from PIL import Image
+
+        png = self.main_app.render_cache.get_or_render(*spec, render)
+        image = Image.open(BytesIO(png))
+        self.chart_image = ctk.CTkImage(light_image=image, dark_image=image,
+                                        size=(PIE_SIZE[0] * PIE_DPI, PIE_SIZE[1] * PIE_DPI))
+        if self.chart_label is None:
+            self.chart_label = ctk.CTkLabel(self.chart_area, text="", image=self.chart_image)
+            self.chart_label.pack(pady=4)
+        else:
+            self.chart_label.configure(image=self.chart_image)
+        self._chart_spec = spec
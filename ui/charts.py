@@ -0,0 +1,4 @@
+"""The chart classes the tabs embed; built on core.charts, which has no Tk dependency."""
+from core.charts import MARKER_LIMIT, THEMES, TrendsChart, WeightChart, figure_png, macro_pie
+
+__all__ = ["MARKER_LIMIT", "THEMES", "TrendsChart", "WeightChart", "figure_png", "macro_pie"]
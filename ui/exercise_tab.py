@@ -1,10 +1,21 @@
 import customtkinter as ctk
-import tkinter as tk
 from tkinter import messagebox
-from datetime import datetime
 
-from core.db import db_connect
-from core.helpers import today_str
+from core.helpers import check_date, today_str
+from core.rollup import day_totals
+from core import store
+from core.events import exercises_topic
+from ui.virtual_list import VirtualList
+
+def _load_exercise_day(conn, user_id, log_date):
+    """Runs on the DB thread: the first page of the day's exercises, their count and the food and burn totals."""
+    foods_total, total_burn, _ = day_totals(conn, user_id, log_date)
+    return (
+        store.exercise_page(conn, user_id, log_date),
+        store.count_exercises(conn, user_id, log_date),
+        foods_total,
+        total_burn,
+    )
 
 class ExerciseTab:
     def __init__(self, tab_view, main_app):
@@ -12,6 +23,8 @@ class ExerciseTab:
         self.main_app = main_app
         self.frame = ctk.CTkFrame(self.tab_view)
         self.frame.pack(fill="both", expand=True, padx=16, pady=16)
+        self._day = None        # (user_id, log_date) the list shows
+        self._totals = (0.0, 0.0)
         self._build_ui()
         
     def _build_ui(self):
@@ -36,11 +49,8 @@ class ExerciseTab:
         mid = ctk.CTkFrame(outer)
         mid.pack(fill="both", expand=True, pady=8)
 
-        self.ex_listbox = tk.Listbox(mid, height=14)
-        self.ex_listbox.pack(side="left", fill="both", expand=True, padx=6, pady=6)
-        sb = tk.Scrollbar(mid, command=self.ex_listbox.yview)
-        sb.pack(side="left", fill="y")
-        self.ex_listbox.config(yscrollcommand=sb.set)
+        self.ex_list = VirtualList(mid, self._load_page, lambda r: f"{r[1]} — {r[2]:.0f} kcal",
+                                   on_error=self.main_app._show_db_error)
 
         right = ctk.CTkFrame(outer)
         right.pack(fill="x", padx=6, pady=8)
@@ -49,13 +59,13 @@ class ExerciseTab:
         self.lbl_ex_summary.pack(anchor="w")
         
     def add_exercise(self):
-        if not getattr(self.main_app, "current_user_id", None):
+        user_id = getattr(self.main_app, "current_user_id", None)
+        if not user_id:
             messagebox.showerror("No Profile", "Please create/select a profile first.")
             return
 
-        d = (self.ex_date.get() or today_str()).strip()
         try:
-            datetime.fromisoformat(d)
+            d = check_date(self.ex_date.get() or today_str())
         except ValueError:
             messagebox.showerror("Date", "Please enter date as YYYY-MM-DD")
             return
@@ -71,68 +81,79 @@ class ExerciseTab:
             messagebox.showerror("Calories", "Please enter a valid number for calories burned.")
             return
 
-        conn = db_connect()
-        with conn:
-            conn.execute(
-                "INSERT INTO exercises(user_id, log_date, name, calories_burned) VALUES(?,?,?,?)",
-                (self.main_app.current_user_id, d, name, kcal)
-            )
+        self.main_app.db.submit(
+            store.add_exercise, user_id, d, name, kcal,
+            on_done=lambda exercise_id: self._on_exercise_added((user_id, d), (exercise_id, name, kcal)),
+        )
 
+    def _on_exercise_added(self, day, row):
+        self.main_app.publish(exercises_topic(*day), source="ex_tab")
         self.ex_name.delete(0, "end")
         self.ex_kcal.delete(0, "end")
-        self.refresh_exercise_list()
+        if day == self._day:
+            # Same day on screen: add the one row instead of reloading the list
+            self.ex_list.prepend(row)
+            foods_total, total_burn = self._totals
+            self._totals = (foods_total, total_burn + row[2])
+            self._show_summary()
+        else:
+            self.refresh_exercise_list()
 
     def reset_ex_day(self):
-        if not getattr(self.main_app, "current_user_id", None):
+        user_id = getattr(self.main_app, "current_user_id", None)
+        if not user_id:
             return
         d = (self.ex_date.get() or today_str()).strip()
         if messagebox.askyesno("Reset Exercises", f"Clear all exercises for {d}?"):
-            conn = db_connect()
-            with conn:
-                conn.execute(
-                    "DELETE FROM exercises WHERE user_id=? AND log_date=?",
-                    (self.main_app.current_user_id, d)
-                )
-            self.refresh_exercise_list()
+            self.main_app.db.submit(
+                store.reset_exercise_day, user_id, d,
+                on_done=lambda _count: self._on_day_reset((user_id, d)),
+            )
 
-    def refresh_exercise_list(self):
-        self.ex_listbox.delete(0, "end")
-        if not getattr(self.main_app, "current_user_id", None):
+    def _on_day_reset(self, day):
+        self.main_app.publish(exercises_topic(*day), source="ex_tab")
+        self.refresh_exercise_list()
+
+    def refresh_exercise_list(self, snapshot=None):
+        user_id = getattr(self.main_app, "current_user_id", None)
+        if not user_id:
+            self._day = None
+            self.ex_list.clear()
             return
 
         d = (self.ex_date.get() or today_str()).strip()
-        conn = db_connect()
-        cur = conn.cursor()
-        cur.execute(
-            "SELECT name, calories_burned FROM exercises WHERE user_id=? AND log_date=? ORDER BY id DESC",
-            (self.main_app.current_user_id, d)
+        if snapshot and snapshot.matches(user_id, d):
+            self._render(
+                (user_id, d),
+                (snapshot.exercises, snapshot.exercise_count, snapshot.food_kcal, snapshot.burned_kcal),
+            )
+            return
+        self.main_app.db.submit(
+            _load_exercise_day, user_id, d, key="exercise_list",
+            on_done=lambda result: self._render((user_id, d), result),
         )
-        rows = cur.fetchall()
-        conn.close()
 
-        total_burn = 0
-        for n, cals in rows:
-            self.ex_listbox.insert("end", f"{n} — {cals:.0f} kcal")
-            total_burn += cals
+    def _load_page(self, before_id, limit, on_rows, on_error):
+        if self._day is None:
+            return
+        self.main_app.db.submit(store.exercise_page, *self._day, before_id, limit, on_done=on_rows, on_error=on_error)
 
-        target = getattr(self.main_app, "current_target", 2000)
-        foods_total = self._foods_total_for_date(d)
+    def _render(self, day, result):
+        if day[0] != self.main_app.current_user_id:
+            return
+        rows, count, foods_total, total_burn = result
+        self._totals = (foods_total, total_burn)
+        self._day = day
+        self.main_app.watch("ex_tab", day[1])
+        self.ex_list.reset(rows, count)
+        self._show_summary()
+
+    def _show_summary(self):
+        foods_total, total_burn = self._totals
+        target = self.main_app.current_target
         net = foods_total - total_burn
-        remaining = target - net
+        vs_target = f"Remaining vs Target: {target - net:.0f} kcal" if target is not None else "No target yet"
 
         self.lbl_ex_summary.configure(
-            text=f"Burned: {total_burn:.0f} kcal • Food: {foods_total:.0f} kcal • Net: {net:.0f} kcal • Remaining vs Target: {remaining:.0f} kcal"
-        )
-
-    def _foods_total_for_date(self, d):
-        if not getattr(self.main_app, "current_user_id", None):
-            return 0
-        conn = db_connect()
-        cur = conn.cursor()
-        cur.execute(
-            "SELECT SUM(calories) FROM foods WHERE user_id=? AND log_date=?",
-            (self.main_app.current_user_id, d)
+            text=f"Burned: {total_burn:.0f} kcal • Food: {foods_total:.0f} kcal • Net: {net:.0f} kcal • {vs_target}"
         )
-        s = cur.fetchone()[0]
-        conn.close()
-        return float(s or 0)
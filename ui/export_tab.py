@@ -1,11 +1,9 @@
 import customtkinter as ctk
 from tkinter import messagebox, filedialog
-from datetime import datetime
-import os
-import matplotlib.pyplot as plt
 
-from core.db import db_connect
-from core.helpers import today_str
+from core.export import export_day_csv, export_range
+from core.helpers import check_date, today_str
+from core import store
 
 class ExportTab:
     def __init__(self, tab_view, main_app):
@@ -34,13 +32,37 @@ class ExportTab:
         ctk.CTkButton(row, text="Save Macro Pie as PNG", command=self.save_macro_png).pack(side="left", padx=6)
         ctk.CTkButton(row, text="Save Progress Chart as PNG", command=self.save_progress_png).pack(side="left", padx=6)
 
+        ctk.CTkLabel(
+            outer,
+            text="Export a date range (foods, exercises, weights and daily totals) to CSV."
+        ).pack(anchor="w", pady=(12, 0))
+
+        rng = ctk.CTkFrame(outer)
+        rng.pack(fill="x", pady=10)
+
+        self.exp_from = ctk.CTkEntry(rng, placeholder_text="From YYYY-MM-DD")
+        self.exp_from.pack(side="left", padx=6)
+        self.exp_to = ctk.CTkEntry(rng, placeholder_text="To YYYY-MM-DD")
+        self.exp_to.insert(0, today_str())
+        self.exp_to.pack(side="left", padx=6)
+
+        self.exp_all_users = ctk.CTkCheckBox(rng, text="All profiles")
+        self.exp_all_users.pack(side="left", padx=6)
+        self.exp_gzip = ctk.CTkCheckBox(rng, text="gzip")
+        self.exp_gzip.pack(side="left", padx=6)
+
+        ctk.CTkButton(rng, text="Export Range to CSV", command=self.export_range_csv).pack(side="left", padx=6)
+
+        self.exp_progress = ctk.CTkLabel(outer, text="")
+        self.exp_progress.pack(anchor="w")
+        self._range_progress = None
+
     def export_day_csv(self):
         if not getattr(self.main_app, "current_user_id", None):
             return
 
-        d = (self.exp_date.get() or today_str()).strip()
         try:
-            datetime.fromisoformat(d)
+            d = check_date(self.exp_date.get() or today_str())
         except ValueError:
             messagebox.showerror("Date", "Please enter date as YYYY-MM-DD")
             return
@@ -49,87 +71,113 @@ class ExportTab:
         if not folder:
             return
 
-        conn = db_connect()
-        cur = conn.cursor()
-        cur.execute("SELECT name FROM users WHERE id=?", (self.main_app.current_user_id,))
-        uname_row = cur.fetchone()
-        uname = uname_row[0] if uname_row else "user"
+        self.main_app.db.submit(
+            export_day_csv, self.main_app.current_user_id, d, folder,
+            on_done=lambda paths: messagebox.showinfo("Exported", "Saved:\n" + "\n".join(paths)),
+        )
 
-        cur.execute("SELECT name, calories FROM foods WHERE user_id=? AND log_date=?", 
-                    (self.main_app.current_user_id, d))
-        foods = cur.fetchall()
+    def export_range_csv(self):
+        all_users = bool(self.exp_all_users.get())
+        if not all_users and not getattr(self.main_app, "current_user_id", None):
+            messagebox.showerror("No Profile", "Select a profile or tick 'All profiles'.")
+            return
 
-        cur.execute("SELECT name, calories_burned FROM exercises WHERE user_id=? AND log_date=?", 
-                    (self.main_app.current_user_id, d))
-        exs = cur.fetchall()
-        conn.close()
+        try:
+            start, end = check_date(self.exp_from.get()), check_date(self.exp_to.get() or today_str())
+        except ValueError:
+            messagebox.showerror("Date", "Please enter both dates as YYYY-MM-DD")
+            return
+        if start > end:
+            start, end = end, start
 
-        f_food = os.path.join(folder, f"{uname}_{d}_foods.csv")
-        with open(f_food, "w", encoding="utf-8") as f:
-            f.write("Food,Calories\n")
-            for n, c in foods:
-                f.write(f"{n},{c}\n")
+        folder = filedialog.askdirectory(title="Choose export folder")
+        if not folder:
+            return
+
+        user_ids = None if all_users else [self.main_app.current_user_id]
+        prefix = "all" if all_users else (self.main_app.current_user or {}).get("name", "user")
+        self._range_progress = ("", 0)
+
+        def progress(table, rows):
+            # Called on the DB thread; _poll_progress picks it up on the main thread
+            self._range_progress = (table, rows)
 
-        f_ex = os.path.join(folder, f"{uname}_{d}_exercises.csv")
-        with open(f_ex, "w", encoding="utf-8") as f:
-            f.write("Exercise,CaloriesBurned\n")
-            for n, c in exs:
-                f.write(f"{n},{c}\n")
+        self.main_app.db.submit(
+            export_range, folder, start, end, user_ids,
+            compress=bool(self.exp_gzip.get()), prefix=prefix, progress=progress,
+            on_done=self._on_range_exported, on_error=self._on_range_failed,
+        )
+        self._poll_progress()
 
-        messagebox.showinfo("Exported", f"Saved:\n{f_food}\n{f_ex}")
+    def _poll_progress(self):
+        if self._range_progress is None:
+            return
+        table, rows = self._range_progress
+        self.exp_progress.configure(text=f"Exporting {table}… {rows:,} rows" if table else "Exporting…")
+        self.frame.after(200, self._poll_progress)
+
+    def _on_range_exported(self, written):
+        self._range_progress = None
+        total = sum(n for _, n in written.values())
+        self.exp_progress.configure(text=f"Exported {total:,} rows.")
+        messagebox.showinfo("Exported", "Saved:\n" + "\n".join(
+            f"{path} ({n:,} rows)" for path, n in written.values()
+        ))
+
+    def _on_range_failed(self, exc):
+        self._range_progress = None
+        self.exp_progress.configure(text="")
+        self.main_app._show_db_error(exc)
 
     def save_macro_png(self):
         target = getattr(self.main_app, "current_target", None)
         if not target:
-            messagebox.showerror("No Data", "Calculate your target first in Calculator tab.")
+            messagebox.showerror("No Data", "Complete and save your profile first to get a calorie target.")
             return
 
         macro = getattr(self.main_app, "current_user", {}).get("macro", {"protein": 30, "carb": 45, "fat": 25})
         p, c, f = macro.get("protein", 30), macro.get("carb", 45), macro.get("fat", 25)
 
-        fig, ax = plt.subplots(figsize=(4.2, 4.2))
-        ax.pie([p, c, f], labels=[f"Protein {p}%", f"Carbs {c}%", f"Fat {f}%"], autopct="%1.0f%%", startangle=90)
-        ax.set_title("Macro Split")
-
         path = filedialog.asksaveasfilename(defaultextension=".png", filetypes=[("PNG", "*.png")], title="Save macro chart")
         if not path:
-            plt.close(fig)
             return
 
-        fig.savefig(path, dpi=180, bbox_inches="tight")
-        plt.close(fig)
-        messagebox.showinfo("Saved", f"Chart saved to {path}")
+        def render():
+            from ui.charts import figure_png, macro_pie
+            return figure_png(macro_pie({"protein": p, "carb": c, "fat": f}, (4.2, 4.2)), dpi=180, tight=True)
+
+        cache = self.main_app.render_cache
+        self._write_png(path, cache.get_or_render("macro_pie", [p, c, f], (4.2, 4.2), 180, "light", render))
 
     def save_progress_png(self):
         if not getattr(self.main_app, "current_user_id", None):
             return
 
-        conn = db_connect()
-        cur = conn.cursor()
-        cur.execute("SELECT log_date, weight_kg FROM weights WHERE user_id=? ORDER BY log_date", 
-                    (self.main_app.current_user_id,))
-        rows = cur.fetchall()
-        conn.close()
+        self.main_app.db.submit(
+            store.weight_series, self.main_app.current_user_id, on_done=self._save_progress_rows
+        )
 
+    def _save_progress_rows(self, rows):
         if not rows:
             messagebox.showerror("No Data", "Add some weight entries first.")
             return
 
-        dates = [datetime.fromisoformat(r[0]) for r in rows]
-        weights = [r[1] for r in rows]
-
-        fig, ax = plt.subplots(figsize=(7, 4))
-        ax.plot(dates, weights, marker="o")
-        ax.set_title("Weight Progress")
-        ax.set_xlabel("Date")
-        ax.set_ylabel("Weight (kg)")
-        fig.autofmt_xdate()
-
         path = filedialog.asksaveasfilename(defaultextension=".png", filetypes=[("PNG", "*.png")], title="Save progress chart")
         if not path:
-            plt.close(fig)
             return
 
-        fig.savefig(path, dpi=180, bbox_inches="tight")
-        plt.close(fig)
+        def render():
+            from ui.charts import WeightChart, figure_png
+
+            # Built at the export dpi so the series is reduced to the saved image's width
+            chart = WeightChart(figsize=(7, 4), dpi=180, fontname=None)
+            chart.set_series(rows)
+            return figure_png(chart.figure, tight=True)
+
+        cache = self.main_app.render_cache
+        self._write_png(path, cache.get_or_render("weight", rows, (7, 4), 180, "light", render))
+
+    def _write_png(self, path, png):
+        with open(path, "wb") as f:
+            f.write(png)
         messagebox.showinfo("Saved", f"Chart saved to {path}")
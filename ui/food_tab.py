@@ -1,10 +1,24 @@
 import customtkinter as ctk
 import tkinter as tk
 from tkinter import messagebox
-from datetime import datetime
 
-from core.db import db_connect
-from core.helpers import today_str
+from core.helpers import check_date, today_str
+from core.rollup import day_totals
+from core import store
+from core.events import foods_topic
+from core.catalog import load_index
+from ui.virtual_list import VirtualList
+
+# Rows shown under the food name while typing
+SUGGESTIONS = 6
+
+def _load_food_day(conn, user_id, log_date):
+    """Runs on the DB thread: the first page of the day's foods, their count and their total."""
+    return (
+        store.food_page(conn, user_id, log_date),
+        store.count_foods(conn, user_id, log_date),
+        day_totals(conn, user_id, log_date)[0],
+    )
 
 class FoodTab:
     def __init__(self, tab_view, main_app):
@@ -12,8 +26,14 @@ class FoodTab:
         self.main_app = main_app
         self.frame = ctk.CTkFrame(self.tab_view)
         self.frame.pack(fill="both", expand=True, padx=16, pady=16)
+        self.catalog = None
+        self._suggestions = []
+        self._day = None        # (user_id, log_date) the list shows
+        self._day_total = 0.0
         self._build_ui()
-        
+        # The index is read once in the background; later foods are added to it in place
+        self.main_app.db.submit(load_index, key="food_catalog", on_done=self._on_catalog_loaded)
+
     def _build_ui(self):
         outer = self.frame
         
@@ -26,6 +46,9 @@ class FoodTab:
 
         self.food_name = ctk.CTkEntry(top, placeholder_text="Food name")
         self.food_name.pack(side="left", padx=6, fill="x", expand=True)
+        self.food_name.bind("<KeyRelease>", self._on_name_typed)
+        self.food_name.bind("<Down>", self._focus_suggestions)
+        self.food_name.bind("<Escape>", lambda _e: self._hide_suggestions())
 
         self.food_kcal = ctk.CTkEntry(top, placeholder_text="Calories (kcal)")
         self.food_kcal.pack(side="left", padx=6)
@@ -33,14 +56,18 @@ class FoodTab:
         ctk.CTkButton(top, text="Add", command=self.add_food).pack(side="left", padx=6)
         ctk.CTkButton(top, text="Reset Day", fg_color="#c0392b", command=self.reset_food_day).pack(side="left", padx=6)
 
+        # Autocomplete list, packed under the entry row only while it has matches
+        self.suggest_box = tk.Listbox(outer, height=SUGGESTIONS, activestyle="dotbox")
+        self.suggest_box.bind("<Return>", self._pick_suggestion)
+        self.suggest_box.bind("<Double-Button-1>", self._pick_suggestion)
+        self.suggest_box.bind("<Escape>", lambda _e: self._hide_suggestions())
+
         mid = ctk.CTkFrame(outer)
         mid.pack(fill="both", expand=True, pady=8)
+        self.mid = mid
 
-        self.food_listbox = tk.Listbox(mid, height=14)
-        self.food_listbox.pack(side="left", fill="both", expand=True, padx=6, pady=6)
-        sb = tk.Scrollbar(mid, command=self.food_listbox.yview)
-        sb.pack(side="left", fill="y")
-        self.food_listbox.config(yscrollcommand=sb.set)
+        self.food_list = VirtualList(mid, self._load_page, lambda r: f"{r[1]} — {r[2]:.0f} kcal",
+                                     on_error=self.main_app._show_db_error)
 
         right = ctk.CTkFrame(outer)
         right.pack(fill="x", padx=6, pady=8)
@@ -54,9 +81,8 @@ class FoodTab:
             messagebox.showerror("No Profile", "Please create/select a profile first.")
             return
 
-        d = (self.food_date.get() or today_str()).strip()
         try:
-            datetime.fromisoformat(d)
+            d = check_date(self.food_date.get() or today_str())
         except ValueError:
             messagebox.showerror("Date", "Please enter date as YYYY-MM-DD")
             return
@@ -72,17 +98,25 @@ class FoodTab:
             messagebox.showerror("Calories", "Please enter a valid number for calories.")
             return
 
-        with db_connect() as conn:
-            cur = conn.cursor()
-            cur.execute(
-                "INSERT INTO foods(user_id, log_date, name, calories) VALUES(?,?,?,?)", 
-                (user_id, d, name, kcal)
-            )
-            conn.commit()
+        self.main_app.db.submit(
+            store.add_food, user_id, d, name, kcal,
+            on_done=lambda food_id: self._on_food_added((user_id, d), (food_id, name, kcal)),
+        )
 
+    def _on_food_added(self, day, row):
+        if self.catalog is not None:
+            self.catalog.logged(row[1], row[2])
+        self._hide_suggestions()
+        self.main_app.publish(foods_topic(*day), source="food_tab")
         self.food_name.delete(0, "end")
         self.food_kcal.delete(0, "end")
-        self.refresh_food_list()
+        if day == self._day:
+            # Same day on screen: add the one row instead of reloading the list
+            self.food_list.prepend(row)
+            self._day_total += row[2]
+            self._show_summary()
+        else:
+            self.refresh_food_list()
 
     def reset_food_day(self):
         user_id = getattr(self.main_app, "current_user_id", None)
@@ -91,33 +125,96 @@ class FoodTab:
 
         d = (self.food_date.get() or today_str()).strip()
         if messagebox.askyesno("Reset Day", f"Clear all foods for {d}?"):
-            with db_connect() as conn:
-                cur = conn.cursor()
-                cur.execute("DELETE FROM foods WHERE user_id=? AND log_date=?", (user_id, d))
-                conn.commit()
-            self.refresh_food_list()
+            self.main_app.db.submit(
+                store.reset_food_day, user_id, d, on_done=lambda _count: self._on_day_reset((user_id, d))
+            )
+
+    def _on_day_reset(self, day):
+        self.main_app.publish(foods_topic(*day), source="food_tab")
+        self.refresh_food_list()
 
-    def refresh_food_list(self):
-        self.food_listbox.delete(0, "end")
+    def refresh_food_list(self, snapshot=None):
         user_id = getattr(self.main_app, "current_user_id", None)
         if not user_id:
+            self._day = None
+            self.food_list.clear()
             return
 
         d = (self.food_date.get() or today_str()).strip()
-        with db_connect() as conn:
-            cur = conn.cursor()
-            cur.execute(
-                "SELECT name, calories FROM foods WHERE user_id=? AND log_date=? ORDER BY id DESC", 
-                (user_id, d)
-            )
-            rows = cur.fetchall()
+        if snapshot and snapshot.matches(user_id, d):
+            self._render((user_id, d), (snapshot.foods, snapshot.food_count, snapshot.food_kcal))
+            return
+        self.main_app.db.submit(
+            _load_food_day, user_id, d, key="food_list",
+            on_done=lambda result: self._render((user_id, d), result),
+        )
 
-        total = sum(c for n, c in rows)
-        for n, cals in rows:
-            self.food_listbox.insert("end", f"{n} — {cals:.0f} kcal")
+    def _load_page(self, before_id, limit, on_rows, on_error):
+        if self._day is None:
+            return
+        self.main_app.db.submit(store.food_page, *self._day, before_id, limit, on_done=on_rows, on_error=on_error)
 
-        target = getattr(self.main_app, "current_target", 2000)
+    def _render(self, day, result):
+        if day[0] != self.main_app.current_user_id:
+            return
+        rows, count, self._day_total = result
+        self._day = day
+        self.main_app.watch("food_tab", day[1])
+        self.food_list.reset(rows, count)
+        self._show_summary()
+
+    def _show_summary(self):
+        total = self._day_total
+        target = self.main_app.current_target
+        if target is None:
+            self.lbl_food_summary.configure(text=f"Consumed: {total:.0f} kcal • Complete your profile to see a target")
+            return
         remaining = target - total
         self.lbl_food_summary.configure(
             text=f"Target: {target:.0f} kcal • Consumed: {total:.0f} kcal • Remaining: {remaining:.0f} kcal"
         )
+
+    def _on_catalog_loaded(self, index):
+        self.catalog = index
+
+    def _on_name_typed(self, event):
+        if event.keysym in ("Down", "Up", "Return", "Escape", "Tab"):
+            return
+        text = self.food_name.get()
+        self._suggestions = self.catalog.search(text, SUGGESTIONS) if self.catalog and text.strip() else []
+        if not self._suggestions:
+            self._hide_suggestions()
+            return
+        self.suggest_box.delete(0, "end")
+        for item in self._suggestions:
+            kcal = f" — {item.kcal:.0f} kcal" if item.kcal is not None else ""
+            serving = f" ({item.serving})" if item.serving else ""
+            self.suggest_box.insert("end", f"{item.name}{serving}{kcal}")
+        self.suggest_box.configure(height=len(self._suggestions))
+        if not self.suggest_box.winfo_manager():
+            self.suggest_box.pack(fill="x", padx=6, before=self.mid)
+
+    def _focus_suggestions(self, _event):
+        if self._suggestions:
+            self.suggest_box.focus_set()
+            self.suggest_box.selection_clear(0, "end")
+            self.suggest_box.selection_set(0)
+            self.suggest_box.activate(0)
+
+    def _pick_suggestion(self, _event):
+        sel = self.suggest_box.curselection()
+        if not sel:
+            return
+        item = self._suggestions[sel[0]]
+        self.food_name.delete(0, "end")
+        self.food_name.insert(0, item.name)
+        if item.kcal is not None:
+            self.food_kcal.delete(0, "end")
+            self.food_kcal.insert(0, f"{item.kcal:g}")
+        self._hide_suggestions()
+        self.food_kcal.focus_set()
+
+    def _hide_suggestions(self):
+        self._suggestions = []
+        if self.suggest_box.winfo_manager():
+            self.suggest_box.pack_forget()
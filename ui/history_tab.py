@@ -0,0 +1,153 @@
+import customtkinter as ctk
+import tkinter as tk
+from tkinter import messagebox
+
+from core.helpers import check_date
+from core.search import PAGE_SIZE, search_logs
+
+# Wait this long after the last keystroke before searching
+TYPING_DELAY_MS = 250
+
+ORDERS = {"Newest first": "recent", "Best match": "rank"}
+
+def _search(conn, text, user_id, start, end, order, page):
+    """Runs on the DB thread: one page of matches plus the names of the profiles in it."""
+    result = search_logs(conn, text, user_id, start, end, order=order, page=page, page_size=PAGE_SIZE)
+    ids = sorted({h.user_id for h in result.hits})
+    names = dict(conn.execute(
+        f"SELECT id, name FROM users WHERE id IN ({','.join('?' * len(ids))})", ids
+    ).fetchall()) if ids else {}
+    return result, names
+
+class HistoryTab:
+    def __init__(self, tab_view, main_app):
+        self.tab_view = tab_view
+        self.main_app = main_app
+        self.frame = ctk.CTkFrame(self.tab_view)
+        self.frame.pack(fill="both", expand=True, padx=16, pady=16)
+        self.page = 0
+        self.hits = []
+        self._typing_job = None
+        self._build_ui()
+
+    def _build_ui(self):
+        outer = self.frame
+
+        top = ctk.CTkFrame(outer)
+        top.pack(fill="x", pady=8)
+
+        self.query = ctk.CTkEntry(top, placeholder_text="Search foods and exercises, e.g. paneer")
+        self.query.pack(side="left", padx=6, fill="x", expand=True)
+        self.query.bind("<KeyRelease>", self._on_typed)
+        self.query.bind("<Return>", lambda _e: self.search())
+
+        self.date_from = ctk.CTkEntry(top, placeholder_text="From YYYY-MM-DD", width=130)
+        self.date_from.pack(side="left", padx=6)
+        self.date_to = ctk.CTkEntry(top, placeholder_text="To YYYY-MM-DD", width=130)
+        self.date_to.pack(side="left", padx=6)
+
+        self.order = ctk.CTkOptionMenu(top, values=list(ORDERS), command=lambda _v: self.search(), width=130)
+        self.order.pack(side="left", padx=6)
+        self.all_users = ctk.CTkCheckBox(top, text="All profiles", command=self.search)
+        self.all_users.pack(side="left", padx=6)
+
+        ctk.CTkButton(top, text="Search", command=self.search, width=80).pack(side="left", padx=6)
+
+        mid = ctk.CTkFrame(outer)
+        mid.pack(fill="both", expand=True, pady=8)
+
+        self.results = tk.Listbox(mid, height=18)
+        self.results.pack(side="left", fill="both", expand=True, padx=6, pady=6)
+        self.results.bind("<Double-Button-1>", self._open_day)
+        sb = tk.Scrollbar(mid, command=self.results.yview)
+        sb.pack(side="left", fill="y")
+        self.results.config(yscrollcommand=sb.set)
+
+        nav = ctk.CTkFrame(outer)
+        nav.pack(fill="x", padx=6, pady=8)
+
+        self.btn_prev = ctk.CTkButton(nav, text="◀ Newer", width=90, command=lambda: self.search(self.page - 1))
+        self.btn_prev.pack(side="left", padx=6)
+        self.btn_next = ctk.CTkButton(nav, text="Older ▶", width=90, command=lambda: self.search(self.page + 1))
+        self.btn_next.pack(side="left", padx=6)
+        self.lbl_status = ctk.CTkLabel(nav, text="Double-click a result to open that day in its logger.")
+        self.lbl_status.pack(side="left", padx=12)
+        self._set_nav(False)
+
+    def _set_nav(self, has_more):
+        self.btn_prev.configure(state="normal" if self.page > 0 else "disabled")
+        self.btn_next.configure(state="normal" if has_more else "disabled")
+
+    def _on_typed(self, event):
+        if event.keysym == "Return":
+            return
+        if self._typing_job is not None:
+            self.frame.after_cancel(self._typing_job)
+        self._typing_job = self.frame.after(TYPING_DELAY_MS, self.search)
+
+    def refresh(self):
+        """Re-runs the current search, e.g. after a profile switch."""
+        if self.query.get().strip():
+            self.search(self.page)
+
+    def search(self, page=0):
+        self._typing_job = None
+        text = self.query.get().strip()
+        if not text:
+            self.results.delete(0, "end")
+            self.hits = []
+            self.page = 0
+            self._set_nav(False)
+            return
+
+        try:
+            start, end = (check_date(e.get()) if e.get().strip() else None for e in (self.date_from, self.date_to))
+        except ValueError:
+            messagebox.showerror("Date", "Please enter dates as YYYY-MM-DD")
+            return
+
+        user_id = None if self.all_users.get() else self.main_app.current_user_id
+        if user_id is None and not self.all_users.get():
+            self.lbl_status.configure(text="Select a profile, or tick 'All profiles'.")
+            return
+
+        self.main_app.db.submit(
+            _search, text, user_id, start, end, ORDERS[self.order.get()], max(page, 0),
+            key="history_search", on_done=self._render,
+        )
+
+    def _render(self, result):
+        result, names = result
+        self.page = result.page
+        self.hits = result.hits
+        self.results.delete(0, "end")
+        for h in self.hits:
+            who = f"  [{names.get(h.user_id, h.user_id)}]" if self.all_users.get() else ""
+            kcal = f"{h.kcal:.0f}" if h.kcal is not None else "?"
+            burned = " burned" if h.kind == "exercise" else ""
+            self.results.insert("end", f"{h.log_date}  {h.name} — {kcal} kcal{burned}{who}")
+        first = result.page * result.page_size
+        if self.hits:
+            text = f"Results {first + 1}–{first + len(self.hits)}"
+        else:
+            text = "No matches."
+        self.lbl_status.configure(text=text)
+        self._set_nav(result.has_more)
+
+    def _open_day(self, _event):
+        sel = self.results.curselection()
+        if not sel:
+            return
+        hit = self.hits[sel[0]]
+        if hit.user_id != self.main_app.current_user_id:
+            return
+        if hit.kind == "food":
+            attr, title, entry = "food_tab", "Food Logger", "food_date"
+        else:
+            attr, title, entry = "ex_tab", "Exercise Logger", "ex_date"
+        tab = self.main_app.ensure_tab(attr)
+        getattr(tab, entry).delete(0, "end")
+        getattr(tab, entry).insert(0, hit.log_date)
+        self.main_app.tabs.set(title)
+        self.main_app.dirty_tabs.discard(attr)
+        self.main_app._refresh_tab(attr)
@@ -1,28 +1,59 @@
 import customtkinter as ctk
 import tkinter as tk
 from tkinter import messagebox
-import json
+import importlib
+import logging
 import sqlite3
-import matplotlib
-import os
-
-matplotlib.use("TkAgg")  # required for charts
-
-# Import all tab classes
-from ui.profile_tab import ProfileTab
-from ui.calc_tab import CalcTab
-from ui.food_tab import FoodTab
-from ui.exercise_tab import ExerciseTab
-from ui.meal_tab import MealTab
-from ui.progress_tab import ProgressTab
-from ui.export_tab import ExportTab
 
 # Import from core
-from core.db import db_connect
+from core.db import QueryCounter
+from core.events import USERS, EventBus, exercises_topic, foods_topic, profile_topic, weights_topic
+from core.executor import DBExecutor
 from core.helpers import today_str
+from core.render_cache import CACHE_DIR, RenderCache
+from core.snapshot import load_day_snapshot
+from core import store
 
 APP_TITLE = "Calorie Calculator Pro — Advanced"
 
+# A profile switch should cost one snapshot transaction; more means a tab is querying on its own
+SWITCH_QUERY_BUDGET = 10
+
+log = logging.getLogger(__name__)
+
+# (tab title, attribute, module, class). Each tab's module is imported and the tab
+# built the first time it is shown, so matplotlib only loads with a chart tab.
+TABS = [
+    ("Profile", "profile_tab", "ui.profile_tab", "ProfileTab"),
+    ("Calculator", "calc_tab", "ui.calc_tab", "CalcTab"),
+    ("Food Logger", "food_tab", "ui.food_tab", "FoodTab"),
+    ("Exercise Logger", "ex_tab", "ui.exercise_tab", "ExerciseTab"),
+    ("Meal Planner", "meal_tab", "ui.meal_tab", "MealTab"),
+    ("Progress", "prog_tab", "ui.progress_tab", "ProgressTab"),
+    ("Trends", "trends_tab", "ui.trends_tab", "TrendsTab"),
+    ("History", "history_tab", "ui.history_tab", "HistoryTab"),
+    ("Export", "export_tab", "ui.export_tab", "ExportTab"),
+]
+
+# Tabs that show the current profile's data and need refreshing when it changes
+PROFILE_TABS = ("profile_tab", "calc_tab", "food_tab", "ex_tab", "prog_tab", "trends_tab", "history_tab")
+
+# Data topics (core.events) each tab shows, as functions of (user_id, day). Profile
+# edits are not listed: they reload the snapshot, which refreshes every profile tab.
+TAB_TOPICS = {
+    "food_tab": lambda uid, day: [foods_topic(uid, day)],
+    "ex_tab": lambda uid, day: [exercises_topic(uid, day), foods_topic(uid, day)],
+    "prog_tab": lambda uid, day: [weights_topic(uid)],
+    "trends_tab": lambda uid, day: [foods_topic(uid), exercises_topic(uid), weights_topic(uid)],
+    "history_tab": lambda uid, day: [foods_topic("*"), exercises_topic("*")],
+}
+
+def _load_snapshot_counted(conn, user_id, log_date):
+    """Runs on the DB thread: the day snapshot plus the number of statements it took."""
+    with QueryCounter(conn) as counter:
+        snap = load_day_snapshot(conn, user_id, log_date)
+    return snap, counter.count
+
 class CalorieProApp(ctk.CTk):
     def __init__(self):
         super().__init__()
@@ -34,7 +65,15 @@ class CalorieProApp(ctk.CTk):
 
         self.current_user_id = None
         self.current_user = None
-        self.current_target = 2000
+        self.current_targets = None   # cached core.targets dict for the current profile
+        self.current_target = None    # its calorie target; None until the profile is complete
+        self.snapshot = None
+        self.last_switch_queries = 0
+        self.db = DBExecutor(self, on_error=self._show_db_error)
+        self.bus = EventBus(self.after_idle)
+        self.render_cache = RenderCache(CACHE_DIR)
+        self.bus.subscribe("user_select", [USERS], self.refresh_user_select)
+        self.bus.subscribe("current_user", [profile_topic("*")], self.load_current_user)
 
         # Tabs
         self.profile_tab = None
@@ -43,11 +82,22 @@ class CalorieProApp(ctk.CTk):
         self.ex_tab = None
         self.meal_tab = None
         self.prog_tab = None
+        self.trends_tab = None
+        self.history_tab = None
         self.export_tab = None
 
         self._build_topbar()
         self._build_tabs()
         self.load_first_user_or_prompt()
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+
+    def on_close(self):
+        log.debug("Chart cache: %s", self.render_cache.stats())
+        self.db.shutdown()
+        self.destroy()
+
+    def _show_db_error(self, exc):
+        messagebox.showerror("Database", f"{type(exc).__name__}: {exc}")
 
     def _build_topbar(self):
         bar = ctk.CTkFrame(self)
@@ -64,24 +114,74 @@ class CalorieProApp(ctk.CTk):
         self.mode_switch.pack(side="right", padx=8)
 
     def _build_tabs(self):
-        self.tabs = ctk.CTkTabview(self, width=940, height=620)
+        self.tabs = ctk.CTkTabview(self, width=940, height=620, command=self._on_tab_changed)
         self.tabs.pack(padx=20, pady=10, fill="both", expand=True)
 
-        self.tab_profile = self.tabs.add("Profile")
-        self.tab_calc = self.tabs.add("Calculator")
-        self.tab_food = self.tabs.add("Food Logger")
-        self.tab_ex = self.tabs.add("Exercise Logger")
-        self.tab_meal = self.tabs.add("Meal Planner")
-        self.tab_prog = self.tabs.add("Progress")
-        self.tab_export = self.tabs.add("Export")
-
-        self.profile_tab = ProfileTab(self.tab_profile, self)
-        self.calc_tab = CalcTab(self.tab_calc, self)
-        self.food_tab = FoodTab(self.tab_food, self)
-        self.ex_tab = ExerciseTab(self.tab_ex, self)
-        self.meal_tab = MealTab(self.tab_meal, self)
-        self.prog_tab = ProgressTab(self.tab_prog, self)
-        self.export_tab = ExportTab(self.tab_export, self)
+        self.tab_frames = {attr: self.tabs.add(title) for title, attr, _, _ in TABS}
+        self.dirty_tabs = set()
+        self.ensure_tab(self.visible_tab())
+
+    def visible_tab(self):
+        """Attribute name of the tab currently on screen."""
+        title = self.tabs.get()
+        return next(attr for t, attr, _, _ in TABS if t == title)
+
+    def ensure_tab(self, attr):
+        """Returns the tab object for `attr`, importing its module and building it on first use."""
+        tab = getattr(self, attr)
+        if tab is None:
+            _, _, module, cls = next(spec for spec in TABS if spec[1] == attr)
+            tab_cls = getattr(importlib.import_module(module), cls)
+            tab = tab_cls(self.tab_frames[attr], self)
+            setattr(self, attr, tab)
+        return tab
+
+    def _on_tab_changed(self):
+        attr = self.visible_tab()
+        self.ensure_tab(attr)
+        if attr in self.dirty_tabs:
+            self.dirty_tabs.discard(attr)
+            self._refresh_tab(attr)
+
+    def _refresh_tab(self, attr):
+        snap = self.snapshot
+        if attr == "profile_tab":
+            self.profile_tab.populate_from_user(self.current_user)
+        elif attr == "calc_tab":
+            self.calc_tab.calculate_now()
+        elif attr == "food_tab":
+            self.food_tab.refresh_food_list(snap)
+        elif attr == "ex_tab":
+            self.ex_tab.refresh_exercise_list(snap)
+        elif attr == "prog_tab":
+            self.prog_tab.refresh_progress_chart(snap)
+        elif attr == "trends_tab":
+            self.trends_tab.refresh_trends()
+        elif attr == "history_tab":
+            self.history_tab.refresh()
+
+    def publish(self, *topics, source=None):
+        """Called after a write with the topics it touched (see core.events).
+
+        The snapshot is dropped at once; subscribed tabs refresh on the next idle
+        cycle. `source` is the tab that made the write and has already updated itself.
+        """
+        self.snapshot = None
+        self.bus.publish(*topics, source=source)
+
+    def watch(self, attr, day="*"):
+        """(Re)subscribes tab `attr` to its topics for the current profile and `day`."""
+        topics = TAB_TOPICS.get(attr)
+        if topics and self.current_user_id:
+            self.bus.subscribe(attr, topics(self.current_user_id, day), lambda: self._invalidate(attr))
+
+    def _invalidate(self, attr):
+        if attr == self.visible_tab():
+            self.ensure_tab(attr)
+            self.dirty_tabs.discard(attr)
+            self._refresh_tab(attr)
+        else:
+            self.dirty_tabs.add(attr)
 
     def toggle_mode(self):
         is_on = self.mode_switch.get()
@@ -91,6 +191,8 @@ class CalorieProApp(ctk.CTk):
         else:
             ctk.set_appearance_mode("dark")
             self.mode_switch.configure(text="Light Mode")
+        if self.calc_tab is not None:
+            self.calc_tab.redraw_pie()
 
     def create_profile_dialog(self):
         d = ctk.CTkInputDialog(text="Enter new profile name:", title="New Profile")
@@ -98,77 +200,78 @@ class CalorieProApp(ctk.CTk):
         if not name:
             return
         name = name.strip()
-        with db_connect() as conn:
-            cur = conn.cursor()
-            try:
-                cur.execute("INSERT INTO users(name) VALUES(?)", (name,))
-                conn.commit()
-            except sqlite3.IntegrityError:
-                messagebox.showerror("Exists", "A profile with that name already exists.")
-                return
-        self.refresh_user_select()
+        self.db.submit(
+            store.create_user, name,
+            on_done=lambda _uid: self._on_profile_created(name),
+            on_error=self._on_create_failed,
+        )
+
+    def _on_profile_created(self, name):
+        self.publish(USERS)
         self.user_select.set(name)
         self.on_user_select(name)
 
+    def _on_create_failed(self, exc):
+        if isinstance(exc, sqlite3.IntegrityError):
+            messagebox.showerror("Exists", "A profile with that name already exists.")
+        else:
+            self._show_db_error(exc)
+
     def refresh_user_select(self):
-        with db_connect() as conn:
-            cur = conn.cursor()
-            cur.execute("SELECT name FROM users ORDER BY name COLLATE NOCASE")
-            names = [r[0] for r in cur.fetchall()]
+        self.db.submit(store.user_names, key="user_names", on_done=self._set_user_names)
+
+    def _set_user_names(self, names):
         self.user_select.configure(values=names if names else ["No profiles yet"])
 
     def on_user_select(self, name):
-        with db_connect() as conn:
-            cur = conn.cursor()
-            cur.execute("SELECT id FROM users WHERE name=?", (name,))
-            row = cur.fetchone()
-        if row:
-            self.current_user_id = row[0]
+        self.db.submit(store.user_id_by_name, name, key="user_lookup", on_done=self._on_user_found)
+
+    def _on_user_found(self, user_id):
+        if user_id:
+            self.current_user_id = user_id
             self.load_current_user()
 
     def load_current_user(self):
         user_id = getattr(self, "current_user_id", None)
         if not user_id:
             return
-        with db_connect() as conn:
-            cur = conn.cursor()
-            cur.execute(
-                "SELECT name, gender, age, height_cm, weight_kg, activity, goal, macro_json "
-                "FROM users WHERE id=?", (user_id,)
-            )
-            r = cur.fetchone()
-        if not r:
+        # Quick successive switches only render the last one
+        self.db.submit(
+            _load_snapshot_counted, user_id, today_str(), key="snapshot",
+            on_done=self._apply_snapshot,
+        )
+
+    def _apply_snapshot(self, result):
+        snap, queries = result
+        if not snap or snap.user_id != self.current_user_id:
             return
-        name, gender, age, height, weight, activity, goal, macro_json = r
-        self.current_user = {
-            "name": name,
-            "gender": gender,
-            "age": age,
-            "height": height,
-            "weight": weight,
-            "activity": activity,
-            "goal": goal,
-            "macro": json.loads(macro_json or '{"protein":30,"carb":45,"fat":25}')
-        }
-
-        # Update all tabs
-        if getattr(self, "profile_tab", None):
-            self.profile_tab.populate_from_user(self.current_user)
-        if getattr(self, "calc_tab", None):
-            self.calc_tab.calculate_now()
-        if getattr(self, "food_tab", None):
-            self.food_tab.refresh_food_list()
-        if getattr(self, "ex_tab", None):
-            self.ex_tab.refresh_exercise_list()
-        if getattr(self, "prog_tab", None):
-            self.prog_tab.refresh_progress_chart()
+        self.snapshot = snap
+        self.current_user = snap.profile
+        self.current_targets = snap.targets
+        self.current_target = snap.targets["target"] if snap.targets else None
+
+        # Refresh the visible tab from the snapshot; the others catch up when shown
+        submitted = self.db.submitted
+        visible = self.visible_tab()
+        for attr in PROFILE_TABS:
+            self.watch(attr)
+            if attr == visible:
+                self._refresh_tab(attr)
+            else:
+                self.dirty_tabs.add(attr)
+
+        # Tabs that couldn't render from the snapshot queued their own reads
+        self.last_switch_queries = queries + (self.db.submitted - submitted)
+        if self.last_switch_queries > SWITCH_QUERY_BUDGET:
+            log.warning("Profile switch ran %d queries (budget %d)", self.last_switch_queries, SWITCH_QUERY_BUDGET)
+        else:
+            log.debug("Profile switch ran %d queries", self.last_switch_queries)
 
     def load_first_user_or_prompt(self):
-        with db_connect() as conn:
-            cur = conn.cursor()
-            cur.execute("SELECT name FROM users ORDER BY id LIMIT 1")
-            r = cur.fetchone()
         self.refresh_user_select()
-        if r:
-            self.user_select.set(r[0])
-            self.on_user_select(r[0])
+        self.db.submit(store.first_user_name, on_done=self._select_first_user)
+
+    def _select_first_user(self, name):
+        if name:
+            self.user_select.set(name)
+            self.on_user_select(name)
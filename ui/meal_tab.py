@@ -12,7 +12,7 @@ class MealTab:
         outer = self.frame
 
         self.meal_info = ctk.CTkLabel(
-            outer, text="Use the Calculator first (or 'Use Profile Values'), then see suggested per-meal budget."
+            outer, text="Save your profile to see a suggested per-meal budget based on your daily target."
         )
         self.meal_info.pack(anchor="w")
 
@@ -28,7 +28,7 @@ class MealTab:
 
         target = getattr(self.main_app, "current_target", None)
         if not target:
-            self.meal_info.configure(text="Please calculate your target calories first.")
+            self.meal_info.configure(text="Complete and save your profile first to get a calorie target.")
             return
 
         splits = {
@@ -37,7 +37,7 @@ class MealTab:
             "Dinner": 0.30,
             "Snacks": 0.10,
         }
-        macro = getattr(self.main_app.current_user or {}, "macro", {"protein": 30, "carb": 45, "fat": 25})
+        macro = (self.main_app.current_user or {}).get("macro", {"protein": 30, "carb": 45, "fat": 25})
 
         for meal, frac in splits.items():
             kcal = target * frac
@@ -1,10 +1,10 @@
 import customtkinter as ctk
 import tkinter as tk
 from tkinter import messagebox
-import json
 
-from core.db import db_connect
 from core.helpers import ACTIVITY_FACTORS
+from core import store
+from core.events import USERS, profile_topic
 
 class ProfileTab:
     def __init__(self, tab_view, main_app):
@@ -97,38 +97,15 @@ class ProfileTab:
             messagebox.showerror("Macros", "Protein + Carbs + Fat must equal 100%.")
             return
 
-        conn = db_connect()
-        cur = conn.cursor()
-        macro_json = json.dumps(macro)
-        cur.execute("SELECT id FROM users WHERE name=?", (name,))
-        row = cur.fetchone()
-        if row:
-            uid = row[0]
-            cur.execute(
-                """
-                UPDATE users SET gender=?, age=?, height_cm=?, weight_kg=?, activity=?, goal=?, macro_json=?
-                WHERE id=?
-                """,
-                (gender, age, height, weight, activity, goal, macro_json, uid),
-            )
-            self.main_app.current_user_id = uid
-        else:
-            cur.execute(
-                """
-                INSERT INTO users(name, gender, age, height_cm, weight_kg, activity, goal, macro_json)
-                VALUES(?,?,?,?,?,?,?,?)
-                """,
-                (name, gender, age, height, weight, activity, goal, macro_json),
-            )
-            self.main_app.current_user_id = cur.lastrowid
-        conn.commit()
-        conn.close()
-
-        # Refresh main app data safely
-        if hasattr(self.main_app, "refresh_user_select"):
-            self.main_app.refresh_user_select()
-        if hasattr(self.main_app, "load_current_user"):
-            self.main_app.load_current_user()
+        self.main_app.db.submit(
+            store.save_profile, name, gender, age, height, weight, activity, goal, macro,
+            on_done=lambda uid: self._on_saved(uid, name),
+        )
+
+    def _on_saved(self, uid, name):
+        self.main_app.current_user_id = uid
+        # Reloads the profile list and the current profile's snapshot
+        self.main_app.publish(USERS, profile_topic(uid))
         messagebox.showinfo("Saved", f"Profile '{name}' saved.")
 
     def populate_from_user(self, user_data):
@@ -1,13 +1,13 @@
 import customtkinter as ctk
 from tkinter import messagebox
-from datetime import datetime
 import matplotlib
 matplotlib.use("TkAgg")
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
 
-from core.db import db_connect
-from core.helpers import today_str
+from core.helpers import check_date, today_str
+from core import store
+from core.events import profile_topic, weights_topic
+from ui.charts import WeightChart
 
 class ProgressTab:
     def __init__(self, tab_view, main_app):
@@ -15,6 +15,10 @@ class ProgressTab:
         self.main_app = main_app
         self.frame = ctk.CTkFrame(self.tab_view)
         self.frame.pack(fill="both", expand=True, padx=16, pady=16)
+        self.chart = None
+        self.chart_canvas = None
+        self.chart_toolbar = None
+        self.chart_user_id = None
         self._build_ui()
     
     def _build_ui(self):
@@ -35,58 +39,78 @@ class ProgressTab:
         self.prog_chart = ctk.CTkFrame(outer)
         self.prog_chart.pack(fill="both", expand=True, pady=8)
 
+        self.no_data_label = ctk.CTkLabel(self.prog_chart, text="No weight data yet.", font=("Arial", 14))
+
     def add_weight(self):
         if not getattr(self.main_app, "current_user_id", None):
             messagebox.showerror("No Profile", "Please select or create a profile first.")
             return
-        d = (self.w_date.get() or today_str()).strip()
         try:
-            datetime.fromisoformat(d)
+            d = check_date(self.w_date.get() or today_str())
             w = float(self.w_weight.get())
         except Exception:
             messagebox.showerror("Invalid", "Please enter valid date (YYYY-MM-DD) and weight.")
             return
-        conn = db_connect()
-        cur = conn.cursor()
-        cur.execute(
-            "INSERT INTO weights(user_id, log_date, weight_kg) VALUES(?,?,?)",
-            (self.main_app.current_user_id, d, w)
+        user_id = self.main_app.current_user_id
+        self.main_app.db.submit(
+            store.add_weight, user_id, d, w,
+            on_done=lambda _id: self._on_weight_added(user_id, d, w),
         )
-        conn.commit()
-        conn.close()
-        self.w_weight.delete(0, "end")
-        self.refresh_progress_chart()
 
-    def refresh_progress_chart(self):
-        for w in self.prog_chart.winfo_children():
-            w.destroy()
+    def _on_weight_added(self, user_id, d, w):
+        # A newest entry also becomes the profile's weight, which moves the target
+        self.main_app.publish(weights_topic(user_id), profile_topic(user_id), source="prog_tab")
+        self.w_weight.delete(0, "end")
+        if self.chart is not None and self.chart_user_id == user_id == self.main_app.current_user_id:
+            # The chart already holds this user's series, so just add the new point
+            self.chart.add_point(d, w)
+            self._show_chart()
+        else:
+            self.refresh_progress_chart()
 
-        if not getattr(self.main_app, "current_user_id", None):
+    def refresh_progress_chart(self, snapshot=None):
+        user_id = getattr(self.main_app, "current_user_id", None)
+        if not user_id:
+            self._show_no_data()
             return
 
-        conn = db_connect()
-        cur = conn.cursor()
-        cur.execute(
-            "SELECT log_date, weight_kg FROM weights WHERE user_id=? ORDER BY log_date",
-            (self.main_app.current_user_id,)
+        if snapshot and snapshot.matches(user_id):
+            self._render(user_id, snapshot.weights)
+            return
+        self.main_app.db.submit(
+            store.weight_series, user_id, key="weight_series",
+            on_done=lambda rows: self._render(user_id, rows),
         )
-        rows = cur.fetchall()
-        conn.close()
 
+    def _render(self, user_id, rows):
+        if user_id != self.main_app.current_user_id:
+            return
+        self.chart_user_id = user_id
         if not rows:
-            ctk.CTkLabel(self.prog_chart, text="No weight data yet.", font=("Arial", 14)).pack(pady=20)
+            if self.chart is not None:
+                self.chart.set_series([])
+            self._show_no_data()
             return
 
-        dates = [datetime.fromisoformat(r[0]) for r in rows]
-        weights = [r[1] for r in rows]
+        if self.chart is None:
+            self.chart = WeightChart()
+            self.chart_canvas = FigureCanvasTkAgg(self.chart.figure, master=self.prog_chart)
+            # Zooming re-reduces the full-resolution series for the visible range
+            self.chart_toolbar = NavigationToolbar2Tk(self.chart_canvas, self.prog_chart, pack_toolbar=False)
+        self.chart.set_series(rows)
+        self._show_chart()
 
-        fig, ax = plt.subplots(figsize=(6.5, 3.8))
-        ax.plot(dates, weights, marker="o")
-        ax.set_title("Weight Progress", fontsize=14, fontname="Arial")
-        ax.set_xlabel("Date", fontsize=12, fontname="Arial")
-        ax.set_ylabel("Weight (kg)", fontsize=12, fontname="Arial")
-        fig.autofmt_xdate()
+    def _show_chart(self):
+        self.no_data_label.pack_forget()
+        widget = self.chart_canvas.get_tk_widget()
+        if not widget.winfo_manager():
+            self.chart_toolbar.pack(side="bottom", fill="x")
+            widget.pack(pady=6, fill="both", expand=True)
+        self.chart_canvas.draw_idle()
 
-        canvas = FigureCanvasTkAgg(fig, master=self.prog_chart)
-        canvas.draw()
-        canvas.get_tk_widget().pack(pady=6, fill="both", expand=True)
+    def _show_no_data(self):
+        if self.chart_canvas is not None:
+            self.chart_canvas.get_tk_widget().pack_forget()
+            self.chart_toolbar.pack_forget()
+        if not self.no_data_label.winfo_manager():
+            self.no_data_label.pack(pady=20)
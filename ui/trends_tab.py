@@ -0,0 +1,71 @@
+import customtkinter as ctk
+from datetime import date, timedelta
+import matplotlib
+matplotlib.use("TkAgg")
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+
+from core.analytics import load_trends
+from core.helpers import today_str
+from ui.charts import TrendsChart
+
+RANGES = {"Last 30 days": 30, "Last 90 days": 90, "Last year": 365, "Last 5 years": 5 * 365}
+
+def _fmt(value, spec, suffix=""):
+    return "—" if value != value else f"{value:{spec}}{suffix}"
+
+class TrendsTab:
+    def __init__(self, tab_view, main_app):
+        self.tab_view = tab_view
+        self.main_app = main_app
+        self.frame = ctk.CTkFrame(self.tab_view)
+        self.frame.pack(fill="both", expand=True, padx=16, pady=16)
+        self.chart = None
+        self.chart_canvas = None
+        self._build_ui()
+
+    def _build_ui(self):
+        outer = self.frame
+
+        top = ctk.CTkFrame(outer)
+        top.pack(fill="x", pady=8)
+
+        self.range_menu = ctk.CTkOptionMenu(top, values=list(RANGES), command=lambda _v: self.refresh_trends())
+        self.range_menu.set("Last 90 days")
+        self.range_menu.pack(side="left", padx=6)
+
+        self.lbl_summary = ctk.CTkLabel(top, text="", justify="left", anchor="w")
+        self.lbl_summary.pack(side="left", padx=12, fill="x", expand=True)
+
+        self.chart_frame = ctk.CTkFrame(outer)
+        self.chart_frame.pack(fill="both", expand=True, pady=8)
+
+    def refresh_trends(self):
+        user_id = getattr(self.main_app, "current_user_id", None)
+        if not user_id:
+            self.lbl_summary.configure(text="Select a profile to see trends.")
+            return
+        end = today_str()
+        start = (date.fromisoformat(end) - timedelta(days=RANGES[self.range_menu.get()] - 1)).isoformat()
+        self.main_app.db.submit(
+            load_trends, user_id, start, end, key="trends",
+            on_done=lambda trends: self._render(user_id, trends),
+        )
+
+    def _render(self, user_id, trends):
+        if user_id != self.main_app.current_user_id:
+            return
+        if self.chart is None:
+            self.chart = TrendsChart()
+            self.chart_canvas = FigureCanvasTkAgg(self.chart.figure, master=self.chart_frame)
+            self.chart_canvas.get_tk_widget().pack(fill="both", expand=True, pady=6)
+        self.chart.set_trends(trends)
+        self.chart_canvas.draw_idle()
+
+        lines = []
+        for w, s in trends.summary().items():
+            lines.append(
+                f"{w} days: intake {_fmt(s['intake'], '.0f')} • burn {_fmt(s['burn'], '.0f')}"
+                f" • net {_fmt(s['net'], '.0f')} kcal/day • on target {_fmt(s['adherence'] * 100, '.0f', '%')}"
+                f" • weight {_fmt(s['weight_slope'], '+.2f', ' kg/wk')}"
+            )
+        self.lbl_summary.configure(text="\n".join(lines))
@@ -0,0 +1,155 @@
+"""A Listbox that shows a long newest-first list without holding it all.
+
+Rows are fetched a page at a time from `load_page(before_id, limit, on_rows,
+on_error)`, which should run a keyset query (id < before_id ORDER BY id DESC)
+and call on_rows with the result, or on_error with the exception, on the Tk
+thread. Only the visible window is ever put
+into the Listbox, and a redraw touches only the lines that changed, so
+scrolling and adding an entry cost a few widget calls however long the day is.
+"""
+import tkinter as tk
+import tkinter.font as tkfont
+
+from core.store import LIST_PAGE
+
+# Shown for rows whose page has not arrived yet
+PLACEHOLDER = "…"
+
+class VirtualList:
+    def __init__(self, master, load_page, format_row, height=14, page_size=LIST_PAGE, on_error=None):
+        self.load_page = load_page
+        self.on_error = on_error    # reports a failed page load; the next scroll retries it
+        self.format_row = format_row
+        self.page_size = page_size
+        self.rows = []          # loaded rows, newest first; row[0] is the id
+        self.total = 0          # rows in the whole list
+        self.top = 0            # index of the first visible row
+        self.visible = height
+        self._shown = []        # the lines currently in the Listbox
+        self._loading = False
+        self._generation = 0    # bumped on reset so late pages of an old list are dropped
+
+        self.listbox = tk.Listbox(master, height=height)
+        self.listbox.pack(side="left", fill="both", expand=True, padx=6, pady=6)
+        self.scrollbar = tk.Scrollbar(master, command=self.yview)
+        self.scrollbar.pack(side="left", fill="y")
+        self._line_px = tkfont.Font(font=self.listbox.cget("font")).metrics("linespace") + 1
+
+        self.listbox.bind("<Configure>", self._on_resize)
+        self.listbox.bind("<MouseWheel>", self._on_wheel)
+        self.listbox.bind("<Button-4>", lambda _e: self._scroll_to(self.top - 3))
+        self.listbox.bind("<Button-5>", lambda _e: self._scroll_to(self.top + 3))
+
+    def reset(self, rows=(), total=0):
+        """Replaces the list with its first page and total row count."""
+        self._generation += 1
+        self._loading = False
+        self.rows = list(rows)
+        self.total = max(total, len(self.rows))
+        self.top = 0
+        self._render()
+
+    def clear(self):
+        self.reset()
+
+    def prepend(self, row):
+        """Adds a new newest row; the view stays on the same rows unless it was at the top."""
+        self.rows.insert(0, row)
+        self.total += 1
+        if self.top > 0:
+            self.top += 1
+        self._render()
+
+    def yview(self, *args):
+        """Scrollbar command: ("moveto", fraction) or ("scroll", n, "units"|"pages")."""
+        if args[0] == "moveto":
+            self._scroll_to(round(float(args[1]) * self.total))
+        elif args[0] == "scroll":
+            step = int(args[1]) * (self.visible if args[2] == "pages" else 1)
+            self._scroll_to(self.top + step)
+
+    def _scroll_to(self, top):
+        top = max(0, min(top, self.total - self.visible))
+        if top != self.top:
+            self.top = top
+            self._render()
+        return "break"
+
+    def _on_wheel(self, event):
+        # Windows reports multiples of 120 per notch, macOS small deltas
+        step = event.delta // 120 if abs(event.delta) >= 120 else event.delta
+        return self._scroll_to(self.top - 3 * step)
+
+    def _on_resize(self, event):
+        visible = max(1, event.height // self._line_px)
+        if visible != self.visible:
+            self.visible = visible
+            self._scroll_to(self.top)
+            self._render()
+
+    def _render(self):
+        end = min(self.top + self.visible, self.total)
+        if end > len(self.rows):
+            self._fetch()
+        lines = [
+            self.format_row(self.rows[i]) if i < len(self.rows) else PLACEHOLDER
+            for i in range(self.top, end)
+        ]
+        self._apply(lines)
+        if self.total:
+            self.scrollbar.set(self.top / self.total, end / self.total)
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    def _apply(self, lines):
+        old = self._shown
+        if lines == old:
+            return
+        lb = self.listbox
+        n = len(lines)
+        if old and n and lines[1:] == old[:n - 1]:
+            # One row arrived on top (or the view moved up one): shift down
+            lb.insert(0, lines[0])
+            if lb.size() > n:
+                lb.delete(n, "end")
+        elif old and n and lines[:-1] == old[1:n]:
+            # The view moved down one: shift up
+            lb.delete(0)
+            if lb.size() >= n:
+                lb.delete(n - 1, "end")
+            lb.insert("end", lines[-1])
+        else:
+            for i, line in enumerate(lines):
+                if i >= len(old):
+                    lb.insert("end", line)
+                elif old[i] != line:
+                    lb.delete(i)
+                    lb.insert(i, line)
+            if len(old) > n:
+                lb.delete(n, "end")
+        self._shown = lines
+
+    def _fetch(self):
+        if self._loading or len(self.rows) >= self.total:
+            return
+        self._loading = True
+        generation = self._generation
+        before_id = self.rows[-1][0] if self.rows else None
+
+        def on_rows(rows):
+            if generation != self._generation:
+                return
+            self._loading = False
+            self.rows.extend(rows)
+            if len(rows) < self.page_size:
+                # The list ended early (rows were deleted since the count)
+                self.total = len(self.rows)
+            self._render()
+
+        def on_failed(exc):
+            if generation == self._generation:
+                self._loading = False
+            if self.on_error:
+                self.on_error(exc)
+
+        self.load_page(before_id, self.page_size, on_rows, on_failed)